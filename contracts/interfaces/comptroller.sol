@@ -261,3 +261,23 @@ interface ComptrollerV5Storage is ComptrollerV4Storage {
     function _setPriceOracle(address newOracle) external returns (uint);
     function getAllMarkets() external view returns (address[] calldata cTokens);
 }
+
+interface IComptrollerMarkets {
+    function markets(address cToken)
+        external
+        view
+        returns (
+            bool isListed,
+            uint256 collateralFactorMantissa,
+            bool isComped
+        );
+
+    function getAccountLiquidity(address account)
+        external
+        view
+        returns (
+            uint256 error,
+            uint256 liquidity,
+            uint256 shortfall
+        );
+}
@@ -0,0 +1,18 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity ^0.6.12;
+
+/**
+ * The CoreStrategy views off-chain tooling reads from strategies it only
+ * knows by address
+ */
+interface ICoreStrategy {
+    function vault() external view returns (address);
+
+    function forceHarvestTriggerOnce() external view returns (bool);
+
+    function maxReportDelay() external view returns (uint256);
+
+    function estimatedTotalAssets() external view returns (uint256);
+
+    function harvestTrigger(uint256 callCost) external view returns (bool);
+}
@@ -215,6 +215,12 @@ interface ICToken is ICTokenStorage {
 
     function borrowRatePerBlock() external view returns (uint256);
 
+    function borrowIndex() external view returns (uint256);
+
+    function accrualBlockNumber() external view returns (uint256);
+
+    function reserveFactorMantissa() external view returns (uint256);
+
     function supplyRatePerBlock() external view returns (uint256);
 
     function totalBorrowsCurrent() external returns (uint256);
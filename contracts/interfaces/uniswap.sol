@@ -319,3 +319,14 @@ interface IUniswapV2Pair {
 
     function initialize(address, address) external;
 }
+
+interface IUniswapV2Factory {
+    function getPair(address tokenA, address tokenB)
+        external
+        view
+        returns (address pair);
+
+    function allPairs(uint256) external view returns (address pair);
+
+    function allPairsLength() external view returns (uint256);
+}
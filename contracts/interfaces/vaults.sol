@@ -10,4 +10,26 @@ interface IVault {
     function balanceOf(address _address) external view returns (uint256);
     function want() external view returns(address);
     function decimals() external view returns (uint256);  
+    function totalSupply() external view returns (uint256);
+    function totalIdle() external view returns (uint256);
+    function totalDebt() external view returns (uint256);
+    function lockedProfit() external view returns (uint256);
+    function lockedProfitDegradation() external view returns (uint256);
+    function lastReport() external view returns (uint256);
+    function withdrawalQueue(uint256 _index) external view returns (address);
+    // StrategyParams as returned by yearn-vaults 0.4.3
+    function strategies(address _strategy)
+        external
+        view
+        returns (
+            uint256 performanceFee,
+            uint256 activation,
+            uint256 debtRatio,
+            uint256 minDebtPerHarvest,
+            uint256 maxDebtPerHarvest,
+            uint256 lastReport,
+            uint256 totalDebt,
+            uint256 totalGain,
+            uint256 totalLoss
+        );
 }
\ No newline at end of file
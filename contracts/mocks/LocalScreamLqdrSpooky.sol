@@ -0,0 +1,55 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "../CoreStrategy.sol";
+import "../interfaces/lqdrfarm.sol";
+import "../screampriceoracle.sol";
+
+/**
+ * WETHWFTMLINKScreamLqdrSpooky with the config passed in rather than
+ * hardcoded, so it can be deployed against the local stand-in chain
+ * (see scripts/local_chain.py).
+ */
+contract LocalScreamLqdrSpooky is CoreStrategy {
+    constructor(address _vault, CoreStrategyConfig memory _config)
+        public
+        CoreStrategy(_vault, _config)
+    {
+        // create a default oracle and set it
+        oracleA = new ScreamPriceOracle(
+            address(comptroller),
+            address(cTokenLend),
+            address(cTokenBorrowA)
+        );
+
+        // create a default oracle and set it
+        oracleB = new ScreamPriceOracle(
+            address(comptroller),
+            address(cTokenLend),
+            address(cTokenBorrowB)
+        );
+    }
+
+    function _farmPendingRewards(uint256 _pid, address _user)
+        internal
+        view
+        override
+        returns (uint256)
+    {
+        return LqdrFarm(address(farm)).pendingLqdr(_pid, _user);
+    }
+
+    function _depoistLp() internal override {
+        uint256 lpBalance = shortAshortBLP.balanceOf(address(this));
+        LqdrFarm(address(farm)).deposit(farmPid, lpBalance, address(this));
+    }
+
+    function _withdrawFarm(uint256 _amount) internal override {
+        LqdrFarm(address(farm)).withdraw(farmPid, _amount, address(this));
+    }
+
+    function claimHarvest() internal override {
+        LqdrFarm(address(farm)).harvest(farmPid, address(this));
+    }
+}
@@ -0,0 +1,290 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity ^0.6.12;
+
+import {ERC20} from "@openzeppelin/contracts/token/ERC20/ERC20.sol";
+import {
+    SafeERC20,
+    SafeMath,
+    IERC20
+} from "@openzeppelin/contracts/token/ERC20/SafeERC20.sol";
+
+interface IMockComptroller {
+    function borrowAllowed(
+        address cToken,
+        address borrower,
+        uint256 borrowAmount
+    ) external returns (uint256);
+
+    function redeemAllowed(
+        address cToken,
+        address redeemer,
+        uint256 redeemTokens
+    ) external returns (uint256);
+}
+
+/**
+ * Compound style lending market (CErc20 with a collateral cap view) for the
+ * local stand-in chain. Interest accrues at a fixed `borrowRatePerBlock` using
+ * Compound's borrow index maths, and there are no reserves. Failed actions
+ * revert rather than returning Compound error codes.
+ */
+contract MockCToken is ERC20 {
+    using SafeMath for uint256;
+    using SafeERC20 for IERC20;
+
+    struct BorrowSnapshot {
+        uint256 principal;
+        uint256 interestIndex;
+    }
+
+    address public underlying;
+    address public comptroller;
+    uint256 public initialExchangeRateMantissa;
+    uint256 public borrowRatePerBlock;
+    uint256 public accrualBlockNumber;
+    uint256 public borrowIndex;
+    uint256 public totalBorrows;
+    uint256 public totalReserves;
+    uint256 public collateralCap;
+    // no share of the interest goes to reserves
+    uint256 public constant reserveFactorMantissa = 0;
+    mapping(address => BorrowSnapshot) internal accountBorrows;
+
+    event AccrueInterest(
+        uint256 cashPrior,
+        uint256 interestAccumulated,
+        uint256 borrowIndex,
+        uint256 totalBorrows
+    );
+    event Mint(address minter, uint256 mintAmount, uint256 mintTokens);
+    event Redeem(address redeemer, uint256 redeemAmount, uint256 redeemTokens);
+    event Borrow(
+        address borrower,
+        uint256 borrowAmount,
+        uint256 accountBorrows,
+        uint256 totalBorrows
+    );
+    event RepayBorrow(
+        address payer,
+        address borrower,
+        uint256 repayAmount,
+        uint256 accountBorrows,
+        uint256 totalBorrows
+    );
+
+    constructor(
+        address _underlying,
+        address _comptroller,
+        uint256 _initialExchangeRateMantissa,
+        uint256 _borrowRatePerBlock,
+        string memory _name,
+        string memory _symbol
+    ) public ERC20(_name, _symbol) {
+        _setupDecimals(8);
+        underlying = _underlying;
+        comptroller = _comptroller;
+        initialExchangeRateMantissa = _initialExchangeRateMantissa;
+        borrowRatePerBlock = _borrowRatePerBlock;
+        accrualBlockNumber = block.number;
+        borrowIndex = 1e18;
+    }
+
+    function setBorrowRatePerBlock(uint256 _borrowRatePerBlock) external {
+        accrueInterest();
+        borrowRatePerBlock = _borrowRatePerBlock;
+    }
+
+    function getCash() public view returns (uint256) {
+        return IERC20(underlying).balanceOf(address(this));
+    }
+
+    function totalCollateralTokens() external view returns (uint256) {
+        return totalSupply();
+    }
+
+    function accountCollateralTokens(address account)
+        external
+        view
+        returns (uint256)
+    {
+        return balanceOf(account);
+    }
+
+    function accrueInterest() public returns (uint256) {
+        uint256 blockDelta = block.number.sub(accrualBlockNumber);
+        if (blockDelta == 0) {
+            return 0;
+        }
+        uint256 simpleInterestFactor = borrowRatePerBlock.mul(blockDelta);
+        uint256 interestAccumulated =
+            simpleInterestFactor.mul(totalBorrows).div(1e18);
+        totalBorrows = totalBorrows.add(interestAccumulated);
+        borrowIndex = borrowIndex.add(
+            simpleInterestFactor.mul(borrowIndex).div(1e18)
+        );
+        accrualBlockNumber = block.number;
+        emit AccrueInterest(
+            getCash(),
+            interestAccumulated,
+            borrowIndex,
+            totalBorrows
+        );
+        return 0;
+    }
+
+    function exchangeRateStored() public view returns (uint256) {
+        uint256 _totalSupply = totalSupply();
+        if (_totalSupply == 0) {
+            return initialExchangeRateMantissa;
+        }
+        return
+            getCash().add(totalBorrows).sub(totalReserves).mul(1e18).div(
+                _totalSupply
+            );
+    }
+
+    function exchangeRateCurrent() external returns (uint256) {
+        accrueInterest();
+        return exchangeRateStored();
+    }
+
+    function borrowBalanceStored(address account)
+        public
+        view
+        returns (uint256)
+    {
+        BorrowSnapshot storage snapshot = accountBorrows[account];
+        if (snapshot.principal == 0) {
+            return 0;
+        }
+        return snapshot.principal.mul(borrowIndex).div(snapshot.interestIndex);
+    }
+
+    function borrowBalanceCurrent(address account) external returns (uint256) {
+        accrueInterest();
+        return borrowBalanceStored(account);
+    }
+
+    function totalBorrowsCurrent() external returns (uint256) {
+        accrueInterest();
+        return totalBorrows;
+    }
+
+    function balanceOfUnderlying(address owner) external returns (uint256) {
+        accrueInterest();
+        return balanceOf(owner).mul(exchangeRateStored()).div(1e18);
+    }
+
+    function getAccountSnapshot(address account)
+        external
+        view
+        returns (
+            uint256,
+            uint256,
+            uint256,
+            uint256
+        )
+    {
+        return (
+            0,
+            balanceOf(account),
+            borrowBalanceStored(account),
+            exchangeRateStored()
+        );
+    }
+
+    function mint(uint256 mintAmount) external returns (uint256) {
+        accrueInterest();
+        uint256 rate = exchangeRateStored();
+        IERC20(underlying).safeTransferFrom(
+            msg.sender,
+            address(this),
+            mintAmount
+        );
+        uint256 mintTokens = mintAmount.mul(1e18).div(rate);
+        _mint(msg.sender, mintTokens);
+        emit Mint(msg.sender, mintAmount, mintTokens);
+        return 0;
+    }
+
+    function redeem(uint256 redeemTokens) external returns (uint256) {
+        accrueInterest();
+        uint256 redeemAmount =
+            redeemTokens.mul(exchangeRateStored()).div(1e18);
+        _redeem(redeemTokens, redeemAmount);
+        return 0;
+    }
+
+    function redeemUnderlying(uint256 redeemAmount) external returns (uint256) {
+        accrueInterest();
+        uint256 redeemTokens =
+            redeemAmount.mul(1e18).div(exchangeRateStored());
+        _redeem(redeemTokens, redeemAmount);
+        return 0;
+    }
+
+    function _redeem(uint256 redeemTokens, uint256 redeemAmount) internal {
+        IMockComptroller(comptroller).redeemAllowed(
+            address(this),
+            msg.sender,
+            redeemTokens
+        );
+        require(getCash() >= redeemAmount, "insufficient cash");
+        _burn(msg.sender, redeemTokens);
+        IERC20(underlying).safeTransfer(msg.sender, redeemAmount);
+        emit Redeem(msg.sender, redeemAmount, redeemTokens);
+    }
+
+    function borrow(uint256 borrowAmount) external returns (uint256) {
+        accrueInterest();
+        IMockComptroller(comptroller).borrowAllowed(
+            address(this),
+            msg.sender,
+            borrowAmount
+        );
+        require(getCash() >= borrowAmount, "insufficient cash");
+
+        uint256 accountBorrowsNew =
+            borrowBalanceStored(msg.sender).add(borrowAmount);
+        accountBorrows[msg.sender] = BorrowSnapshot(
+            accountBorrowsNew,
+            borrowIndex
+        );
+        totalBorrows = totalBorrows.add(borrowAmount);
+
+        IERC20(underlying).safeTransfer(msg.sender, borrowAmount);
+        emit Borrow(msg.sender, borrowAmount, accountBorrowsNew, totalBorrows);
+        return 0;
+    }
+
+    function repayBorrow(uint256 repayAmount) external returns (uint256) {
+        accrueInterest();
+        uint256 accountBorrowsPrev = borrowBalanceStored(msg.sender);
+        if (repayAmount == uint256(-1)) {
+            repayAmount = accountBorrowsPrev;
+        }
+        IERC20(underlying).safeTransferFrom(
+            msg.sender,
+            address(this),
+            repayAmount
+        );
+
+        uint256 accountBorrowsNew = accountBorrowsPrev.sub(repayAmount);
+        accountBorrows[msg.sender] = BorrowSnapshot(
+            accountBorrowsNew,
+            borrowIndex
+        );
+        // the sum of account borrows can round above totalBorrows
+        totalBorrows = totalBorrows > repayAmount
+            ? totalBorrows - repayAmount
+            : 0;
+        emit RepayBorrow(
+            msg.sender,
+            msg.sender,
+            repayAmount,
+            accountBorrowsNew,
+            totalBorrows
+        );
+        return 0;
+    }
+}
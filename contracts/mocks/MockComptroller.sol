@@ -0,0 +1,190 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity ^0.6.12;
+
+import {SafeMath} from "@openzeppelin/contracts/math/SafeMath.sol";
+import "../interfaces/comppriceoracle.sol";
+
+interface IMockCToken {
+    function getAccountSnapshot(address account)
+        external
+        view
+        returns (
+            uint256,
+            uint256,
+            uint256,
+            uint256
+        );
+}
+
+/**
+ * Compound style comptroller for the local stand-in chain. It keeps the market
+ * list, collateral factors and the price oracle, and enforces the account
+ * liquidity check on borrows and redeems. Failed checks revert rather than
+ * returning Compound error codes.
+ */
+contract MockComptroller {
+    using SafeMath for uint256;
+
+    struct Market {
+        bool isListed;
+        uint256 collateralFactorMantissa;
+        bool isComped;
+    }
+
+    address public admin;
+    address public oracle;
+    mapping(address => Market) public markets;
+    mapping(address => mapping(address => bool)) public accountMembership;
+    address[] public allMarkets;
+
+    constructor(address _oracle) public {
+        admin = msg.sender;
+        oracle = _oracle;
+    }
+
+    function _setPriceOracle(address _oracle) external returns (uint256) {
+        require(msg.sender == admin, "!admin");
+        oracle = _oracle;
+        return 0;
+    }
+
+    function _supportMarket(address cToken, uint256 collateralFactorMantissa)
+        external
+        returns (uint256)
+    {
+        require(msg.sender == admin, "!admin");
+        require(!markets[cToken].isListed, "listed");
+        markets[cToken] = Market(true, collateralFactorMantissa, false);
+        allMarkets.push(cToken);
+        return 0;
+    }
+
+    function getAllMarkets() external view returns (address[] memory) {
+        return allMarkets;
+    }
+
+    function enterMarkets(address[] calldata cTokens)
+        external
+        returns (uint256[] memory results)
+    {
+        results = new uint256[](cTokens.length);
+        for (uint256 i = 0; i < cTokens.length; i++) {
+            require(markets[cTokens[i]].isListed, "!listed");
+            accountMembership[cTokens[i]][msg.sender] = true;
+        }
+    }
+
+    function checkMembership(address account, address cToken)
+        external
+        view
+        returns (bool)
+    {
+        return accountMembership[cToken][account];
+    }
+
+    /**
+     * Liquidity of `account` after redeeming `redeemTokens` of and borrowing
+     * `borrowAmount` from `cTokenModify`, in oracle units.
+     */
+    function getHypotheticalAccountLiquidity(
+        address account,
+        address cTokenModify,
+        uint256 redeemTokens,
+        uint256 borrowAmount
+    )
+        public
+        view
+        returns (
+            uint256,
+            uint256,
+            uint256
+        )
+    {
+        uint256 sumCollateral;
+        uint256 sumBorrowPlusEffects;
+
+        for (uint256 i = 0; i < allMarkets.length; i++) {
+            address cToken = allMarkets[i];
+            (, uint256 cTokenBalance, uint256 borrowBalance, uint256 rate) =
+                IMockCToken(cToken).getAccountSnapshot(account);
+            uint256 price = ICompPriceOracle(oracle).getUnderlyingPrice(cToken);
+            require(price != 0, "!price");
+
+            if (accountMembership[cToken][account]) {
+                sumCollateral = sumCollateral.add(
+                    cTokenBalance
+                        .mul(rate)
+                        .div(1e18)
+                        .mul(markets[cToken].collateralFactorMantissa)
+                        .div(1e18)
+                        .mul(price)
+                        .div(1e18)
+                );
+            }
+            sumBorrowPlusEffects = sumBorrowPlusEffects.add(
+                borrowBalance.mul(price).div(1e18)
+            );
+
+            if (cToken == cTokenModify) {
+                sumBorrowPlusEffects = sumBorrowPlusEffects.add(
+                    redeemTokens
+                        .mul(rate)
+                        .div(1e18)
+                        .mul(markets[cToken].collateralFactorMantissa)
+                        .div(1e18)
+                        .mul(price)
+                        .div(1e18)
+                );
+                sumBorrowPlusEffects = sumBorrowPlusEffects.add(
+                    borrowAmount.mul(price).div(1e18)
+                );
+            }
+        }
+
+        if (sumCollateral > sumBorrowPlusEffects) {
+            return (0, sumCollateral - sumBorrowPlusEffects, 0);
+        }
+        return (0, 0, sumBorrowPlusEffects - sumCollateral);
+    }
+
+    function getAccountLiquidity(address account)
+        external
+        view
+        returns (
+            uint256,
+            uint256,
+            uint256
+        )
+    {
+        return getHypotheticalAccountLiquidity(account, address(0), 0, 0);
+    }
+
+    function borrowAllowed(
+        address cToken,
+        address borrower,
+        uint256 borrowAmount
+    ) external returns (uint256) {
+        require(markets[cToken].isListed, "!listed");
+        (, , uint256 shortfall) =
+            getHypotheticalAccountLiquidity(borrower, cToken, 0, borrowAmount);
+        require(shortfall == 0, "insufficient liquidity");
+        return 0;
+    }
+
+    function redeemAllowed(
+        address cToken,
+        address redeemer,
+        uint256 redeemTokens
+    ) external returns (uint256) {
+        require(markets[cToken].isListed, "!listed");
+        if (!accountMembership[cToken][redeemer]) {
+            return 0;
+        }
+        (, , uint256 shortfall) =
+            getHypotheticalAccountLiquidity(redeemer, cToken, redeemTokens, 0);
+        require(shortfall == 0, "insufficient liquidity");
+        return 0;
+    }
+
+    function claimComp(address holder) external {}
+}
@@ -0,0 +1,210 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity ^0.6.12;
+
+import {
+    SafeERC20,
+    SafeMath,
+    IERC20
+} from "@openzeppelin/contracts/token/ERC20/SafeERC20.sol";
+
+interface IMintable {
+    function mint(address _to, uint256 _amount) external;
+}
+
+/**
+ * Reward farm for the local stand-in chain. It serves both farm APIs used by
+ * the entry contracts:
+ *  - MasterChef (Spooky): deposit/withdraw(pid, amount) pay out pending rewards
+ *  - MiniChef (Lqdr): deposit/withdraw(pid, amount, to) only accrue rewards,
+ *    which are paid out by harvest(pid, to)
+ * Rewards are minted from `rewardToken` at `rewardPerBlock` per pool.
+ */
+contract MockMasterChef {
+    using SafeMath for uint256;
+    using SafeERC20 for IERC20;
+
+    struct PoolInfo {
+        IERC20 lpToken;
+        uint256 lastRewardBlock;
+        uint256 accRewardPerShare;
+    }
+
+    struct UserInfo {
+        uint256 amount;
+        uint256 rewardDebt;
+        uint256 accrued;
+    }
+
+    IMintable public rewardToken;
+    uint256 public rewardPerBlock;
+    PoolInfo[] public poolInfo;
+    mapping(uint256 => mapping(address => UserInfo)) internal users;
+
+    event Deposit(address indexed user, uint256 indexed pid, uint256 amount);
+    event Withdraw(address indexed user, uint256 indexed pid, uint256 amount);
+    event Harvest(address indexed user, uint256 indexed pid, uint256 amount);
+
+    constructor(address _rewardToken, uint256 _rewardPerBlock) public {
+        rewardToken = IMintable(_rewardToken);
+        rewardPerBlock = _rewardPerBlock;
+    }
+
+    function poolLength() external view returns (uint256) {
+        return poolInfo.length;
+    }
+
+    function add(address _lpToken) external returns (uint256) {
+        poolInfo.push(PoolInfo(IERC20(_lpToken), block.number, 0));
+        return poolInfo.length - 1;
+    }
+
+    function userInfo(uint256 _pid, address _user)
+        external
+        view
+        returns (uint256 amount, int256 rewardDebt)
+    {
+        UserInfo storage user = users[_pid][_user];
+        return (user.amount, int256(user.rewardDebt));
+    }
+
+    function pending(uint256 _pid, address _user)
+        public
+        view
+        returns (uint256)
+    {
+        PoolInfo storage pool = poolInfo[_pid];
+        UserInfo storage user = users[_pid][_user];
+        uint256 accRewardPerShare = pool.accRewardPerShare;
+        uint256 lpSupply = pool.lpToken.balanceOf(address(this));
+        if (block.number > pool.lastRewardBlock && lpSupply != 0) {
+            uint256 reward =
+                block.number.sub(pool.lastRewardBlock).mul(rewardPerBlock);
+            accRewardPerShare = accRewardPerShare.add(
+                reward.mul(1e12).div(lpSupply)
+            );
+        }
+        return
+            user.amount.mul(accRewardPerShare).div(1e12).sub(user.rewardDebt).add(
+                user.accrued
+            );
+    }
+
+    function pendingBOO(uint256 _pid, address _user)
+        external
+        view
+        returns (uint256)
+    {
+        return pending(_pid, _user);
+    }
+
+    function pendingLqdr(uint256 _pid, address _user)
+        external
+        view
+        returns (uint256)
+    {
+        return pending(_pid, _user);
+    }
+
+    function updatePool(uint256 _pid) public {
+        PoolInfo storage pool = poolInfo[_pid];
+        if (block.number <= pool.lastRewardBlock) {
+            return;
+        }
+        uint256 lpSupply = pool.lpToken.balanceOf(address(this));
+        if (lpSupply != 0) {
+            uint256 reward =
+                block.number.sub(pool.lastRewardBlock).mul(rewardPerBlock);
+            rewardToken.mint(address(this), reward);
+            pool.accRewardPerShare = pool.accRewardPerShare.add(
+                reward.mul(1e12).div(lpSupply)
+            );
+        }
+        pool.lastRewardBlock = block.number;
+    }
+
+    function deposit(uint256 _pid, uint256 _amount) external {
+        _deposit(_pid, _amount, msg.sender);
+        _harvest(_pid, msg.sender, msg.sender);
+    }
+
+    function withdraw(uint256 _pid, uint256 _amount) external {
+        _withdraw(_pid, _amount, msg.sender);
+        _harvest(_pid, msg.sender, msg.sender);
+    }
+
+    function deposit(
+        uint256 _pid,
+        uint256 _amount,
+        address _to
+    ) external {
+        _deposit(_pid, _amount, _to);
+    }
+
+    function withdraw(
+        uint256 _pid,
+        uint256 _amount,
+        address _to
+    ) external {
+        _withdraw(_pid, _amount, _to);
+    }
+
+    function harvest(uint256 _pid, address _to) external {
+        updatePool(_pid);
+        _checkpoint(_pid, msg.sender);
+        _harvest(_pid, msg.sender, _to);
+    }
+
+    function _checkpoint(uint256 _pid, address _user) internal {
+        UserInfo storage user = users[_pid][_user];
+        uint256 acc = poolInfo[_pid].accRewardPerShare;
+        user.accrued = user.accrued.add(
+            user.amount.mul(acc).div(1e12).sub(user.rewardDebt)
+        );
+        user.rewardDebt = user.amount.mul(acc).div(1e12);
+    }
+
+    function _deposit(
+        uint256 _pid,
+        uint256 _amount,
+        address _to
+    ) internal {
+        updatePool(_pid);
+        _checkpoint(_pid, _to);
+        PoolInfo storage pool = poolInfo[_pid];
+        UserInfo storage user = users[_pid][_to];
+        pool.lpToken.safeTransferFrom(msg.sender, address(this), _amount);
+        user.amount = user.amount.add(_amount);
+        user.rewardDebt = user.amount.mul(pool.accRewardPerShare).div(1e12);
+        emit Deposit(_to, _pid, _amount);
+    }
+
+    function _withdraw(
+        uint256 _pid,
+        uint256 _amount,
+        address _to
+    ) internal {
+        updatePool(_pid);
+        _checkpoint(_pid, msg.sender);
+        PoolInfo storage pool = poolInfo[_pid];
+        UserInfo storage user = users[_pid][msg.sender];
+        require(user.amount >= _amount, "withdraw: not good");
+        user.amount = user.amount.sub(_amount);
+        user.rewardDebt = user.amount.mul(pool.accRewardPerShare).div(1e12);
+        pool.lpToken.safeTransfer(_to, _amount);
+        emit Withdraw(msg.sender, _pid, _amount);
+    }
+
+    function _harvest(
+        uint256 _pid,
+        address _user,
+        address _to
+    ) internal {
+        UserInfo storage user = users[_pid][_user];
+        uint256 amount = user.accrued;
+        user.accrued = 0;
+        if (amount > 0) {
+            IERC20(address(rewardToken)).safeTransfer(_to, amount);
+        }
+        emit Harvest(_user, _pid, amount);
+    }
+}
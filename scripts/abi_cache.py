@@ -0,0 +1,124 @@
+"""
+On-disk cache of the ABIs behind `Contract(address)` lookups.
+
+With `autofetch_sources` a cold `Contract(address)` asks the block explorer for
+the source, which is slow and rate limited. `cached_contract` resolves the ABI
+from `~/.brownie/abi_cache` instead and only falls back to `Contract` on a
+miss. ABIs are stored once under the sha256 of their JSON, since most addresses
+share one (tokens, pairs), and indexed by chain id and address:
+
+    abi_cache/abis/<sha256>.json
+    abi_cache/<chain id>/<address>.json  ->  {"name": ..., "abi": <sha256>}
+
+Forks are keyed by the chain id of the network they fork, so a cache seeded
+against Fantom mainnet serves `ftm-main-fork`. To seed it with every address
+in `STRATEGY_CONFIG` and the routers' factories:
+
+    brownie run abi_cache --network ftm-main
+"""
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from brownie import Contract, web3
+from brownie._config import CONFIG
+
+from scripts.strategy_config import STRATEGY_CONFIG
+
+CACHE_DIR = Path(os.getenv("ABI_CACHE_DIR", Path.home() / ".brownie" / "abi_cache"))
+
+SPIRIT_ROUTER = "0x16327E3FbDaCA3bcF7E38F5Af2599D2DDc33aE52"
+
+# (chain id, address) -> (name, abi), so repeat lookups skip the disk too
+_abis = {}
+
+
+def chain_id() -> int:
+    active_network = CONFIG.active_network
+    fork = active_network.get("cmd_settings", {}).get("fork")
+    if fork in CONFIG.networks:
+        return int(CONFIG.networks[fork]["chainid"])
+    if "chainid" in active_network:
+        return int(active_network["chainid"])
+    return web3.chain_id
+
+
+def _write(path: Path, data):
+    # write then rename, so parallel test workers never read a partial file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w") as fp:
+        json.dump(data, fp)
+    os.replace(tmp, path)
+
+
+def _index_path(address: str) -> Path:
+    return CACHE_DIR / str(chain_id()) / f"{address}.json"
+
+
+def load_abi(address: str):
+    """Return `(name, abi)` for `address` from the cache, or `None`."""
+    try:
+        entry = json.loads(_index_path(address).read_text())
+        abi = json.loads((CACHE_DIR / "abis" / f"{entry['abi']}.json").read_text())
+    except (OSError, ValueError, KeyError):
+        return None
+    return entry["name"], abi
+
+
+def store_abi(address: str, name: str, abi):
+    encoded = json.dumps(abi, sort_keys=True, separators=(",", ":"))
+    digest = hashlib.sha256(encoded.encode()).hexdigest()
+    abi_path = CACHE_DIR / "abis" / f"{digest}.json"
+    if not abi_path.exists():
+        _write(abi_path, abi)
+    _write(_index_path(address), {"name": name, "abi": digest})
+
+
+def cached_contract(address, owner=None) -> Contract:
+    """
+    `Contract(address)`, resolved from the on-disk cache where possible.
+    Misses are fetched as usual and added to the cache.
+    """
+    address = web3.toChecksumAddress(str(address))
+    key = (chain_id(), address)
+    if key not in _abis:
+        cached = load_abi(address)
+        if cached is None:
+            contract = Contract(address)
+            cached = contract._name, contract.abi
+            store_abi(address, *cached)
+        _abis[key] = cached
+    name, abi = _abis[key]
+    return Contract.from_abi(name, address, abi, owner=owner, persist=False)
+
+
+def config_addresses():
+    """Every contract address the entry contracts and tests resolve."""
+    addresses = {SPIRIT_ROUTER}
+    for config in STRATEGY_CONFIG.values():
+        addresses.update(value for value in config if isinstance(value, str))
+    return sorted(addresses)
+
+
+def seed(addresses) -> int:
+    """Fill the cache for `addresses`, skipping any the explorer can't resolve."""
+    seeded = 0
+    for address in addresses:
+        try:
+            cached_contract(address)
+        except Exception as e:
+            print(f"{address}: skipped ({e})")
+            continue
+        seeded += 1
+    return seeded
+
+
+def main():
+    addresses = config_addresses()
+    routers = {config.router for config in STRATEGY_CONFIG.values()} | {SPIRIT_ROUTER}
+    seeded = seed(addresses)
+    seeded += seed(sorted({cached_contract(router).factory() for router in routers}))
+    print(f"Cached {seeded} ABIs for chain {chain_id()} in {CACHE_DIR}")
@@ -0,0 +1,214 @@
+"""
+Archive the history of CoreStrategy views in a columnar store.
+
+`backfill` samples every `step`th block of a range with `read_snapshot`, and
+writes the debt ratios, collateral ratio, assets, lend and debt balances,
+vault debt, oracle prices and the reserves of both pairs (see `COLUMNS`).
+Files are partitioned by strategy and UTC day, hive style, as Parquet or
+Arrow IPC:
+
+    reports/archive/strategy=<address>/date=2022-01-31/<start>-<end>.parquet
+
+with `start` and `end` zero-padded, so the files sort in block order.
+
+Work is split into chunks of `CHUNK_BLOCKS` aligned blocks, read by a pool of
+worker processes. Brownie's multicall patches `ContractCall` for the whole
+process, so snapshots are never read from threads: every worker is forked
+with the project loaded and opens its own connection to the node.
+
+A chunk's files are never rewritten once it is marked done, so an interrupted
+backfill picks up where it stopped and a longer range only reads the new
+chunks:
+
+    brownie run archive main 30000000 31000000 WETHWFTMLINKScreamLqdrSpooky:<strategy> --network ftm-main
+
+Historical `eth_call`s need an archive node. Notebooks then load the
+history without one. Arrow IPC files are memory-mapped without a copy:
+
+    table = load(strategy, fmt="arrow")
+    df = table.to_pandas()
+
+Amounts are in wei, stored as exact `decimal128(38, 0)`, so cast them before
+doing float maths.
+"""
+import datetime
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from brownie import multicall, web3
+
+from scripts.atomic import atomic_path
+from scripts.snapshot import forget_reverted_multicall, read_snapshot
+from scripts.strategy_config import load_strategy
+
+ARCHIVE_DIR = Path(
+    os.getenv(
+        "STRATEGY_ARCHIVE_DIR", Path(__file__).parent.parent / "reports" / "archive"
+    )
+)
+
+# blocks per chunk, the unit of work and of resuming
+CHUNK_BLOCKS = 10_000
+DEFAULT_STEP = 100
+DEFAULT_WORKERS = 8
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+_WEI = pa.decimal128(38, 0)
+# column -> type, named after the `StrategySnapshot` fields they come from
+COLUMNS = {
+    "block_number": pa.int64(),
+    "timestamp": pa.timestamp("s", tz="UTC"),
+    "debt_ratio_a": pa.int64(),
+    "debt_ratio_b": pa.int64(),
+    "collateral": pa.int64(),
+    "estimated_total_assets": _WEI,
+    "balance_lend": _WEI,
+    "balance_debt": _WEI,
+    "total_debt": _WEI,
+    "price_a": _WEI,
+    "price_b": _WEI,
+    "short_a_in_lp": _WEI,
+    "short_b_in_lp": _WEI,
+    "want_in_lp": _WEI,
+    "short_a_in_lp_want": _WEI,
+}
+SCHEMA = pa.schema(list(COLUMNS.items()))
+
+
+def chunks(from_block, to_block) -> List[Tuple[int, int]]:
+    """
+    The aligned `[start, end)` chunks from the one holding `from_block` up to
+    the last one ending by `to_block`.
+    """
+    first = from_block - from_block % CHUNK_BLOCKS
+    return [
+        (start, start + CHUNK_BLOCKS)
+        for start in range(first, to_block - CHUNK_BLOCKS + 1, CHUNK_BLOCKS)
+    ]
+
+
+def strategy_dir(strategy, archive_dir=ARCHIVE_DIR) -> Path:
+    return Path(archive_dir) / f"strategy={strategy}"
+
+
+def _marker(strategy, start, end, step, archive_dir) -> Path:
+    return strategy_dir(strategy, archive_dir) / "_done" / f"{start}-{end}-{step}"
+
+
+def to_table(snapshots) -> pa.Table:
+    columns = {}
+    for name in COLUMNS:
+        values = [getattr(s, name) for s in snapshots]
+        if name == "timestamp":
+            values = [
+                datetime.datetime.fromtimestamp(v, datetime.timezone.utc)
+                for v in values
+            ]
+        columns[name] = values
+    return pa.Table.from_pydict(columns, schema=SCHEMA)
+
+
+def _write(path: Path, table: pa.Table, fmt):
+    with atomic_path(path) as tmp:
+        if fmt == "parquet":
+            pq.write_table(table, tmp)
+        else:
+            with pa.OSFile(str(tmp), "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+
+
+def write_chunk(strategy, start, end, table: pa.Table, fmt, archive_dir=ARCHIVE_DIR):
+    """Write `table`, the rows of one chunk, split by UTC day."""
+    days = [ts.date().isoformat() for ts in table.column("timestamp").to_pylist()]
+    for day in sorted(set(days)):
+        mask = pa.array([d == day for d in days])
+        path = (
+            strategy_dir(strategy, archive_dir)
+            / f"date={day}"
+            / f"{start:012d}-{end:012d}{FORMATS[fmt]}"
+        )
+        _write(path, table.filter(mask), fmt)
+
+
+def _connect_worker(endpoint):
+    # a forked worker must not share the parent's connection
+    web3.connect(endpoint)
+
+
+def _backfill_chunk(entry, start, end, step, fmt, archive_dir):
+    strategy = load_strategy(entry)
+    marker = _marker(strategy.address, start, end, step, archive_dir)
+    if marker.exists():
+        return 0
+    first = start + (-start % step)
+    snapshots = [read_snapshot(strategy, block) for block in range(first, end, step)]
+    write_chunk(strategy.address, start, end, to_table(snapshots), fmt, archive_dir)
+    marker.parent.mkdir(parents=True, exist_ok=True)
+    marker.touch()
+    return len(snapshots)
+
+
+def backfill(
+    strategies,
+    from_block,
+    to_block,
+    step=DEFAULT_STEP,
+    fmt="parquet",
+    workers=DEFAULT_WORKERS,
+    archive_dir=ARCHIVE_DIR,
+) -> int:
+    """
+    Archive every `step`th block of the `chunks(from_block, to_block)` of
+    each of `strategies`. Only whole chunks are archived, so the tail of the
+    range waits for a later run. Returns the rows written.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format {fmt}, expected one of {list(FORMATS)}")
+    if CHUNK_BLOCKS % step:
+        raise ValueError(f"step must divide {CHUNK_BLOCKS}")
+    tasks = [
+        (f"{s._name}:{s.address}", start, end, step, fmt, archive_dir)
+        for s in strategies
+        for start, end in chunks(from_block, to_block)
+    ]
+    if workers <= 1 or len(tasks) <= 1:
+        return sum(_backfill_chunk(*task) for task in tasks)
+    # on development networks Multicall2 is deployed here, once, rather than
+    # by every worker at once from the same account
+    forget_reverted_multicall()
+    with multicall():
+        pass
+    with ProcessPoolExecutor(
+        min(workers, len(tasks)),
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=_connect_worker,
+        initargs=(web3.provider.endpoint_uri,),
+    ) as pool:
+        return sum(pool.map(_backfill_chunk, *zip(*tasks)))
+
+
+def load(strategy, fmt="parquet", archive_dir=ARCHIVE_DIR) -> pa.Table:
+    """Every archived row of `strategy`, in block order, memory-mapped."""
+    files = sorted(strategy_dir(strategy, archive_dir).glob(f"date=*/*{FORMATS[fmt]}"))
+    tables = []
+    for path in files:
+        if fmt == "parquet":
+            tables.append(pq.read_table(path, memory_map=True, schema=SCHEMA))
+        else:
+            tables.append(pa.ipc.open_file(pa.memory_map(str(path))).read_all())
+    if not tables:
+        return SCHEMA.empty_table()
+    return pa.concat_tables(tables)
+
+
+def main(from_block, to_block, *strategies):
+    parsed = [load_strategy(entry) for entry in strategies]
+    rows = backfill(parsed, int(from_block), int(to_block))
+    print(f"archived {rows} rows to {ARCHIVE_DIR}")
@@ -0,0 +1,32 @@
+"""
+Files other processes read while the tooling rewrites them.
+
+A scrape of the price metrics or a notebook loading the archive must never
+see half a file, so writers go through `atomic_path`: the file is written
+under a temporary name next to it and renamed over it once complete.
+
+    with atomic_path(path) as tmp:
+        tmp.write_text(text)
+"""
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+
+@contextmanager
+def atomic_path(path) -> Iterator[Path]:
+    """
+    A temporary path to write `path` to. It replaces `path` when the block
+    exits cleanly and is removed when it raises.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # unique per process, so parallel writers never share a temporary file
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
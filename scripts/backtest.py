@@ -0,0 +1,400 @@
+"""
+Monte-Carlo backtester for the CoreStrategy rebalance thresholds.
+
+Replays price paths of shortA and shortB (in want) against a simplified model
+of the strategy and applies the contract's keeper and harvest rules:
+
+  - `_deploy`: lend the want and borrow `collatTarget / 2` of it in each short
+    token into the shortA/shortB LP
+  - `_rebalanceCollateralInternal` once `calcCollateral()` is at or outside
+    `collatLower`/`collatUpper`, removing or adding LP by the contract's
+    percent formulas
+  - `_rebalanceDebtInternal` once a debt ratio is above `debtUpper`: only
+    when the ratios differ by more than the 50 bps noise band, removing half
+    the difference in LP and swapping the other short token to repay
+  - on harvest, rewards are sold for the short token with the higher debt
+    ratio and `sellTradingFees` takes LP above both ratios' `debtLower` to
+    want, which is deployed again
+
+State is vectorised across paths with numpy, and chunks of paths run in
+parallel in a process pool. Amounts are floats in units of the initial
+deposit, and oracle prices are assumed to match the pools. The output is the
+distribution of IL, rebalance counts and gas across paths:
+
+    p_a, p_b = gbm_paths(10_000, 24 * 90)
+    result = run_backtest(Thresholds(), p_a, p_b)
+    print(result.summary())
+
+`rebalancePercent` is carried in `Thresholds` for completeness, but
+`_rebalanceDebtInternal` doesn't read it, so it doesn't change the results.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from types import MappingProxyType
+from typing import Dict, Mapping, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from scripts import gas
+from scripts.strategy_math import BASIS_PRECISION
+
+# `_rebalanceDebtInternal` only acts when the debt ratios differ by this much
+DEBT_NOISE = 50
+
+# rough gas per call, for when there's no gas baseline to draw on
+DEFAULT_GAS: Mapping[str, int] = MappingProxyType(
+    {
+        "harvest": 1_500_000,
+        "rebalanceDebt": 900_000,
+        "rebalanceCollateral": 800_000,
+    }
+)
+
+
+class Thresholds(NamedTuple):
+    """Strategy thresholds, in BASIS_PRECISION, defaulting to the contract's."""
+
+    collat_lower: int = 4500
+    collat_target: int = 5000
+    collat_upper: int = 5500
+    debt_lower: int = 9900
+    debt_upper: int = 10200
+    rebalance_percent: int = 10000
+
+
+class MarketParams(NamedTuple):
+    steps_per_year: int = 24 * 365
+    # LP trading fees and farm rewards, as APRs on the LP value
+    fee_apr: float = 0.10
+    reward_apr: float = 0.20
+    lend_apr: float = 0.01
+    borrow_apr_a: float = 0.03
+    borrow_apr_b: float = 0.03
+    swap_fee: float = 0.002
+    # want value of each side of the pools swapped through, in deposits
+    pool_depth: float = 1000.0
+    harvest_every: int = 24
+    # steps between keeper checks of the rebalance triggers
+    check_every: int = 1
+    # gas per call, DEFAULT_GAS for any call left out
+    gas_units: Optional[Dict[str, int]] = None
+    # want per unit of gas, in deposits, to price the gas spend. The threshold
+    # optimiser requires it, as without it gas never counts against a threshold
+    gas_price: float = 0.0
+
+    @property
+    def gas_per_call(self) -> Dict[str, int]:
+        return {**DEFAULT_GAS, **(self.gas_units or {})}
+
+
+class BacktestResult(NamedTuple):
+    """Per path outcomes, all as arrays over the simulated paths."""
+
+    pnl: np.ndarray  # (final value - deposit) / deposit
+    il: np.ndarray  # the part of pnl from price moves, net of income and swaps
+    income: np.ndarray  # fees, rewards and net interest, per deposit
+    swap_cost: np.ndarray  # fees and price impact of every swap, per deposit
+    rebalance_debt: np.ndarray
+    rebalance_collateral: np.ndarray
+    harvests: np.ndarray
+    gas_used: np.ndarray
+    gas_cost: np.ndarray  # gas_used priced at MarketParams.gas_price
+
+    def summary(self, percentiles: Sequence[int] = (5, 50, 95)) -> Dict[str, dict]:
+        """Mean and percentiles of every field across paths."""
+        out = {}
+        for field, values in self._asdict().items():
+            stats = {"mean": float(np.mean(values))}
+            for q in percentiles:
+                stats[f"p{q}"] = float(np.percentile(values, q))
+            out[field] = stats
+        return out
+
+    @classmethod
+    def concat(cls, results):
+        return cls(*(np.concatenate(values) for values in zip(*results)))
+
+
+def gas_units_from_baseline(strategy: str) -> Dict[str, int]:
+    """Gas per call from the stored gas baseline, falling back to DEFAULT_GAS."""
+    baseline = gas.load_baseline().get(strategy, {})
+    return {path: baseline.get(path, units) for path, units in DEFAULT_GAS.items()}
+
+
+def gbm_paths(
+    n_paths,
+    n_steps,
+    vol_a=0.8,
+    vol_b=0.8,
+    corr=0.7,
+    drift_a=0.0,
+    drift_b=0.0,
+    steps_per_year=24 * 365,
+    seed=None,
+):
+    """
+    Correlated geometric Brownian motion paths for the shortA and shortB
+    prices in want, each of shape (n_paths, n_steps + 1) and starting at 1.
+    """
+    rng = np.random.default_rng(seed)
+    dt = 1 / steps_per_year
+    z_a = rng.standard_normal((n_paths, n_steps))
+    z_b = corr * z_a + np.sqrt(1 - corr ** 2) * rng.standard_normal((n_paths, n_steps))
+
+    def _path(z, vol, drift):
+        steps = (drift - vol ** 2 / 2) * dt + vol * np.sqrt(dt) * z
+        log_path = np.concatenate([np.zeros((n_paths, 1)), np.cumsum(steps, axis=1)], 1)
+        return np.exp(log_path)
+
+    return _path(z_a, vol_a, drift_a), _path(z_b, vol_b, drift_b)
+
+
+def historical_paths(prices_a, prices_b, window, stride=1):
+    """
+    Slice price histories of shortA and shortB (in want, one price per step)
+    into overlapping windows of `window` steps, each rescaled to start at 1.
+    """
+    prices_a = np.asarray(prices_a, dtype=float)
+    prices_b = np.asarray(prices_b, dtype=float)
+    starts = range(0, len(prices_a) - window, stride)
+    p_a = np.stack([prices_a[s : s + window + 1] for s in starts])
+    p_b = np.stack([prices_b[s : s + window + 1] for s in starts])
+    return p_a / p_a[:, :1], p_b / p_b[:, :1]
+
+
+class _Book:
+    """The per path strategy balances, in units of the initial deposit."""
+
+    def __init__(self, n, thresholds: Thresholds, market: MarketParams):
+        self.t = thresholds
+        self.m = market
+        self.gas = market.gas_per_call
+        self.lend = np.zeros(n)
+        self.debt_a = np.zeros(n)
+        self.debt_b = np.zeros(n)
+        # LP liquidity, sqrt(shortA * shortB) of the strategy's share
+        self.liquidity = np.zeros(n)
+        self.bal_a = np.zeros(n)
+        self.bal_b = np.zeros(n)
+        self.bal_want = np.zeros(n)
+        self.rewards = np.zeros(n)
+        self.income = np.zeros(n)
+        self.swap_cost = np.zeros(n)
+        self.rebalance_debt = np.zeros(n, dtype=int)
+        self.rebalance_collateral = np.zeros(n, dtype=int)
+        self.harvests = np.zeros(n, dtype=int)
+        self.gas_used = np.zeros(n)
+
+    # LP token amounts at the pool price, which arbitrage keeps at the market
+    def lp_a(self, pa, pb):
+        return self.liquidity * np.sqrt(pb / pa)
+
+    def lp_b(self, pa, pb):
+        return self.liquidity * np.sqrt(pa / pb)
+
+    def debt_ratios(self, pa, pb):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio_a = self.debt_a * BASIS_PRECISION / self.lp_a(pa, pb)
+            ratio_b = self.debt_b * BASIS_PRECISION / self.lp_b(pa, pb)
+        return np.nan_to_num(ratio_a), np.nan_to_num(ratio_b)
+
+    def collateral(self, pa, pb):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = (self.debt_a * pa + self.debt_b * pb) * BASIS_PRECISION / self.lend
+        return np.nan_to_num(ratio)
+
+    def value(self, pa, pb):
+        return (
+            self.lend
+            + self.bal_want
+            + (self.lp_a(pa, pb) + self.bal_a - self.debt_a) * pa
+            + (self.lp_b(pa, pb) + self.bal_b - self.debt_b) * pb
+        )
+
+    def _swap(self, value_in):
+        """Want value out of a UniswapV2 swap of `value_in`, after fee and impact."""
+        after_fee = value_in * (1 - self.m.swap_fee)
+        out = after_fee * self.m.pool_depth / (self.m.pool_depth + after_fee)
+        self.swap_cost += value_in - out
+        return out
+
+    def deploy(self, amount, pa, pb):
+        borrow = amount * self.t.collat_target / BASIS_PRECISION / 2
+        borrow_a = borrow / pa
+        borrow_b = borrow / pb
+        self.lend += amount
+        self.debt_a += borrow_a
+        self.debt_b += borrow_b
+        self.liquidity += np.sqrt(borrow_a * borrow_b)
+
+    def remove_lp(self, percent, pa, pb):
+        removed = self.liquidity * percent / BASIS_PRECISION
+        self.liquidity -= removed
+        self.bal_a += removed * np.sqrt(pb / pa)
+        self.bal_b += removed * np.sqrt(pa / pb)
+
+    def repay(self):
+        repay_a = np.minimum(self.bal_a, self.debt_a)
+        repay_b = np.minimum(self.bal_b, self.debt_b)
+        self.debt_a -= repay_a
+        self.bal_a -= repay_a
+        self.debt_b -= repay_b
+        self.bal_b -= repay_b
+
+    def accrue(self, pa, pb):
+        dt = 1 / self.m.steps_per_year
+        lp_value = 2 * self.liquidity * np.sqrt(pa * pb)
+        interest = self.lend * self.m.lend_apr * dt
+        cost_a = self.debt_a * self.m.borrow_apr_a * dt
+        cost_b = self.debt_b * self.m.borrow_apr_b * dt
+        self.lend += interest
+        self.debt_a += cost_a
+        self.debt_b += cost_b
+        self.liquidity *= 1 + self.m.fee_apr * dt
+        rewards = lp_value * self.m.reward_apr * dt
+        self.rewards += rewards
+        self.income += (
+            interest + lp_value * (self.m.fee_apr + self.m.reward_apr) * dt
+        ) - (cost_a * pa + cost_b * pb)
+
+    def harvest(self, pa, pb):
+        ratio_a, ratio_b = self.debt_ratios(pa, pb)
+        # rewards are sold to the short token with the higher debt ratio
+        bought = self._swap(self.rewards)
+        self.bal_a += np.where(ratio_a > ratio_b, bought / pa, 0)
+        self.bal_b += np.where(ratio_a > ratio_b, 0, bought / pb)
+        self.rewards[:] = 0
+
+        # sellTradingFees
+        sell = (ratio_a < self.t.debt_lower) & (ratio_b < self.t.debt_lower)
+        percent = np.where(sell, BASIS_PRECISION - np.maximum(ratio_a, ratio_b), 0)
+        self.remove_lp(percent, pa, pb)
+        self.bal_want += self._swap(np.where(sell, self.bal_a * pa, 0))
+        self.bal_want += self._swap(np.where(sell, self.bal_b * pb, 0))
+        self.bal_a = np.where(sell, 0, self.bal_a)
+        self.bal_b = np.where(sell, 0, self.bal_b)
+        self.repay()
+
+        # adjustPosition deploys the want freed up
+        self.deploy(self.bal_want, pa, pb)
+        self.bal_want[:] = 0
+        self.harvests += 1
+        self.gas_used += self.gas["harvest"]
+
+    def check_collateral(self, pa, pb):
+        collat = self.collateral(pa, pb)
+        due = (collat <= self.t.collat_lower) | (collat >= self.t.collat_upper)
+        due &= self.liquidity > 0
+        target = self.t.collat_target
+        with np.errstate(divide="ignore", invalid="ignore"):
+            percent = np.nan_to_num(np.abs(collat - target) * BASIS_PRECISION / collat)
+        over = due & (collat > target)
+        under = due & (collat < target)
+        # over target: remove LP and repay
+        self.remove_lp(np.where(over, percent, 0), pa, pb)
+        self.repay()
+        # under target: borrow more of both into the LP
+        added = np.where(under, percent, 0) / BASIS_PRECISION
+        self.debt_a += self.lp_a(pa, pb) * added
+        self.debt_b += self.lp_b(pa, pb) * added
+        self.liquidity *= 1 + added
+        self.rebalance_collateral += due
+        self.gas_used += due * self.gas["rebalanceCollateral"]
+
+    def check_debt(self, pa, pb):
+        ratio_a, ratio_b = self.debt_ratios(pa, pb)
+        due = (ratio_a > self.t.debt_upper) | (ratio_b > self.t.debt_upper)
+        high_a = due & (ratio_a > ratio_b + DEBT_NOISE)
+        high_b = due & (ratio_b > ratio_a + DEBT_NOISE)
+        self.remove_lp(np.where(high_a, (ratio_a - ratio_b) / 2, 0), pa, pb)
+        self.remove_lp(np.where(high_b, (ratio_b - ratio_a) / 2, 0), pa, pb)
+        # swap the whole balance of the other short token and repay
+        to_a = self._swap(np.where(high_a, self.bal_b * pb, 0))
+        to_b = self._swap(np.where(high_b, self.bal_a * pa, 0))
+        self.bal_b = np.where(high_a, 0, self.bal_b)
+        self.bal_a = np.where(high_b, 0, self.bal_a)
+        self.bal_a += to_a / pa
+        self.bal_b += to_b / pb
+        self.repay()
+        self.rebalance_debt += due
+        self.gas_used += due * self.gas["rebalanceDebt"]
+
+
+def simulate(thresholds: Thresholds, p_a, p_b, market=MarketParams()) -> BacktestResult:
+    """Run one process's worth of paths, `p_a`/`p_b` of shape (paths, steps + 1)."""
+    p_a = np.asarray(p_a, dtype=float)
+    p_b = np.asarray(p_b, dtype=float)
+    n, steps = p_a.shape
+    book = _Book(n, thresholds, market)
+    book.deploy(np.ones(n), p_a[:, 0], p_b[:, 0])
+
+    for t in range(1, steps):
+        pa = p_a[:, t]
+        pb = p_b[:, t]
+        book.accrue(pa, pb)
+        if t % market.harvest_every == 0:
+            book.harvest(pa, pb)
+        if t % market.check_every == 0:
+            book.check_collateral(pa, pb)
+            book.check_debt(pa, pb)
+
+    pnl = book.value(p_a[:, -1], p_b[:, -1]) + book.rewards - 1
+    return BacktestResult(
+        pnl=pnl,
+        il=pnl - book.income + book.swap_cost,
+        income=book.income,
+        swap_cost=book.swap_cost,
+        rebalance_debt=book.rebalance_debt,
+        rebalance_collateral=book.rebalance_collateral,
+        harvests=book.harvests,
+        gas_used=book.gas_used,
+        gas_cost=book.gas_used * market.gas_price,
+    )
+
+
+def _simulate_chunk(args):
+    return simulate(*args)
+
+
+def _chunks(p_a, p_b, processes, chunk_size):
+    n = len(p_a)
+    if chunk_size is None:
+        chunk_size = max(1, -(-n // processes))
+    return [
+        (p_a[i : i + chunk_size], p_b[i : i + chunk_size])
+        for i in range(0, n, chunk_size)
+    ]
+
+
+def sweep(
+    threshold_sets, p_a, p_b, market=MarketParams(), processes=None, chunk_size=None
+) -> Dict[Thresholds, BacktestResult]:
+    """
+    Backtest every threshold set over the same paths. Each (threshold set,
+    chunk of paths) pair is one task for the process pool.
+    """
+    threshold_sets = list(threshold_sets)
+    processes = processes or os.cpu_count() or 1
+    chunks = _chunks(np.asarray(p_a), np.asarray(p_b), processes, chunk_size)
+    tasks = [(t, a, b, market) for t in threshold_sets for a, b in chunks]
+    if processes == 1:
+        results = [_simulate_chunk(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(processes) as pool:
+            results = list(pool.map(_simulate_chunk, tasks))
+    per_set = len(chunks)
+    return {
+        thresholds: BacktestResult.concat(results[i * per_set : (i + 1) * per_set])
+        for i, thresholds in enumerate(threshold_sets)
+    }
+
+
+def run_backtest(
+    thresholds: Thresholds,
+    p_a,
+    p_b,
+    market=MarketParams(),
+    processes=None,
+    chunk_size=None,
+) -> BacktestResult:
+    return sweep([thresholds], p_a, p_b, market, processes, chunk_size)[thresholds]
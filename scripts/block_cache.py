@@ -0,0 +1,71 @@
+"""
+Values read from chain, kept per block.
+
+A value read at a given block never changes, so whatever the tooling reads
+through a multicall pinned to a block can be kept by (block, key) and shared
+by every later read at that block. `BlockCache` keeps the `max_blocks` blocks
+used last, and is safe to share between threads. Subclasses decide what the
+keys are and how the values are read:
+
+    cache = BlockCache()
+    found = cache.get_many(block, keys)
+    cache.put_many(block, {key: read(key) for key in keys if key not in found})
+
+On development networks a block number can be mined again with a different
+state, so the cache drops the blocks a `chain.revert()` undoes and everything
+on `chain.reset()`.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable
+
+from brownie.network.state import _revert_register
+
+# blocks kept, least recently used are dropped
+DEFAULT_MAX_BLOCKS = 64
+
+
+class BlockCache:
+    def __init__(self, max_blocks=DEFAULT_MAX_BLOCKS):
+        self.max_blocks = max_blocks
+        # block -> key -> value, oldest use first
+        self._blocks: "OrderedDict[int, Dict[Hashable, object]]" = OrderedDict()
+        # keeper and monitor reads run on executor threads
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        _revert_register(self)
+
+    def get_many(self, block_number, keys: Iterable[Hashable]) -> dict:
+        """The cached values among `keys` at `block_number`."""
+        with self._lock:
+            cached = self._blocks.get(block_number)
+            if cached is None:
+                return {}
+            self._blocks.move_to_end(block_number)
+            found = {key: cached[key] for key in keys if key in cached}
+            self.hits += len(found)
+            return found
+
+    def put_many(self, block_number, values: dict):
+        """Keep `values`, read from chain at `block_number`."""
+        with self._lock:
+            self._blocks.setdefault(block_number, {}).update(values)
+            self._blocks.move_to_end(block_number)
+            self.misses += len(values)
+            while len(self._blocks) > self.max_blocks:
+                self._blocks.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
+
+    # called by brownie when the local chain is reverted or reset
+
+    def _revert(self, height):
+        with self._lock:
+            for block_number in [b for b in self._blocks if b > height]:
+                del self._blocks[block_number]
+
+    def _reset(self):
+        self.clear()
@@ -0,0 +1,181 @@
+"""
+Record the remote state a forked node reads, and serve it locally next time.
+
+A fork reads every account and storage slot it touches from the upstream RPC,
+one request at a time, which makes cold runs slow. `ForkStateProxy` sits
+between the forked node and the upstream. It answers the state reads the node
+makes at a fixed block (`eth_getStorageAt`, `eth_getCode`, `eth_getBalance`,
+`eth_getTransactionCount` and `eth_getBlockByNumber`) from a local state file
+loaded at start up, and forwards everything else, recording the answers. At
+the end of the session the new answers are merged back into the file.
+
+A run that only touches recorded slots makes no upstream requests at all. A
+run that forks a different block misses the file entirely, so pin the fork
+block (`fork: ftm-main@<block>`) to get the benefit across runs.
+
+The state is served through the proxy rather than written into the node with
+`evm_setAccountStorageAt` and friends, as `chain.reset()` reverts anything
+written into the node after launch. `install` points the fork at the proxy,
+and must run before brownie launches the node. `brownie test --fork-state`
+does this from `tests/conftest.py`.
+
+Files live in `~/.brownie/fork_state/<network>.json`, or `FORK_STATE_DIR`.
+"""
+import json
+import os
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional
+
+from brownie._config import CONFIG
+
+STATE_DIR = Path(os.getenv("FORK_STATE_DIR", Path.home() / ".brownie" / "fork_state"))
+
+# reads that only depend on their params once the block is fixed, and the
+# index of that block param
+STATE_METHODS = {
+    "eth_getStorageAt": 2,
+    "eth_getCode": 1,
+    "eth_getBalance": 1,
+    "eth_getTransactionCount": 1,
+    "eth_getBlockByNumber": 0,
+}
+_BLOCK_TAGS = ("latest", "pending", "earliest", "safe", "finalized")
+
+
+def state_key(method, params) -> Optional[str]:
+    """The key an answer is stored under, None if it isn't cacheable."""
+    index = STATE_METHODS.get(method)
+    if index is None or len(params) <= index:
+        return None
+    if str(params[index]).lower() in _BLOCK_TAGS:
+        return None
+    return json.dumps([method, [str(p).lower() for p in params]])
+
+
+class ForkStateProxy:
+    def __init__(self, upstream, path, host="127.0.0.1", port=0):
+        self.upstream = upstream
+        self.path = Path(path)
+        self.state: Dict[str, object] = {}
+        if self.path.exists():
+            self.state = json.loads(self.path.read_text())
+        self._recorded: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def save(self):
+        """Merge what was recorded into the state file."""
+        if not self._recorded:
+            return
+        state = {}
+        if self.path.exists():
+            # another process (eg an xdist worker) may have saved meanwhile
+            state = json.loads(self.path.read_text())
+        state.update(self._recorded)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(state, sort_keys=True))
+        os.replace(tmp, self.path)
+        self._recorded = {}
+
+    def _forward(self, requests):
+        body = json.dumps(requests).encode()
+        request = urllib.request.Request(
+            self.upstream, body, {"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+
+    def handle(self, payload):
+        """Answer one JSON-RPC request or batch."""
+        batch = payload if isinstance(payload, list) else [payload]
+        answers = {}
+        pending = []
+        for i, request in enumerate(batch):
+            key = state_key(request.get("method"), request.get("params", []))
+            if key is not None and key in self.state:
+                answers[i] = {
+                    "jsonrpc": "2.0",
+                    "id": request.get("id"),
+                    "result": self.state[key],
+                }
+            else:
+                pending.append((i, key, request))
+        with self._lock:
+            self.hits += len(answers)
+            self.misses += len(pending)
+        if pending:
+            forwarded = self._forward([request for _, _, request in pending])
+            if isinstance(forwarded, dict):
+                forwarded = [forwarded]
+            by_id = {answer.get("id"): answer for answer in forwarded}
+            for i, key, request in pending:
+                answer = by_id[request.get("id")]
+                answers[i] = answer
+                if key is not None and "result" in answer:
+                    with self._lock:
+                        self.state[key] = answer["result"]
+                        self._recorded[key] = answer["result"]
+        results = [answers[i] for i in range(len(batch))]
+        return results if isinstance(payload, list) else results[0]
+
+    def _handler(self):
+        proxy = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length))
+                body = json.dumps(proxy.handle(payload)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def install(network_id=None, state_dir=STATE_DIR) -> Optional[ForkStateProxy]:
+    """
+    Point the fork of `network_id` (default: the project's default network)
+    at a started `ForkStateProxy`, or return None if it isn't a fork. Must run
+    before the network connects.
+    """
+    if network_id is None:
+        network_id = CONFIG.settings["networks"]["default"]
+    settings = CONFIG.networks.get(network_id, {}).get("cmd_settings", {})
+    fork = settings.get("fork")
+    if not fork:
+        return None
+    fork, _, block = str(fork).partition("@")
+    upstream = CONFIG.networks[fork]["host"] if fork in CONFIG.networks else fork
+    proxy = ForkStateProxy(
+        os.path.expandvars(upstream), Path(state_dir) / f"{network_id}.json"
+    ).start()
+    settings["fork"] = f"{proxy.url}@{block}" if block else proxy.url
+    return proxy
@@ -0,0 +1,89 @@
+"""
+Gas results of the CoreStrategy benchmark suite (`tests/test_gas.py`).
+
+Each benchmark records the gas used by one strategy entry point under a path
+name, per entry contract. Results are written to `reports/gas/<strategy>.json`
+and compared against the baseline stored in `tests/gas_baseline.json`:
+
+    {"<entry contract>": {"<path>": <gas used>, ...}, ...}
+
+A path using more than `GAS_TOLERANCE` over its baseline is a regression. A
+path with no baseline can't be checked at all, `missing` lists those. To
+store the current results as the new baseline:
+
+    brownie test tests/test_gas.py --update-gas-baseline
+"""
+import json
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+BASELINE_PATH = Path(__file__).parent.parent / "tests" / "gas_baseline.json"
+REPORT_DIR = Path(__file__).parent.parent / "reports" / "gas"
+
+# relative increase over the baseline tolerated before flagging a regression
+GAS_TOLERANCE = 0.02
+
+
+class GasRegression(NamedTuple):
+    strategy: str
+    path: str
+    baseline: int
+    gas_used: int
+
+    @property
+    def increase(self) -> float:
+        return self.gas_used / self.baseline - 1
+
+    def __str__(self):
+        return (
+            f"{self.strategy} {self.path}: {self.gas_used} gas, "
+            f"{self.increase:+.1%} over the baseline of {self.baseline}"
+        )
+
+
+def load_baseline(path=BASELINE_PATH) -> Dict[str, Dict[str, int]]:
+    if not Path(path).exists():
+        return {}
+    return json.loads(Path(path).read_text())
+
+
+def update_baseline(results: Dict[str, Dict[str, int]], path=BASELINE_PATH):
+    """Merge `results` into the stored baseline, path by path."""
+    baseline = load_baseline(path)
+    for strategy, paths in results.items():
+        baseline.setdefault(strategy, {}).update(paths)
+    Path(path).write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+
+
+def write_report(strategy: str, results: Dict[str, int], report_dir=REPORT_DIR):
+    report_dir = Path(report_dir)
+    report_dir.mkdir(parents=True, exist_ok=True)
+    path = report_dir / f"{strategy}.json"
+    path.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+    return path
+
+
+def missing(results: Dict[str, Dict[str, int]], baseline) -> List[Tuple[str, str]]:
+    """The (strategy, path) of every result that has no baseline to check against."""
+    return [
+        (strategy, path)
+        for strategy, paths in results.items()
+        for path in paths
+        if not baseline.get(strategy, {}).get(path)
+    ]
+
+
+def regressions(
+    results: Dict[str, Dict[str, int]], baseline, tolerance=GAS_TOLERANCE
+) -> List[GasRegression]:
+    """
+    Every path in `results` more than `tolerance` over its baseline. Paths
+    with no baseline are not regressions, see `missing`.
+    """
+    found = []
+    for strategy, paths in results.items():
+        for path, gas_used in paths.items():
+            base = baseline.get(strategy, {}).get(path)
+            if base and gas_used > base * (1 + tolerance):
+                found.append(GasRegression(strategy, path, base, gas_used))
+    return found
@@ -0,0 +1,305 @@
+"""
+When a harvest pays for itself, and how often to harvest.
+
+`canHarvest` compares pending rewards to the hard coded `pendingFarmRewards`
+and `harvestTrigger` only waits out `maxReportDelay`. `plan_fleet` prices a
+harvest instead. For every strategy it reads, in one multicall for the whole
+fleet:
+
+  - the farm rewards waiting, `_farmPendingRewards` plus the farm token
+    already claimed, and the rate they built up at since the last report
+  - the reserves along the `getTokenOutPath` route `_harvestInternal` sells
+    them on, to shortA or shortB depending on the debt ratios
+  - what `sellTradingFees` would recover, the LP held over the larger debt
+    ratio when both are under `debtLower`
+  - the estimated assets, and shortA (WFTM, the gas token) priced in want
+
+A harvest every `t` seconds sells `rate * t` farm tokens, which is worth
+`value(t)` in want after the route's fees and price impact, for the gas of a
+harvest. Compounding that at every harvest gives a net APR of
+
+    (1 + (value(t) - gas) / assets) ** (year / t) - 1
+
+which is evaluated on a grid of intervals for all strategies at once, as
+one (strategies x intervals) array. Trading fees already compound inside the
+LP whenever they are harvested, so they count towards what a harvest now is
+worth but not towards the choice of interval. A strategy is due once it has
+waited out its best interval:
+
+    for plan in plan_fleet([strategy, ...]):
+        if plan.due:
+            ...  # harvest plan.strategy
+
+Harvest gas comes from the `harvest` benchmark in `tests/gas_baseline.json`
+when there is one.
+"""
+import time
+from typing import List, NamedTuple
+
+import numpy as np
+from brownie import interface, multicall, web3
+
+from scripts import gas
+from scripts.harvest_trigger import get_handles
+from scripts.snapshot import block_timestamp, forget_reverted_multicall, result_value
+from scripts.strategy_config import get_config, load_strategy
+from scripts.strategy_math import BASIS_PRECISION
+from scripts.swap_predictor import (
+    FEE_DENOMINATOR,
+    FEE_NUMERATOR,
+    get_amount_out_float,
+)
+from scripts.token_prices import price_feed
+
+SECONDS_PER_YEAR = 365 * 24 * 60 * 60
+# harvest intervals searched, from an hour to a month
+DEFAULT_INTERVALS = np.geomspace(60 * 60, 30 * 24 * 60 * 60, 96)
+# gas of a harvest when there is no benchmark for the entry contract
+DEFAULT_HARVEST_GAS = 2_000_000
+
+# `_farmPendingRewards` of each entry contract, MasterChef `pendingBOO` otherwise
+PENDING_VIEWS = {
+    "WETHWFTMLINKScreamLqdrSpooky": ("LqdrFarm", "pendingLqdr"),
+    "LocalScreamLqdrSpooky": ("LqdrFarm", "pendingLqdr"),
+}
+DEFAULT_PENDING_VIEW = ("SpookyFarm", "pendingBOO")
+
+
+class HarvestInputs(NamedTuple):
+    strategy: str
+    block_number: int
+    since_report: int  # seconds since the vault's lastReport
+    farm_rewards: int  # pending plus claimed farm tokens
+    estimated_total_assets: int
+    debt_ratio_a: int
+    debt_ratio_b: int
+    debt_lower: int
+    balance_lp: int
+    # (reserve in, reserve out) of each hop from the farm token to the sell token
+    route: tuple
+    sell_in_want: float  # want per sell token, at the pool price
+    short_a_in_want: float  # want per shortA (WFTM)
+
+
+class HarvestPlan(NamedTuple):
+    strategy: str
+    block_number: int
+    since_report: int
+    farm_rewards: int
+    reward_rate: float  # farm tokens per second
+    harvest_value: float  # want a harvest now realises, rewards and fees
+    fees_recovered: float  # of which sellTradingFees
+    gas_cost: float  # in want
+    apr_now: float  # net APR of harvesting every since_report seconds
+    optimal_interval: float  # seconds
+    optimal_apr: float
+
+    @property
+    def due(self) -> bool:
+        return (
+            self.since_report >= self.optimal_interval
+            and self.harvest_value > self.gas_cost
+        )
+
+
+def pending_view(strategy):
+    """The farm's pending rewards view for `strategy`'s entry contract."""
+    name, fn = PENDING_VIEWS.get(strategy._name, DEFAULT_PENDING_VIEW)
+    return getattr(getattr(interface, name)(get_config(strategy).farm_master_chef), fn)
+
+
+def _oriented(reserves, token0, token_in):
+    reserve0, reserve1 = reserves
+    if token0 == token_in:
+        return reserve0, reserve1
+    return reserve1, reserve0
+
+
+def read_fleet(
+    strategies, block_identifier=None, multicall_address=None
+) -> List[HarvestInputs]:
+    """
+    The `HarvestInputs` of every strategy, in one multicall. Reserves and
+    prices come from `price_feed` at the block that read.
+    """
+    if multicall_address is None:
+        forget_reverted_multicall()
+    configs = [get_config(s) for s in strategies]
+    handles = get_handles(
+        [s.address for s in strategies], multicall_address, block_identifier
+    )
+    with multicall(address=multicall_address, block_identifier=block_identifier):
+        block_number = multicall.block_number
+        timestamp = block_timestamp()
+        reads = [
+            (
+                pending_view(s)(cfg.farm_pid, s),
+                interface.IERC20(cfg.farm_token).balanceOf(s),
+                s.estimatedTotalAssets(),
+                s.calcDebtRatioA(),
+                s.calcDebtRatioB(),
+                s.debtLower(),
+                s.balanceLp(),
+                vault.strategies(s),
+            )
+            for s, cfg, (_, vault) in zip(strategies, configs, handles)
+        ]
+
+    routes = []
+    for cfg, read in zip(configs, reads):
+        ratio_a, ratio_b = result_value(read[3]), result_value(read[4])
+        sell_token = cfg.short_a if ratio_a > ratio_b else cfg.short_b
+        path = price_feed.path(cfg.router, cfg.farm_token, sell_token)
+        hops = [price_feed.pair(cfg.router, a, b) for a, b in zip(path, path[1:])]
+        routes.append((sell_token, path, hops))
+    # every pair of the fleet in one read, later lookups hit the cache
+    price_feed.reserves(
+        {pair for _, _, hops in routes for pair, _ in hops},
+        block_number,
+        multicall_address,
+    )
+
+    inputs = []
+    for s, cfg, read, (sell_token, path, hops) in zip(
+        strategies, configs, reads, routes
+    ):
+        pending, claimed, assets, ratio_a, ratio_b, lower, lp, params = read
+        reserves = price_feed.reserves([pair for pair, _ in hops], block_number)
+        prices = price_feed.prices(
+            cfg.router, [sell_token, cfg.short_a], cfg.want, block_number
+        )
+        inputs.append(
+            HarvestInputs(
+                strategy=s.address,
+                block_number=block_number,
+                since_report=int(timestamp) - int(params["lastReport"]),
+                farm_rewards=result_value(pending) + result_value(claimed),
+                estimated_total_assets=result_value(assets),
+                debt_ratio_a=result_value(ratio_a),
+                debt_ratio_b=result_value(ratio_b),
+                debt_lower=result_value(lower),
+                balance_lp=result_value(lp),
+                route=tuple(
+                    _oriented(reserves[pair], token0, token_in)
+                    for token_in, (pair, token0) in zip(path, hops)
+                ),
+                sell_in_want=prices[str(sell_token)],
+                short_a_in_want=prices[str(cfg.short_a)],
+            )
+        )
+    return inputs
+
+
+def _route_out(amounts, routes):
+    """Swap each row of `amounts` along its strategy's route, 1 or 2 hops."""
+    hops = max(len(r) for r in routes)
+    for i in range(hops):
+        has_hop = np.array([len(r) > i for r in routes])[:, None]
+        reserve_in = np.array([r[i][0] if len(r) > i else 1 for r in routes], float)
+        reserve_out = np.array([r[i][1] if len(r) > i else 1 for r in routes], float)
+        out = get_amount_out_float(amounts, reserve_in[:, None], reserve_out[:, None])
+        amounts = np.where(has_hop, out, amounts)
+    return amounts
+
+
+def fees_recovered(inputs: HarvestInputs) -> float:
+    """
+    Want `sellTradingFees` gets for the LP over the larger debt ratio, once
+    both are under `debtLower`. `balanceLp` is already in want; half of it
+    pays the swap fee on one hop (shortA), the other half on two (shortB).
+    """
+    if not (
+        inputs.debt_ratio_a < inputs.debt_lower
+        and inputs.debt_ratio_b < inputs.debt_lower
+    ):
+        return 0.0
+    percent = BASIS_PRECISION - max(inputs.debt_ratio_a, inputs.debt_ratio_b)
+    excess = inputs.balance_lp * percent / BASIS_PRECISION
+    fee = FEE_NUMERATOR / FEE_DENOMINATOR
+    return excess / 2 * fee + excess / 2 * fee * fee
+
+
+def plan(
+    inputs: List[HarvestInputs],
+    gas_price,
+    harvest_gas,
+    intervals=DEFAULT_INTERVALS,
+) -> List[HarvestPlan]:
+    """
+    Price harvesting every one of `intervals` for every strategy at once.
+    `harvest_gas` is one number or one per strategy.
+    """
+    if not inputs:
+        return []
+    intervals = np.asarray(intervals, float)
+    routes = [i.route for i in inputs]
+    since = np.array([max(i.since_report, 1) for i in inputs], float)
+    rate = np.array([i.farm_rewards for i in inputs], float) / since
+    sell_in_want = np.array([i.sell_in_want for i in inputs])
+    assets = np.array([i.estimated_total_assets for i in inputs], float)
+    gas_cost = (
+        np.broadcast_to(np.asarray(harvest_gas, float), since.shape)
+        * gas_price
+        * np.array([i.short_a_in_want for i in inputs])
+    )
+
+    # column 0 is harvesting now, the rest the candidate intervals
+    periods = np.concatenate([since[:, None], np.tile(intervals, (len(inputs), 1))], 1)
+    sold = np.maximum(rate[:, None] * periods, 1.0)
+    value = _route_out(sold, routes) * sell_in_want[:, None]
+    gain = np.maximum((value - gas_cost[:, None]) / assets[:, None], -1.0)
+    apr = (1 + gain) ** (SECONDS_PER_YEAR / periods) - 1
+    best = np.argmax(apr[:, 1:], 1)
+
+    plans = []
+    for n, i in enumerate(inputs):
+        fees = fees_recovered(i)
+        plans.append(
+            HarvestPlan(
+                strategy=i.strategy,
+                block_number=i.block_number,
+                since_report=i.since_report,
+                farm_rewards=i.farm_rewards,
+                reward_rate=float(rate[n]),
+                harvest_value=float(value[n, 0]) + fees,
+                fees_recovered=fees,
+                gas_cost=float(gas_cost[n]),
+                apr_now=float(apr[n, 0]),
+                optimal_interval=float(intervals[best[n]]),
+                optimal_apr=float(apr[n, 1 + best[n]]),
+            )
+        )
+    return plans
+
+
+def harvest_gas(strategies, baseline=None) -> List[int]:
+    """The benchmarked gas of a harvest for each strategy's entry contract."""
+    baseline = gas.load_baseline() if baseline is None else baseline
+    return [
+        baseline.get(s._name, {}).get("harvest", DEFAULT_HARVEST_GAS)
+        for s in strategies
+    ]
+
+
+def plan_fleet(
+    strategies,
+    block_identifier=None,
+    gas_price=None,
+    intervals=DEFAULT_INTERVALS,
+    multicall_address=None,
+) -> List[HarvestPlan]:
+    gas_price = web3.eth.gas_price if gas_price is None else gas_price
+    inputs = read_fleet(strategies, block_identifier, multicall_address)
+    return plan(inputs, gas_price, harvest_gas(strategies), intervals)
+
+
+def main(*strategies, interval=5):
+    parsed = [load_strategy(entry) for entry in strategies]
+    while True:
+        for p in plan_fleet(parsed):
+            print(
+                f"{p.strategy} worth {p.harvest_value:.4e} for {p.gas_cost:.4e} gas, "
+                f"best every {p.optimal_interval / 3600:.1f}h at {p.optimal_apr:.2%}"
+                + (", due" if p.due else "")
+            )
+        time.sleep(interval)
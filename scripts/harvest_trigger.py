@@ -0,0 +1,163 @@
+"""
+Evaluate `harvestTrigger` for a fleet of CoreStrategy deployments at once.
+
+Calling `harvestTrigger(callCost)` on each strategy costs a round trip per
+strategy and only says yes or no. `evaluate_fleet` reads the inputs of the
+trigger for every strategy (`forceHarvestTriggerOnce`, `maxReportDelay`, the
+vault's `lastReport` and `totalDebt`, `estimatedTotalAssets`) plus the
+on-chain answer in one Multicall2 `tryAggregate` at a pinned block, and
+replays the CoreStrategy logic to say why each one did or did not trigger:
+
+    for result in evaluate_fleet(addresses):
+        print(result.strategy, result.triggered, result.reason)
+"""
+from typing import Dict, List, NamedTuple, Optional
+
+from brownie import interface, multicall
+from brownie.network.state import _revert_register
+
+from scripts.snapshot import block_timestamp, forget_reverted_multicall, result_value
+
+FORCED = "forceHarvestTriggerOnce is set"
+REPORT_DUE_IN_PROFIT = "maxReportDelay passed and in profit"
+REPORT_DUE_NOT_IN_PROFIT = "maxReportDelay passed but not in profit"
+REPORT_NOT_DUE = "maxReportDelay not passed"
+ASSETS_REVERTED = "estimatedTotalAssets reverted"
+
+
+class HarvestTriggerResult(NamedTuple):
+    strategy: str
+    block_number: int
+    triggered: Optional[bool]
+    reason: str
+    force_harvest_trigger_once: bool
+    max_report_delay: int
+    last_report: int
+    since_report: int
+    estimated_total_assets: Optional[int]
+    total_debt: int
+    # `harvestTrigger(call_cost)` as answered on-chain, None if it reverted
+    harvest_trigger: Optional[bool]
+
+
+class _Handles:
+    """
+    Strategy and vault handles, built once per address: creating a brownie
+    contract object costs an `eth_getCode` round trip. A strategy's vault is
+    immutable, so it's only looked up the first time the strategy is seen.
+
+    On development networks a reverted or reset chain can redeploy a strategy
+    at the same address with another vault, so the handles are dropped then.
+    """
+
+    def __init__(self):
+        self.strategies: Dict[str, object] = {}
+        self.vaults: Dict[str, object] = {}
+        _revert_register(self)
+
+    def clear(self):
+        self.strategies.clear()
+        self.vaults.clear()
+
+    # called by brownie when the local chain is reverted or reset
+
+    def _revert(self, height):
+        self.clear()
+
+    def _reset(self):
+        self.clear()
+
+
+_handles = _Handles()
+
+
+def get_handles(addresses, multicall_address=None, block_identifier=None):
+    """
+    The (strategy, vault) handles of each of `addresses`. Vaults not known yet
+    are read at `block_identifier`, the block the caller then reads at.
+    """
+    unseen = [a for a in addresses if a not in _handles.strategies]
+    if unseen:
+        strategies = [interface.ICoreStrategy(a) for a in unseen]
+        if multicall_address is None:
+            forget_reverted_multicall()
+        with multicall(address=multicall_address, block_identifier=block_identifier):
+            vaults = [s.vault() for s in strategies]
+        for address, strategy, vault in zip(unseen, strategies, vaults):
+            _handles.strategies[address] = strategy
+            _handles.vaults[address] = interface.IVault(str(vault))
+    return [(_handles.strategies[a], _handles.vaults[a]) for a in addresses]
+
+
+def replay_trigger(force, max_report_delay, since_report, total_assets, total_debt):
+    """
+    `(triggered, reason)` following `CoreStrategy.harvestTrigger`. `triggered`
+    is None when the strategy would revert (`total_assets` unavailable).
+    """
+    if force:
+        return True, FORCED
+    if total_assets is None:
+        return None, ASSETS_REVERTED
+    if since_report > max_report_delay:
+        if total_assets > total_debt:
+            return True, REPORT_DUE_IN_PROFIT
+        return False, REPORT_DUE_NOT_IN_PROFIT
+    return False, REPORT_NOT_DUE
+
+
+def evaluate_fleet(
+    strategies, call_cost=0, block_identifier=None, multicall_address=None
+) -> List[HarvestTriggerResult]:
+    """
+    Evaluate the harvest trigger of every strategy in `strategies` (addresses
+    or contract objects) at `block_identifier` (default: latest), in the
+    given order. After the first call for a given set of strategies this is a
+    single RPC call however many strategies there are.
+    """
+    addresses = [str(s) for s in strategies]
+    if multicall_address is None:
+        forget_reverted_multicall()
+    handles = get_handles(addresses, multicall_address, block_identifier)
+
+    with multicall(address=multicall_address, block_identifier=block_identifier):
+        block_number = multicall.block_number
+        timestamp = block_timestamp()
+        reads = [
+            (
+                strategy.forceHarvestTriggerOnce(),
+                strategy.maxReportDelay(),
+                strategy.estimatedTotalAssets(),
+                strategy.harvestTrigger(call_cost),
+                vault.strategies(strategy),
+            )
+            for strategy, vault in handles
+        ]
+
+    timestamp = int(timestamp)
+    results = []
+    for address, (force, max_delay, assets, on_chain, params) in zip(addresses, reads):
+        force = bool(force)
+        max_delay = int(max_delay)
+        assets = result_value(assets)
+        total_debt = int(params["totalDebt"])
+        last_report = int(params["lastReport"])
+        since_report = timestamp - last_report
+        triggered, reason = replay_trigger(
+            force, max_delay, since_report, assets, total_debt
+        )
+        results.append(
+            HarvestTriggerResult(
+                strategy=address,
+                block_number=block_number,
+                triggered=triggered,
+                reason=reason,
+                force_harvest_trigger_once=force,
+                max_report_delay=max_delay,
+                last_report=last_report,
+                since_report=since_report,
+                estimated_total_assets=assets,
+                total_debt=total_debt,
+                harvest_trigger=result_value(on_chain),
+            )
+        )
+    return results
@@ -0,0 +1,201 @@
+"""
+Project Compound interest accrual off chain.
+
+`borrowBalanceStored` and `exchangeRateStored` only move when a cToken
+accrues, so `balanceDebtInShortA/B`, `balanceLend` and everything built on
+them lag between accruals. The `...Current` variants accrue first, but are
+transactions. `accrue` repeats `CToken.accrueInterest` for a block instead:
+
+    simpleInterestFactor = borrowRatePerBlock * (block - accrualBlockNumber)
+    interest = simpleInterestFactor * totalBorrows / 1e18
+    totalBorrows += interest
+    totalReserves += reserveFactorMantissa * interest / 1e18
+    borrowIndex += simpleInterestFactor * borrowIndex / 1e18
+
+`borrowRatePerBlock` is the interest rate model's `getBorrowRate(cash,
+totalBorrows, totalReserves)` for the stored state, and it stays that until
+the next accrual, so the projection is exact for any block up to the next
+transaction on the market. A stored borrow balance is then carried forward as
+`balance * borrowIndex_new / borrowIndex_read`.
+
+Everything is batched. `accrue` takes the markets as one batched
+`MarketState`, and `project` carries every strategy's debts and lend exchange
+rate forward in one pass before `strategy_math.evaluate` computes the views
+for the whole fleet:
+
+    views = current_views([strategy, ...])  # as of the latest block
+"""
+from typing import Dict, List, NamedTuple, Sequence
+
+import numpy as np
+from brownie import interface, multicall
+
+from scripts import strategy_math
+from scripts.snapshot import (
+    forget_reverted_multicall,
+    prepare_snapshots,
+    queue_snapshot,
+    result_value,
+)
+from scripts.strategy_config import get_config
+from scripts.strategy_math import STD_PRECISION, PositionState, PositionViews, as_batch
+
+MARKET_VIEWS = (
+    "accrualBlockNumber",
+    "borrowIndex",
+    "borrowRatePerBlock",
+    "totalBorrows",
+    "totalReserves",
+    "reserveFactorMantissa",
+    "getCash",
+    "totalSupply",
+    "exchangeRateStored",
+)
+
+
+class MarketState(NamedTuple):
+    """A cToken's stored interest state, or a batch of them."""
+
+    accrual_block_number: int
+    borrow_index: int
+    borrow_rate: int  # borrowRatePerBlock
+    total_borrows: int
+    total_reserves: int
+    reserve_factor: int
+    cash: int
+    total_supply: int
+    exchange_rate: int  # exchangeRateStored
+
+
+def _queue_markets(c_tokens):
+    # the MARKET_VIEWS of each of `c_tokens`, queued into the open multicall
+    return [
+        [getattr(interface.ICToken(c), view)() for view in MARKET_VIEWS]
+        for c in c_tokens
+    ]
+
+
+def _market_states(c_tokens, reads) -> Dict[str, MarketState]:
+    return {
+        c: MarketState(*(result_value(r) for r in row))
+        for c, row in zip(c_tokens, reads)
+    }
+
+
+def read_markets(
+    c_tokens, block_identifier=None, multicall_address=None
+) -> Dict[str, MarketState]:
+    """The interest state of each of `c_tokens`, read in one multicall."""
+    c_tokens = sorted({str(c) for c in c_tokens})
+    if multicall_address is None:
+        forget_reverted_multicall()
+    with multicall(address=multicall_address, block_identifier=block_identifier):
+        reads = _queue_markets(c_tokens)
+    return _market_states(c_tokens, reads)
+
+
+def stack_markets(markets: Sequence[MarketState]) -> MarketState:
+    return MarketState(*(as_batch(field) for field in zip(*markets)))
+
+
+def _exchange_rate_stored(cash, total_borrows, total_reserves, total_supply, stored):
+    # keeps the initial rate while nothing is supplied
+    if total_supply == 0:
+        return stored
+    return (cash + total_borrows - total_reserves) * STD_PRECISION // total_supply
+
+
+_exchange_rate = np.frompyfunc(_exchange_rate_stored, 5, 1)
+
+
+def accrue(markets: MarketState, block_number) -> MarketState:
+    """
+    `markets`, one or a batch, as `accrueInterest` would leave them at
+    `block_number`.
+    """
+    delta = block_number - markets.accrual_block_number
+    if strategy_math.any_true(delta < 0):
+        raise ValueError("block_number is before the last accrual")
+    factor = markets.borrow_rate * delta
+    interest = factor * markets.total_borrows // STD_PRECISION
+    total_borrows = markets.total_borrows + interest
+    total_reserves = (
+        markets.total_reserves + markets.reserve_factor * interest // STD_PRECISION
+    )
+    borrow_index = markets.borrow_index + factor * markets.borrow_index // STD_PRECISION
+    exchange_rate = _exchange_rate(
+        markets.cash,
+        total_borrows,
+        total_reserves,
+        markets.total_supply,
+        markets.exchange_rate,
+    )
+    return markets._replace(
+        accrual_block_number=markets.accrual_block_number + delta,
+        borrow_index=borrow_index,
+        total_borrows=total_borrows,
+        total_reserves=total_reserves,
+        exchange_rate=exchange_rate,
+    )
+
+
+def project(
+    states: Sequence[PositionState],
+    configs,
+    markets: Dict[str, MarketState],
+    block_number,
+) -> PositionState:
+    """
+    The batched `states`, read together with `markets`, with the debts and
+    the lend exchange rate carried forward to `block_number`.
+    """
+    c_tokens = list(markets)
+    row = {c: i for i, c in enumerate(c_tokens)}
+    read = stack_markets([markets[c] for c in c_tokens])
+    accrued = accrue(read, block_number)
+    batch = strategy_math.stack(states)
+
+    def rows(field):
+        return np.array([row[getattr(cfg, field)] for cfg in configs])
+
+    borrow_a = rows("c_token_borrow_a")
+    borrow_b = rows("c_token_borrow_b")
+    lend = rows("c_token_lend")
+    return batch._replace(
+        debt_short_a=batch.debt_short_a
+        * accrued.borrow_index[borrow_a]
+        // read.borrow_index[borrow_a],
+        debt_short_b=batch.debt_short_b
+        * accrued.borrow_index[borrow_b]
+        // read.borrow_index[borrow_b],
+        exchange_rate=accrued.exchange_rate[lend],
+    )
+
+
+def current_views(
+    strategies, block_identifier=None, multicall_address=None
+) -> List[PositionViews]:
+    """
+    Every strategy's views as if its cTokens had accrued at the block read
+    (default: latest), without sending a transaction. The markets and every
+    strategy's snapshot are read in one multicall.
+    """
+    configs = [get_config(s) for s in strategies]
+    c_tokens = sorted(
+        {
+            c
+            for cfg in configs
+            for c in (cfg.c_token_lend, cfg.c_token_borrow_a, cfg.c_token_borrow_b)
+        }
+    )
+    prepare_snapshots(strategies)
+    if multicall_address is None:
+        forget_reverted_multicall()
+    with multicall(address=multicall_address, block_identifier=block_identifier):
+        block_number = multicall.block_number
+        reads = _queue_markets(c_tokens)
+        pending = [queue_snapshot(s) for s in strategies]
+    markets = _market_states(c_tokens, reads)
+    states = [p.result().position_state() for p in pending]
+    projected = project(states, configs, markets, block_number)
+    return strategy_math.unstack(strategy_math.evaluate(projected))
@@ -0,0 +1,214 @@
+"""
+Keeper daemon for `rebalanceDebt` and `rebalanceCollateral`.
+
+Both calls revert unless the strategy is out of range, so blindly poking them
+wastes gas exactly when markets are busiest. `KeeperDaemon` watches many
+strategies concurrently. Each tick it reads the state of every strategy in one
+multicall, evaluates the `require`s of both calls off-chain and only sends a
+call, through the strategy's `KeeperProxy`, when they would pass:
+
+  - `rebalanceCollateral`: `calcCollateral()` at or outside
+    `collatLower`/`collatUpper`
+  - `rebalanceDebt`: `calcDebtRatioA()` or `calcDebtRatioB()` above
+    `debtUpper`, and `_testPriceSource()` passes
+
+Strategies rebalanced at once are bounded by `max_concurrency`. Brownie's
+multicall isn't thread safe, so the reads never run on more than one executor
+thread: a strategy that was rebalanced is re-read, with the others rebalanced
+in the same round, in the next multicall. Transactions from one keeper
+account are serialised and given consecutive nonces, so strategies sharing a
+keeper don't race each other for one. To run it:
+
+    brownie run keeper main WETHWFTMLINKScreamLqdrSpooky:<keeper proxy> ...
+"""
+import asyncio
+import functools
+from typing import Dict, List, NamedTuple, Optional
+
+import click
+from brownie import KeeperProxy, accounts, multicall, project, web3
+from brownie.exceptions import VirtualMachineError
+
+from scripts import strategy_math
+from scripts.snapshot import (
+    StrategySnapshot,
+    forget_reverted_multicall,
+    prepare_snapshots,
+    queue_snapshot,
+)
+
+REBALANCE_COLLATERAL = "rebalanceCollateral"
+REBALANCE_DEBT = "rebalanceDebt"
+
+# a strategy is re-read after each rebalance, as one can bring the other back
+# in range, but never rebalanced more often than this per tick
+MAX_ACTIONS_PER_TICK = 2
+
+
+class KeeperJob(NamedTuple):
+    strategy: object  # the entry contract, as `read_snapshot` needs its config
+    proxy: object  # KeeperProxy the keeper calls through
+    keeper: object  # account approved on the proxy
+
+
+class KeeperAction(NamedTuple):
+    strategy: str
+    action: str
+    block_number: int
+    tx: Optional[object]
+    # why nothing was sent, eg the call reverted in simulation
+    error: Optional[str]
+
+
+def _run(fn, *args, **kwargs):
+    # brownie is synchronous, so its calls run on the default executor
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(None, functools.partial(fn, *args, **kwargs))
+
+
+def read_snapshots(strategies) -> List[StrategySnapshot]:
+    """The snapshots of `strategies`, read in one multicall at the latest block."""
+    prepare_snapshots(strategies)
+    forget_reverted_multicall()
+    with multicall():
+        pending = [queue_snapshot(s) for s in strategies]
+    return [p.result() for p in pending]
+
+
+def collateral_out_of_range(snap: StrategySnapshot) -> bool:
+    if snap.collateral is None:
+        return False
+    return snap.collateral <= snap.collat_lower or snap.collateral >= snap.collat_upper
+
+
+def debt_out_of_range(snap: StrategySnapshot) -> bool:
+    if snap.debt_ratio_a is None or snap.debt_ratio_b is None:
+        return False
+    if snap.debt_ratio_a <= snap.debt_upper and snap.debt_ratio_b <= snap.debt_upper:
+        return False
+    try:
+        return bool(
+            strategy_math.price_source_ok(
+                snap.position_state(), snap.do_price_check, snap.price_source_diff
+            )
+        )
+    except ArithmeticError:
+        # the contract reverts too
+        return False
+
+
+def due_action(snap: StrategySnapshot) -> Optional[str]:
+    """The rebalance that would pass its `require`s at `snap`, if any."""
+    if collateral_out_of_range(snap):
+        return REBALANCE_COLLATERAL
+    if debt_out_of_range(snap):
+        return REBALANCE_DEBT
+    return None
+
+
+class NonceManager:
+    """Hands out consecutive nonces per account, one transaction at a time."""
+
+    def __init__(self):
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._nonces: Dict[str, int] = {}
+
+    async def send(self, account, fn, *args):
+        """
+        Broadcast `fn(*args)` from `account` and return the pending tx. The
+        nonce is resynced from the chain whenever a broadcast fails.
+        """
+        address = account.address
+        lock = self._locks.setdefault(address, asyncio.Lock())
+        async with lock:
+            nonce = self._nonces.get(address)
+            if nonce is None:
+                nonce = await _run(web3.eth.get_transaction_count, address, "pending")
+            tx_params = {"from": account, "nonce": nonce, "required_confs": 0}
+            try:
+                tx = await _run(fn, *args, tx_params)
+            except Exception:
+                self._nonces.pop(address, None)
+                raise
+            self._nonces[address] = nonce + 1
+        return tx
+
+
+class KeeperDaemon:
+    def __init__(self, jobs, max_concurrency=8, interval=15, simulate=True):
+        """
+        `interval` is the number of seconds between ticks. With `simulate`,
+        calls that pass the off-chain checks are also `eth_call`ed before
+        being sent, to catch reverts further into the rebalance.
+        """
+        self.jobs = list(jobs)
+        self.interval = interval
+        self.simulate = simulate
+        self.nonces = NonceManager()
+        self.max_concurrency = max_concurrency
+
+    async def _act(
+        self, semaphore, job: KeeperJob, action: str, block_number
+    ) -> KeeperAction:
+        async with semaphore:
+            return await self._send(job, action, block_number)
+
+    async def _send(self, job: KeeperJob, action: str, block_number) -> KeeperAction:
+        fn = getattr(job.proxy, action)
+        strategy = job.strategy.address
+        if self.simulate:
+            try:
+                await _run(fn.call, {"from": job.keeper})
+            except VirtualMachineError as e:
+                return KeeperAction(strategy, action, block_number, None, str(e))
+        tx = await self.nonces.send(job.keeper, fn)
+        await _run(tx.wait, 1)
+        error = None if tx.status == 1 else tx.revert_msg or "reverted"
+        return KeeperAction(strategy, action, block_number, tx, error)
+
+    async def tick(self) -> List[KeeperAction]:
+        """
+        Rebalance every job until both its ranges hold, or it stops helping.
+        Each round reads the jobs still being rebalanced in one multicall,
+        then sends their due actions concurrently.
+        """
+        # created per tick, so it binds to the loop the tick runs on
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        actions = []
+        jobs = self.jobs
+        for _ in range(MAX_ACTIONS_PER_TICK):
+            if not jobs:
+                break
+            snapshots = await _run(read_snapshots, [job.strategy for job in jobs])
+            due = [
+                (job, due_action(snap), snap.block_number)
+                for job, snap in zip(jobs, snapshots)
+            ]
+            due = [(job, action, block) for job, action, block in due if action]
+            results = await asyncio.gather(*(self._act(semaphore, *d) for d in due))
+            actions.extend(results)
+            # only a rebalance that went through is followed up
+            jobs = [job for (job, _, _), r in zip(due, results) if r.error is None]
+        return actions
+
+    async def run(self, ticks=None):
+        """Tick every `interval` seconds, forever unless `ticks` is given."""
+        count = 0
+        while ticks is None or count < ticks:
+            for action in await self.tick():
+                status = action.error or action.tx.txid
+                print(f"{action.strategy} {action.action}: {status}")
+            count += 1
+            if ticks is None or count < ticks:
+                await asyncio.sleep(self.interval)
+
+
+def main(*jobs):
+    keeper = accounts.load(click.prompt("Account", type=click.Choice(accounts.load())))
+    parsed = []
+    for job in jobs:
+        name, proxy = job.split(":")
+        proxy = KeeperProxy.at(proxy)
+        container = getattr(project.GenleveragelpProject, name)
+        parsed.append(KeeperJob(container.at(proxy.strategy()), proxy, keeper))
+    asyncio.run(KeeperDaemon(parsed).run())
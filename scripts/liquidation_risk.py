@@ -0,0 +1,321 @@
+"""
+How far shortA and shortB can move before the comptroller can liquidate a
+strategy.
+
+The strategy lends want to `cTokenLend` and borrows shortA and shortB, and the
+comptroller liquidates it once
+
+    sum(borrow * price) >= cTokens * exchangeRate * collateralFactor * priceLend
+
+all in oracle units. `calcCollateral` only holds the ratio inside
+`collatUpper`, well before that. For every strategy `LiquidationRiskEngine`
+reports the rise in the price of shortA alone, shortB alone, and both
+together, relative to want, that would reach the threshold.
+
+Hundreds of strategies share a handful of cTokens, so state is kept per
+cToken wherever it can be:
+
+  - `borrowBalanceStored` is `principal * borrowIndex / interestIndex`, so
+    stored debts are rescaled by each borrow cToken's `borrowIndex` rather
+    than re-read per strategy
+  - `exchangeRateStored` and the collateral factor are read per cToken
+  - oracle prices come from `scripts.oracle_cache.price_cache`
+  - a strategy's own balances are only re-read when the cToken logs since the
+    last update name it (`Mint`, `Redeem`, `Borrow`, `RepayBorrow`,
+    `LiquidateBorrow` or a cToken `Transfer`)
+
+and the distances are then recomputed for the whole fleet at once as numpy
+arrays. Keepers rank by the nearest:
+
+    engine = LiquidationRiskEngine([strategy, ...])
+    while True:
+        for risk in engine.update():  # nearest to liquidation first
+            ...
+"""
+import math
+from typing import Dict, List, NamedTuple, Set
+
+import numpy as np
+from brownie import interface, multicall, web3
+from eth_utils import keccak
+from hexbytes import HexBytes
+
+from scripts.oracle_cache import price_cache
+from scripts.reserve_index import MAX_LOG_RANGE
+from scripts.snapshot import forget_reverted_multicall, result_value
+from scripts.strategy_config import get_config, load_strategy
+from scripts.strategy_math import STD_PRECISION
+
+# cToken events naming an account, and the data word holding it
+ACCOUNT_EVENTS = {
+    "0x" + keccak(text=signature).hex(): word
+    for signature, word in (
+        ("Mint(address,uint256,uint256)", 0),
+        ("Redeem(address,uint256,uint256)", 0),
+        ("Borrow(address,uint256,uint256,uint256)", 0),
+        ("RepayBorrow(address,address,uint256,uint256,uint256)", 1),
+        ("LiquidateBorrow(address,address,uint256,address,uint256)", 1),
+    )
+}
+TRANSFER_TOPIC = "0x" + keccak(text="Transfer(address,address,uint256)").hex()
+
+
+class StrategyMarkets(NamedTuple):
+    strategy: str
+    oracle: str
+    comptroller: str
+    c_token_lend: str
+    c_token_borrow_a: str
+    c_token_borrow_b: str
+
+
+class LiquidationRisk(NamedTuple):
+    strategy: str
+    block_number: int
+    collateral: int  # borrowing power of the lend position, in oracle units
+    borrows: int  # value of both borrows, in oracle units
+    debt_a: int  # borrowBalanceStored of shortA
+    debt_b: int
+    # rise in the price of shortA, shortB or both, relative to want, that
+    # brings borrows up to collateral. 0.25 is +25%, negative once short
+    move_a: float
+    move_b: float
+    move_both: float
+
+    @property
+    def health(self) -> float:
+        return self.collateral / self.borrows if self.borrows else math.inf
+
+    @property
+    def distance(self) -> float:
+        return min(self.move_a, self.move_b, self.move_both)
+
+
+def _accounts(log) -> Set[str]:
+    """The accounts a cToken log names."""
+    topic = "0x" + bytes(HexBytes(log["topics"][0])).hex()
+    if topic == TRANSFER_TOPIC:
+        words = [HexBytes(t)[-20:] for t in log["topics"][1:3]]
+    else:
+        word = ACCOUNT_EVENTS[topic]
+        words = [HexBytes(log["data"])[32 * word + 12 : 32 * word + 32]]
+    return {web3.toChecksumAddress(w) for w in words}
+
+
+def liquidation_moves(collateral, borrow_a, borrow_b):
+    """
+    The price moves reaching liquidation for arrays of collateral and borrow
+    values, as (shortA alone, shortB alone, both).
+    """
+    collateral = np.asarray(collateral, float)
+    borrow_a = np.asarray(borrow_a, float)
+    borrow_b = np.asarray(borrow_b, float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        move_a = np.where(borrow_a > 0, (collateral - borrow_b) / borrow_a - 1, np.inf)
+        move_b = np.where(borrow_b > 0, (collateral - borrow_a) / borrow_b - 1, np.inf)
+        total = borrow_a + borrow_b
+        move_both = np.where(total > 0, collateral / total - 1, np.inf)
+    return move_a, move_b, move_both
+
+
+class LiquidationRiskEngine:
+    def __init__(self, strategies, start_block=None, multicall_address=None):
+        self.multicall_address = multicall_address
+        self.block_number = (
+            web3.eth.block_number if start_block is None else start_block
+        )
+        self.markets: Dict[str, StrategyMarkets] = {}
+        # per strategy, as last read: collateral cTokens, and each stored debt
+        # with the borrowIndex it was read at
+        self._positions: Dict[str, tuple] = {}
+        # per cToken: borrowIndex, exchangeRateStored, collateral factor
+        self._borrow_index: Dict[str, int] = {}
+        self._exchange_rate: Dict[str, int] = {}
+        self._collateral_factor: Dict[str, int] = {}
+        self._risks: List[LiquidationRisk] = []
+        self.add_strategies(strategies)
+
+    @property
+    def c_tokens(self) -> List[str]:
+        return sorted(
+            {
+                c
+                for m in self.markets.values()
+                for c in (m.c_token_lend, m.c_token_borrow_a, m.c_token_borrow_b)
+            }
+        )
+
+    def add_strategies(self, strategies):
+        """Start watching `strategies`, entry contract objects."""
+        added = []
+        for s in strategies:
+            if s.address in self.markets:
+                continue
+            cfg = get_config(s)
+            self.markets[s.address] = StrategyMarkets(
+                strategy=s.address,
+                oracle=price_cache.oracle(cfg.comptroller),
+                comptroller=cfg.comptroller,
+                c_token_lend=cfg.c_token_lend,
+                c_token_borrow_a=cfg.c_token_borrow_a,
+                c_token_borrow_b=cfg.c_token_borrow_b,
+            )
+            added.append(s.address)
+        if added:
+            self._read(added, self.block_number)
+            self._evaluate(self.block_number)
+
+    def _read(self, strategies, block_number):
+        """Read every cToken's state, and the positions of `strategies`."""
+        if self.multicall_address is None:
+            forget_reverted_multicall()
+        c_tokens = self.c_tokens
+        lend_markets = {(m.comptroller, m.c_token_lend) for m in self.markets.values()}
+        new_lend = [
+            key for key in lend_markets if key[1] not in self._collateral_factor
+        ]
+        with multicall(address=self.multicall_address, block_identifier=block_number):
+            indexes = [interface.ICToken(c).borrowIndex() for c in c_tokens]
+            rates = [interface.ICToken(c).exchangeRateStored() for c in c_tokens]
+            factors = [
+                interface.IComptrollerMarkets(comptroller).markets(c_token)
+                for comptroller, c_token in new_lend
+            ]
+            positions = []
+            for address in strategies:
+                m = self.markets[address]
+                positions.append(
+                    (
+                        interface.ICToken(m.c_token_lend).getAccountSnapshot(address),
+                        interface.ICToken(m.c_token_borrow_a).borrowBalanceStored(
+                            address
+                        ),
+                        interface.ICToken(m.c_token_borrow_b).borrowBalanceStored(
+                            address
+                        ),
+                    )
+                )
+
+        for c, index, rate in zip(c_tokens, indexes, rates):
+            self._borrow_index[c] = result_value(index)
+            self._exchange_rate[c] = result_value(rate)
+        for (_, c_token), (_, factor, _) in zip(new_lend, factors):
+            self._collateral_factor[c_token] = int(factor)
+        for address, (snapshot, debt_a, debt_b) in zip(strategies, positions):
+            m = self.markets[address]
+            self._positions[address] = (
+                int(snapshot[1]),
+                result_value(debt_a),
+                self._borrow_index[m.c_token_borrow_a],
+                result_value(debt_b),
+                self._borrow_index[m.c_token_borrow_b],
+            )
+
+    def _touched(self, from_block, to_block) -> Set[str]:
+        """Strategies named by a cToken log in the range."""
+        touched = set()
+        topics = [[*ACCOUNT_EVENTS, TRANSFER_TOPIC]]
+        for start in range(from_block, to_block + 1, MAX_LOG_RANGE):
+            logs = web3.eth.get_logs(
+                {
+                    "address": self.c_tokens,
+                    "topics": topics,
+                    "fromBlock": start,
+                    "toBlock": min(start + MAX_LOG_RANGE - 1, to_block),
+                }
+            )
+            for log in logs:
+                touched |= _accounts(log)
+        return touched.intersection(self.markets)
+
+    def _evaluate(self, block_number):
+        addresses = list(self.markets)
+        markets = [self.markets[a] for a in addresses]
+        by_oracle = {}
+        for m in markets:
+            by_oracle.setdefault(m.oracle, set()).update(
+                (m.c_token_lend, m.c_token_borrow_a, m.c_token_borrow_b)
+            )
+        prices = {
+            (oracle, c_token): price
+            for oracle, c_tokens in by_oracle.items()
+            for c_token, price in price_cache.prices(
+                oracle, sorted(c_tokens), block_number, self.multicall_address
+            ).items()
+        }
+
+        def column(values):
+            return np.fromiter(values, float, len(addresses))
+
+        positions = [self._positions[a] for a in addresses]
+        # stored debts carried forward to the current borrowIndex
+        debt_a = [
+            debt * self._borrow_index[m.c_token_borrow_a] // index if index else debt
+            for m, (_, debt, index, _, _) in zip(markets, positions)
+        ]
+        debt_b = [
+            debt * self._borrow_index[m.c_token_borrow_b] // index if index else debt
+            for m, (_, _, _, debt, index) in zip(markets, positions)
+        ]
+        collateral = (
+            column(p[0] for p in positions)
+            * column(self._exchange_rate[m.c_token_lend] for m in markets)
+            / STD_PRECISION
+            * column(self._collateral_factor[m.c_token_lend] for m in markets)
+            / STD_PRECISION
+            * column(prices[(m.oracle, m.c_token_lend)] for m in markets)
+            / STD_PRECISION
+        )
+        borrow_a = (
+            column(debt_a)
+            * column(prices[(m.oracle, m.c_token_borrow_a)] for m in markets)
+            / STD_PRECISION
+        )
+        borrow_b = (
+            column(debt_b)
+            * column(prices[(m.oracle, m.c_token_borrow_b)] for m in markets)
+            / STD_PRECISION
+        )
+        move_a, move_b, move_both = liquidation_moves(collateral, borrow_a, borrow_b)
+
+        risks = [
+            LiquidationRisk(
+                strategy=address,
+                block_number=block_number,
+                collateral=int(collateral[i]),
+                borrows=int(borrow_a[i] + borrow_b[i]),
+                debt_a=debt_a[i],
+                debt_b=debt_b[i],
+                move_a=float(move_a[i]),
+                move_b=float(move_b[i]),
+                move_both=float(move_both[i]),
+            )
+            for i, address in enumerate(addresses)
+        ]
+        self._risks = sorted(risks, key=lambda r: r.distance)
+
+    def update(self, to_block=None) -> List[LiquidationRisk]:
+        """
+        Follow the chain up to `to_block` (default: latest) and return every
+        strategy's risk, nearest to liquidation first.
+        """
+        to_block = web3.eth.block_number if to_block is None else to_block
+        if to_block > self.block_number:
+            touched = self._touched(self.block_number + 1, to_block)
+            self._read(sorted(touched), to_block)
+            self.block_number = to_block
+        self._evaluate(self.block_number)
+        return self.ranked()
+
+    def ranked(self) -> List[LiquidationRisk]:
+        return list(self._risks)
+
+
+def main(*strategies):
+    parsed = [load_strategy(entry) for entry in strategies]
+    engine = LiquidationRiskEngine(parsed)
+    for r in engine.update():
+        print(
+            f"{r.strategy} health {r.health:.3f}: shortA {r.move_a:+.1%}, "
+            f"shortB {r.move_b:+.1%}, both {r.move_both:+.1%}"
+        )
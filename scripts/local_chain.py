@@ -0,0 +1,164 @@
+"""
+Local stand-in for the Fantom contracts the strategies run against.
+
+`deploy_local_chain` deploys mock tokens, a UniswapV2 style factory and router,
+a Compound style comptroller with lend and borrow markets, and a MasterChef
+style farm onto a plain development chain, seeded so the pools agree with the
+oracle prices. `LocalScreamLqdrSpooky` can then be deployed against the
+returned config, so the test suite runs without a Fantom fork:
+
+    brownie test --network development
+"""
+from typing import NamedTuple
+
+from brownie import (
+    MockComptroller,
+    MockCToken,
+    MockERC20,
+    MockMasterChef,
+    MockPriceOracle,
+    MockUniswapV2Factory,
+    MockUniswapV2Router,
+)
+
+from scripts.strategy_config import CoreStrategyConfig, register_config
+
+LOCAL_STRATEGY = "LocalScreamLqdrSpooky"
+
+# USD prices the oracle reports and the pools are seeded at
+PRICES = {
+    "WETH": 3400,
+    "WFTM": 2.5,
+    "LINK": 25,
+    "LQDR": 15,
+    "SCREAM": 20,
+}
+
+# USD depth of each side of the strategy's pools and the reward token pools
+POOL_DEPTH = 3_400_000_000
+REWARD_POOL_DEPTH = 100_000_000
+# USD of each borrowable token supplied to its market
+MARKET_CASH = 1_000_000_000
+# USD of each short token handed to the whale, for simulating trades
+SHORT_WHALE_BALANCE = 50_000_000
+
+WHALE_WANT = 100_000 * 10 ** 18
+WHALE_REWARDS = 10_000_000 * 10 ** 18
+
+COLLATERAL_FACTOR = 0.75e18
+# Compound exchange rate of 0.02 for 18 decimal underlying and 8 decimal cToken
+INITIAL_EXCHANGE_RATE = 2e26
+# ~5% APR at a block a second
+BORROW_RATE_PER_BLOCK = 1585489599
+FARM_REWARD_PER_BLOCK = 1e18
+
+
+class LocalChain(NamedTuple):
+    config: CoreStrategyConfig
+    tokens: dict
+    router: object
+    oracle: object
+    comptroller: object
+    farm: object
+
+
+def _units(symbol, usd):
+    return int(usd * 10 ** 18) // int(PRICES[symbol] * 10 ** 18) * 10 ** 18
+
+
+def _add_liquidity(router, tokens, a, b, usd, deployer):
+    amount_a = _units(a, usd)
+    amount_b = _units(b, usd)
+    tokens[a].mint(deployer, amount_a, {"from": deployer})
+    tokens[b].mint(deployer, amount_b, {"from": deployer})
+    router.addLiquidity(
+        tokens[a],
+        tokens[b],
+        amount_a,
+        amount_b,
+        0,
+        0,
+        deployer,
+        2 ** 256 - 1,
+        {"from": deployer},
+    )
+
+
+def deploy_local_chain(deployer, whale) -> LocalChain:
+    """
+    Deploy the stand-in contracts from `deployer` and fund `whale` with want,
+    short and reward tokens. `deployer` is left holding all the LP tokens.
+    """
+    tx = {"from": deployer}
+    tokens = {
+        symbol: MockERC20.deploy(f"Mock {symbol}", symbol, 18, tx) for symbol in PRICES
+    }
+    factory = MockUniswapV2Factory.deploy(tx)
+    router = MockUniswapV2Router.deploy(factory, tokens["WFTM"], tx)
+    for token in tokens.values():
+        token.approve(router, 2 ** 256 - 1, tx)
+
+    pairs = {}
+    for a, b, usd in [
+        ("WETH", "WFTM", POOL_DEPTH),
+        ("WFTM", "LINK", POOL_DEPTH),
+        ("LQDR", "WFTM", REWARD_POOL_DEPTH),
+        ("SCREAM", "WFTM", REWARD_POOL_DEPTH),
+    ]:
+        _add_liquidity(router, tokens, a, b, usd, deployer)
+        pairs[a, b] = factory.getPair(tokens[a], tokens[b])
+
+    oracle = MockPriceOracle.deploy(tx)
+    comptroller = MockComptroller.deploy(oracle, tx)
+    c_tokens = {}
+    for symbol in ("WETH", "WFTM", "LINK"):
+        c_token = MockCToken.deploy(
+            tokens[symbol],
+            comptroller,
+            INITIAL_EXCHANGE_RATE,
+            BORROW_RATE_PER_BLOCK,
+            f"Mock cToken {symbol}",
+            f"c{symbol}",
+            tx,
+        )
+        comptroller._supportMarket(c_token, COLLATERAL_FACTOR, tx)
+        oracle.setUnderlyingPrice(c_token, int(PRICES[symbol] * 10 ** 18), tx)
+        c_tokens[symbol] = c_token
+
+    # seed the borrow markets with cash; the deployer never enters them
+    for symbol in ("WFTM", "LINK"):
+        cash = _units(symbol, MARKET_CASH)
+        tokens[symbol].mint(deployer, cash, tx)
+        tokens[symbol].approve(c_tokens[symbol], cash, tx)
+        c_tokens[symbol].mint(cash, tx)
+
+    farm = MockMasterChef.deploy(tokens["LQDR"], FARM_REWARD_PER_BLOCK, tx)
+    farm.add(pairs["WFTM", "LINK"], tx)
+
+    tokens["WETH"].mint(whale, WHALE_WANT, tx)
+    tokens["LQDR"].mint(whale, WHALE_REWARDS, tx)
+    tokens["SCREAM"].mint(whale, WHALE_REWARDS, tx)
+    for symbol in ("WFTM", "LINK"):
+        tokens[symbol].mint(whale, _units(symbol, SHORT_WHALE_BALANCE), tx)
+
+    config = CoreStrategyConfig(
+        want=tokens["WETH"].address,
+        short_a=tokens["WFTM"].address,
+        short_b=tokens["LINK"].address,
+        want_short_a_lp=pairs["WETH", "WFTM"],
+        short_a_short_b_lp=pairs["WFTM", "LINK"],
+        farm_token=tokens["LQDR"].address,
+        farm_token_lp=pairs["LQDR", "WFTM"],
+        farm_master_chef=farm.address,
+        farm_pid=0,
+        c_token_lend=c_tokens["WETH"].address,
+        c_token_borrow_a=c_tokens["WFTM"].address,
+        c_token_borrow_b=c_tokens["LINK"].address,
+        comp_token=tokens["SCREAM"].address,
+        comp_token_lp=pairs["SCREAM", "WFTM"],
+        comptroller=comptroller.address,
+        router=router.address,
+        min_deploy=10_000,
+    )
+    register_config(LOCAL_STRATEGY, config)
+    return LocalChain(config, tokens, router, oracle, comptroller, farm)
@@ -0,0 +1,165 @@
+"""
+The smallest `maxLoss` a `vault.withdraw(shares, recipient, maxLoss)` passes
+with, at the current block.
+
+`quote_vault_withdraw` follows yearn-vaults 0.4.3 `Vault.withdraw`. It works
+out the share value net of locked profit, then walks the withdrawal queue,
+where each strategy's `liquidatePosition` is replayed by
+`scripts.swap_predictor.quote_withdraw`. That covers the proportional loss
+when `totalDebt > totalAssets`, the `_withdraw` slippage and the
+`_liquidatedAmount + _loss <= _amountNeeded` clamp. The vault and every
+strategy in its queue are read once, pinned to one block, and any number of
+amounts can then be quoted off that state:
+
+    state = read_withdraw_state(vault, [strategy])
+    vault.withdraw(shares, user, min_max_loss(state, shares), {"from": user})
+
+The answer holds for the state it was read at. Pools and prices that move
+before the withdrawal lands can need a larger value, which is what
+`buffer_bps` is for.
+"""
+from typing import NamedTuple, Tuple
+
+from brownie import ZERO_ADDRESS, interface, multicall
+
+from scripts.snapshot import (
+    block_timestamp,
+    forget_reverted_multicall,
+    prepare_snapshots,
+    queue_snapshot,
+)
+from scripts.strategy_math import BASIS_PRECISION, safe_sub
+from scripts.swap_predictor import (
+    QuoteState,
+    WithdrawQuote,
+    quote_state,
+    quote_withdraw,
+)
+
+DEGRADATION_COEFFICIENT = 10 ** 18
+MAXIMUM_STRATEGIES = 20
+
+
+class VaultState(NamedTuple):
+    total_supply: int
+    total_idle: int
+    total_debt: int
+    locked_profit: int
+    locked_profit_degradation: int
+    last_report: int
+    timestamp: int  # block.timestamp the withdrawal is assumed to run at
+
+
+class WithdrawState(NamedTuple):
+    block_number: int
+    vault: VaultState
+    # the vault's withdrawal queue, in order
+    strategies: Tuple[QuoteState, ...]
+
+
+class VaultWithdrawQuote(NamedTuple):
+    shares: int
+    value: int  # paid out to the recipient
+    total_loss: int
+    max_loss: int  # the smallest maxLoss, in BASIS_PRECISION, that passes
+    strategy_quotes: Tuple[WithdrawQuote, ...]
+
+
+def locked_profit(vault: VaultState):
+    """`Vault._calculateLockedProfit`."""
+    ratio = (
+        safe_sub(vault.timestamp, vault.last_report) * vault.locked_profit_degradation
+    )
+    if ratio < DEGRADATION_COEFFICIENT:
+        return safe_sub(
+            vault.locked_profit,
+            ratio * vault.locked_profit // DEGRADATION_COEFFICIENT,
+        )
+    return 0
+
+
+def share_value(vault: VaultState, shares):
+    """`Vault._shareValue`."""
+    if vault.total_supply == 0:
+        return shares
+    free_funds = safe_sub(vault.total_idle + vault.total_debt, locked_profit(vault))
+    return shares * free_funds // vault.total_supply
+
+
+def required_max_loss(total_loss, value):
+    """Smallest `maxLoss` with `totalLoss <= maxLoss * (value + totalLoss) / MAX_BPS`."""
+    if total_loss == 0:
+        return 0
+    return -(-total_loss * BASIS_PRECISION // (value + total_loss))
+
+
+def quote_vault_withdraw(state: WithdrawState, shares) -> VaultWithdrawQuote:
+    value = share_value(state.vault, shares)
+    vault_balance = state.vault.total_idle
+    total_loss = 0
+    quotes = []
+    if value > vault_balance:
+        for strategy in state.strategies:
+            if value <= vault_balance:
+                break
+            amount_needed = min(value - vault_balance, strategy.total_debt)
+            if amount_needed == 0:
+                continue
+            quote = quote_withdraw(strategy, amount_needed)
+            quotes.append(quote)
+            vault_balance += quote.liquidated
+            if quote.loss > 0:
+                value -= quote.loss
+                total_loss += quote.loss
+        value = min(value, vault_balance)
+
+    return VaultWithdrawQuote(
+        shares=shares,
+        value=value,
+        total_loss=total_loss,
+        max_loss=required_max_loss(total_loss, value),
+        strategy_quotes=tuple(quotes),
+    )
+
+
+def min_max_loss(state: WithdrawState, shares, buffer_bps=0) -> int:
+    """The `maxLoss` to pass to `vault.withdraw(shares, recipient, maxLoss)`."""
+    max_loss = quote_vault_withdraw(state, shares).max_loss
+    return min(max_loss + buffer_bps, BASIS_PRECISION)
+
+
+def read_withdraw_state(
+    vault, strategies, block_identifier=None, multicall_address=None
+) -> WithdrawState:
+    """
+    Read `vault` and `strategies`, its withdrawal queue in order, at
+    `block_identifier` (default: latest), in one multicall.
+    """
+    vault = interface.IVault(str(vault))
+    prepare_snapshots(strategies)
+    if multicall_address is None:
+        forget_reverted_multicall()
+
+    with multicall(address=multicall_address, block_identifier=block_identifier):
+        block_number = multicall.block_number
+        timestamp = block_timestamp()
+        reads = (
+            vault.totalSupply(),
+            vault.totalIdle(),
+            vault.totalDebt(),
+            vault.lockedProfit(),
+            vault.lockedProfitDegradation(),
+            vault.lastReport(),
+        )
+        queue = [vault.withdrawalQueue(i) for i in range(MAXIMUM_STRATEGIES)]
+        pending = [queue_snapshot(s) for s in strategies]
+
+    queue = [str(s) for s in queue if str(s) != ZERO_ADDRESS]
+    if queue != [s.address for s in strategies]:
+        raise ValueError(f"strategies are not the withdrawal queue {queue}")
+
+    return WithdrawState(
+        block_number=block_number,
+        vault=VaultState(*(int(r) for r in reads), timestamp=int(timestamp)),
+        strategies=tuple(quote_state(p.result()) for p in pending),
+    )
@@ -0,0 +1,87 @@
+"""
+Per-block cache of the comptroller oracle's `getUnderlyingPrice`.
+
+`ScreamPriceOracle.getPrice` reads `comptroller.oracle()` and then two
+`getUnderlyingPrice`s, and `balanceDebt`, `_testPriceSource` and
+`calcCollateral` all go through it. Strategies on the same comptroller share
+the oracle, and so the prices. `OraclePriceCache` keeps the prices read at
+each block, by (oracle, cToken), in a `scripts.block_cache.BlockCache`, so
+each one is read from chain once per block for the whole process.
+
+`price_cache` is the instance shared by `read_snapshot` and the monitors:
+
+    prices = price_cache.prices(oracle, [c_token_lend, c_token_borrow_a], block)
+    price_a = price_cache.get_price(comptroller, c_token_lend, c_token_borrow_a, block)
+"""
+from typing import Dict, Iterable
+
+from brownie import interface, multicall
+
+from scripts.block_cache import DEFAULT_MAX_BLOCKS, BlockCache
+from scripts.strategy_math import STD_PRECISION
+
+
+class OraclePriceCache(BlockCache):
+    def __init__(self, max_blocks=DEFAULT_MAX_BLOCKS):
+        super().__init__(max_blocks)
+        # the comptroller oracle is assumed not to change under us
+        self._oracles: Dict[str, str] = {}
+
+    def oracle(self, comptroller) -> str:
+        """`comptroller.oracle()`, read once per comptroller."""
+        comptroller = str(comptroller)
+        if comptroller not in self._oracles:
+            oracle = interface.ComptrollerV5Storage(comptroller).oracle()
+            self._oracles[comptroller] = str(oracle)
+        return self._oracles[comptroller]
+
+    def lookup(self, oracle, c_tokens: Iterable[str], block_number) -> Dict[str, int]:
+        """The cached prices among `c_tokens` at `block_number`."""
+        oracle = str(oracle)
+        keys = [(oracle, str(c_token)) for c_token in c_tokens]
+        found = self.get_many(block_number, keys)
+        return {c_token: price for (_, c_token), price in found.items()}
+
+    def store(self, oracle, block_number, prices: Dict[str, int]):
+        oracle = str(oracle)
+        self.put_many(
+            block_number,
+            {(oracle, str(c_token)): int(price) for c_token, price in prices.items()},
+        )
+
+    def prices(
+        self, oracle, c_tokens, block_number, multicall_address=None
+    ) -> Dict[str, int]:
+        """
+        `getUnderlyingPrice` of each of `c_tokens` at `block_number`, reading
+        the ones not cached in a single multicall.
+        """
+        c_tokens = [str(c) for c in c_tokens]
+        found = self.lookup(oracle, c_tokens, block_number)
+        missing = [c for c in c_tokens if c not in found]
+        if missing:
+            price_oracle = interface.ICompPriceOracle(str(oracle))
+            with multicall(address=multicall_address, block_identifier=block_number):
+                reads = [price_oracle.getUnderlyingPrice(c) for c in missing]
+            fresh = {c: int(price) for c, price in zip(missing, reads)}
+            self.store(oracle, block_number, fresh)
+            found.update(fresh)
+        return found
+
+    def get_price(self, comptroller, c_token_quote, c_token_base, block_number) -> int:
+        """`ScreamPriceOracle.getPrice` at `block_number`."""
+        prices = self.prices(
+            self.oracle(comptroller), [c_token_quote, c_token_base], block_number
+        )
+        quote_price = prices[str(c_token_quote)]
+        base_price = prices[str(c_token_base)]
+        if quote_price == 0 or base_price == 0:
+            raise ValueError("price not available")
+        return base_price * STD_PRECISION // quote_price
+
+    def _reset(self):
+        super()._reset()
+        self._oracles.clear()
+
+
+price_cache = OraclePriceCache()
@@ -0,0 +1,308 @@
+"""
+Watch `_testPriceSource` for a fleet of strategies, block by block.
+
+`_deploy`, `_withdraw` and `rebalanceDebt` all revert when the oracle price of
+shortA or shortB drifts more than `priceSourceDiff` from the pool price.
+`PriceSourceMonitor` keeps both sides current for every strategy:
+
+  - pool prices from a `ReserveIndex` over the strategies' pairs, so only
+    pairs that emitted `Sync` move
+  - oracle prices from `scripts.oracle_cache.price_cache`, one multicall per
+    update for each distinct (oracle, cToken), whatever the number of
+    strategies sharing them
+
+A strategy's ratios are only recomputed when one of its inputs changed. The
+recent ratios are fitted with a straight line to estimate the block each one
+crosses its band. `render_metrics` writes it all in the Prometheus text
+format:
+
+    monitor = PriceSourceMonitor([strategy, ...])
+    while True:
+        readings = monitor.update()
+        path.write_text(render_metrics(readings))
+
+Or, writing `PRICE_METRICS_PATH` (default `reports/price_source.prom`) every
+`interval` seconds:
+
+    brownie run price_monitor main WETHWFTMLINKScreamLqdrSpooky:<strategy> ...
+
+`priceSourceDiff` and `doPriceCheck` are read when a strategy is added.
+"""
+import math
+import os
+import time
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from brownie import interface, multicall
+
+from scripts import strategy_math
+from scripts.atomic import atomic_path
+from scripts.oracle_cache import price_cache
+from scripts.reserve_index import ReserveIndex, StrategyPairs, strategy_pairs
+from scripts.snapshot import forget_reverted_multicall, result_value
+from scripts.strategy_config import get_config, load_strategy
+from scripts.strategy_math import BASIS_PRECISION, STD_PRECISION, PositionState
+
+METRICS_PATH = Path(
+    os.getenv(
+        "PRICE_METRICS_PATH",
+        Path(__file__).parent.parent / "reports" / "price_source.prom",
+    )
+)
+
+# ratios kept per strategy to fit the trend to
+DEFAULT_TREND_WINDOW = 32
+
+
+class MonitoredStrategy(NamedTuple):
+    strategy: str
+    pairs: StrategyPairs
+    oracle: str
+    c_token_lend: str
+    c_token_borrow_a: str
+    c_token_borrow_b: str
+    price_source_diff: int
+    do_price_check: bool
+
+    @property
+    def price_keys(self):
+        return [
+            (self.oracle, c_token)
+            for c_token in (
+                self.c_token_lend,
+                self.c_token_borrow_a,
+                self.c_token_borrow_b,
+            )
+        ]
+
+
+class PriceSourceReading(NamedTuple):
+    strategy: str
+    block_number: int
+    ratio_a: int  # oracle / pool price of shortA, in BASIS_PRECISION
+    ratio_b: int
+    lower: int  # both ratios must be strictly between lower and upper
+    upper: int
+    ok: bool  # `_testPriceSource()`
+    margin: int  # distance to the nearest band edge, negative when failing
+    # block the trend crosses a band edge at, None if it isn't heading to one
+    predicted_failure_block: Optional[int]
+
+
+def _empty_state() -> PositionState:
+    return PositionState(*(0 for _ in PositionState._fields))
+
+
+def blocks_to_breach(blocks, ratios, lower, upper) -> Optional[float]:
+    """
+    Blocks from the last of `blocks` until a straight line fitted to `ratios`
+    leaves (lower, upper). 0 when already outside, None when the fit is flat,
+    moving away, or there are fewer than two points.
+    """
+    last = ratios[-1]
+    if not lower < last < upper:
+        return 0.0
+    if len(blocks) < 2 or blocks[-1] == blocks[0]:
+        return None
+    slope = np.polyfit(np.asarray(blocks, float), np.asarray(ratios, float), 1)[0]
+    if slope > 0:
+        return (upper - last) / slope
+    if slope < 0:
+        return (lower - last) / slope
+    return None
+
+
+class PriceSourceMonitor:
+    def __init__(
+        self,
+        strategies,
+        start_block=None,
+        trend_window=DEFAULT_TREND_WINDOW,
+        multicall_address=None,
+    ):
+        self.trend_window = trend_window
+        self.multicall_address = multicall_address
+        self.index = ReserveIndex([], start_block)
+        self.strategies: Dict[str, MonitoredStrategy] = {}
+        # (oracle, cToken) -> getUnderlyingPrice
+        self._prices: Dict[Tuple[str, str], int] = {}
+        self._trend: Dict[str, Deque[Tuple[int, int, int]]] = {}
+        self._readings: Dict[str, PriceSourceReading] = {}
+        self.add_strategies(strategies)
+
+    def add_strategies(self, strategies):
+        """Start watching `strategies`, entry contract objects."""
+        strategies = [s for s in strategies if s.address not in self.strategies]
+        if not strategies:
+            return
+        configs = [get_config(s) for s in strategies]
+        if self.multicall_address is None:
+            forget_reverted_multicall()
+        with multicall(
+            address=self.multicall_address, block_identifier=self.index.block_number
+        ):
+            reads = [
+                (
+                    interface.ComptrollerV5Storage(cfg.comptroller).oracle(),
+                    s.priceSourceDiff(),
+                    s.doPriceCheck(),
+                )
+                for s, cfg in zip(strategies, configs)
+            ]
+        for s, cfg, (oracle, diff, check) in zip(strategies, configs, reads):
+            pairs = strategy_pairs(s)
+            self.index.add_pairs(pairs.addresses)
+            self.strategies[s.address] = MonitoredStrategy(
+                strategy=s.address,
+                pairs=pairs,
+                oracle=str(oracle),
+                c_token_lend=cfg.c_token_lend,
+                c_token_borrow_a=cfg.c_token_borrow_a,
+                c_token_borrow_b=cfg.c_token_borrow_b,
+                price_source_diff=result_value(diff),
+                do_price_check=result_value(check),
+            )
+            self._trend[s.address] = deque(maxlen=self.trend_window)
+        self._read_prices(self.index.block_number)
+        for address in self.strategies:
+            if address not in self._readings:
+                self._evaluate(self.strategies[address], self.index.block_number)
+
+    def _read_prices(self, block_number):
+        """Refresh every oracle price, returning the keys that changed."""
+        by_oracle = {}
+        for m in self.strategies.values():
+            for oracle, c_token in m.price_keys:
+                by_oracle.setdefault(oracle, set()).add(c_token)
+        changed = set()
+        for oracle, c_tokens in by_oracle.items():
+            prices = price_cache.prices(
+                oracle, sorted(c_tokens), block_number, self.multicall_address
+            )
+            for c_token, price in prices.items():
+                if self._prices.get((oracle, c_token)) != price:
+                    self._prices[(oracle, c_token)] = price
+                    changed.add((oracle, c_token))
+        return changed
+
+    def _evaluate(self, m: MonitoredStrategy, block_number) -> PriceSourceReading:
+        # same maths as ScreamPriceOracle.getPrice
+        quote_price = self._prices[(m.oracle, m.c_token_lend)]
+        price_a = self._prices[(m.oracle, m.c_token_borrow_a)]
+        price_b = self._prices[(m.oracle, m.c_token_borrow_b)]
+        state = _empty_state()._replace(
+            price_a=price_a * STD_PRECISION // quote_price,
+            price_b=price_b * STD_PRECISION // quote_price,
+        )
+        lp = self.index.reserves(m.pairs.short_a_short_b_lp)
+        want_lp = self.index.reserves(m.pairs.want_short_a_lp)
+        short_a_in_lp, short_b_in_lp = strategy_math.get_lp_reserves(
+            *lp, m.pairs.short_a_is_token0
+        )
+        want_in_lp, short_a_in_lp_want = strategy_math.get_lp_reserves_want_short(
+            *want_lp, m.pairs.want_is_token0
+        )
+        state = state._replace(
+            short_a_in_lp=short_a_in_lp,
+            short_b_in_lp=short_b_in_lp,
+            want_in_lp=want_in_lp,
+            short_a_in_lp_want=short_a_in_lp_want,
+        )
+        ratio_a, ratio_b = strategy_math.price_source_ratios(state)
+        lower = BASIS_PRECISION - m.price_source_diff
+        upper = BASIS_PRECISION + m.price_source_diff
+
+        trend = self._trend[m.strategy]
+        if trend and trend[-1][0] == block_number:
+            trend.pop()
+        trend.append((block_number, ratio_a, ratio_b))
+        blocks = [b for b, _, _ in trend]
+        breach = [
+            blocks_to_breach(blocks, [t[i] for t in trend], lower, upper)
+            for i in (1, 2)
+        ]
+        breach = [b for b in breach if b is not None]
+        predicted = block_number + math.ceil(min(breach)) if breach else None
+
+        margin = min(min(r - lower, upper - r) for r in (ratio_a, ratio_b))
+        ok = (not m.do_price_check) or margin > 0
+        reading = PriceSourceReading(
+            strategy=m.strategy,
+            block_number=block_number,
+            ratio_a=ratio_a,
+            ratio_b=ratio_b,
+            lower=lower,
+            upper=upper,
+            ok=ok,
+            margin=margin,
+            predicted_failure_block=predicted if m.do_price_check else None,
+        )
+        self._readings[m.strategy] = reading
+        return reading
+
+    def update(self, to_block=None) -> List[PriceSourceReading]:
+        """
+        Follow the chain up to `to_block` (default: latest) and return the
+        current reading of every strategy. Only strategies whose pairs synced
+        or whose oracle prices moved are recomputed.
+        """
+        before = {pair: self.index.reserves(pair) for pair in self.index.pairs}
+        self.index.sync(to_block)
+        block_number = self.index.block_number
+        moved = {p for p, r in before.items() if self.index.reserves(p) != r}
+        changed_prices = self._read_prices(block_number)
+        for m in self.strategies.values():
+            if moved.intersection(m.pairs.addresses) or changed_prices.intersection(
+                m.price_keys
+            ):
+                self._evaluate(m, block_number)
+        return self.readings()
+
+    def readings(self) -> List[PriceSourceReading]:
+        return [self._readings[s] for s in self.strategies]
+
+
+def render_metrics(readings: List[PriceSourceReading]) -> str:
+    """`readings` in the Prometheus text exposition format."""
+    gauges = {
+        "price_source_ratio": "oracle over pool price in basis points",
+        "price_source_ok": "1 while _testPriceSource passes",
+        "price_source_margin": "basis points to the nearest band edge",
+        "price_source_predicted_failure_block": "block the trend leaves the band",
+        "price_source_block": "block the reading is for",
+    }
+    samples = {name: [] for name in gauges}
+    for r in readings:
+        label = f'strategy="{r.strategy}"'
+        samples["price_source_ratio"].append((f'{label},token="shortA"', r.ratio_a))
+        samples["price_source_ratio"].append((f'{label},token="shortB"', r.ratio_b))
+        samples["price_source_ok"].append((label, int(r.ok)))
+        samples["price_source_margin"].append((label, r.margin))
+        if r.predicted_failure_block is not None:
+            samples["price_source_predicted_failure_block"].append(
+                (label, r.predicted_failure_block)
+            )
+        samples["price_source_block"].append((label, r.block_number))
+
+    lines = []
+    for name, help_text in gauges.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(f"{name}{{{labels}}} {value}" for labels, value in samples[name])
+    return "\n".join(lines) + "\n"
+
+
+def main(*strategies, interval=5):
+    parsed = [load_strategy(entry) for entry in strategies]
+    monitor = PriceSourceMonitor(parsed)
+    while True:
+        readings = monitor.update()
+        with atomic_path(METRICS_PATH) as tmp:
+            tmp.write_text(render_metrics(readings))
+        for r in readings:
+            if not r.ok:
+                print(f"{r.strategy} price source check fails at {r.block_number}")
+        time.sleep(interval)
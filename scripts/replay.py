@@ -0,0 +1,435 @@
+"""
+Capture sequences of keeper, user and market transactions, and replay them.
+
+`capture` reads a block range of a deployed strategy from logs and turns it
+into a `Sequence` of actions:
+
+  - `harvest`, `rebalanceDebt` and `rebalanceCollateral`, from the txs that
+    made the vault report for the strategy or moved its `shortAshortBLP`
+    tokens, calling one of those functions directly (through the strategy or
+    a `KeeperProxy`, which share the selectors)
+  - `withdraw` and `deposit`, from the vault's share burns and mints
+  - `swap`, from the `Swap`s on `shortAshortBLP` and `wantShortALP` that
+    aren't part of any of the above, like `offSetDebtRatioA` in the tests
+  - each action's time since the start of the range
+
+Amounts are stored relative to the state they ran against, shares as a
+fraction of `totalSupply` and swaps as a fraction of the input reserve, both
+in `PRECISION`, so a sequence replays with the same effect against a fork of
+another block or the local stand-in chain.
+
+`replay` runs a sequence against a deployment, from the current state, and
+reverts the chain afterwards. It records the gas of every action and the
+strategy's `estimatedTotalAssets` at the end. `replay_batch` replays several
+sequences from the same state, and `compare` flags what a contract change
+made worse:
+
+    sequence = load_sequence(REPLAY_DIR / "harvest_week.json")
+    baseline = replay_batch([sequence], env)
+    ...  # deploy the changed strategy
+    for diff in compare(baseline, replay_batch([sequence], changed_env)):
+        print(diff)
+
+Capture a range, with an archive node, to `REPLAY_DIR/<name>.json`:
+
+    brownie run replay main WETHWFTMLINKScreamLqdrSpooky:<strategy> 30000000 30100000 <name> --network ftm-main
+
+`replay` takes its own `chain.snapshot()` and puts back the one it found
+afterwards, so a later `chain.revert()`, like brownie's `fn_isolation`, still
+goes back to where it did before. Time is pinned too: before each action a
+block is mined at the timestamp of the block replayed from plus the action's
+recorded offset, never at wall-clock time. Two replays from the same state
+then accrue the same interest and rewards and end with the same
+`estimatedTotalAssets`, so `compare` flags any drop in it.
+"""
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from brownie import chain, interface, web3
+from brownie.exceptions import VirtualMachineError
+from eth_utils import keccak
+from hexbytes import HexBytes
+
+from scripts.gas import GAS_TOLERANCE
+from scripts.reserve_index import MAX_LOG_RANGE, SYNC_TOPIC, strategy_pairs
+from scripts.strategy_config import get_config, load_strategy
+
+REPLAY_DIR = Path(
+    os.getenv("REPLAY_DIR", Path(__file__).parent.parent / "tests" / "replays")
+)
+
+# fractions of shares and reserves
+PRECISION = 10 ** 18
+
+KEEPER_ACTIONS = ("harvest", "rebalanceDebt", "rebalanceCollateral")
+KINDS = KEEPER_ACTIONS + ("withdraw", "deposit", "swap")
+
+SELECTORS = {keccak(text=f"{name}()")[:4]: name for name in KEEPER_ACTIONS}
+
+SWAP_TOPIC = (
+    "0x" + keccak(text="Swap(address,uint256,uint256,uint256,uint256,address)").hex()
+)
+TRANSFER_TOPIC = "0x" + keccak(text="Transfer(address,address,uint256)").hex()
+STRATEGY_REPORTED_TOPIC = (
+    "0x"
+    + keccak(
+        text="StrategyReported(address,uint256,uint256,uint256,uint256,uint256,uint256,uint256,uint256)"
+    ).hex()
+)
+_ZERO_TOPIC = "0x" + "00" * 32
+
+
+class Action(NamedTuple):
+    kind: str  # one of KINDS
+    timestamp: int  # seconds since the start of the sequence
+    # withdraw, deposit: {"fraction"} of totalSupply
+    # swap: {"pair": "lp" | "want_lp", "token_in": "want" | "shortA" | "shortB",
+    #        "fraction"} of the input reserve
+    params: Dict[str, object] = {}
+
+
+class Sequence(NamedTuple):
+    name: str
+    actions: Tuple[Action, ...]
+
+
+class ReplayEnv(NamedTuple):
+    strategy: object
+    vault: object
+    keeper: object  # calls harvest and the rebalances
+    user: object  # holds the shares withdrawals burn
+    router: object  # the router market swaps go through
+    # "want", "shortA", "shortB" -> account holding the token for swaps and deposits
+    whales: Dict[str, object]
+
+
+class ReplayResult(NamedTuple):
+    name: str
+    # gas used by each action, None where it reverted or had nothing to do
+    gas_used: Tuple[Optional[int], ...]
+    reverted: Tuple[int, ...]  # indexes of the actions that reverted
+    estimated_total_assets: int
+
+    @property
+    def keeper_gas(self) -> int:
+        return sum(g or 0 for g in self.gas_used)
+
+
+class ReplayDiff(NamedTuple):
+    name: str
+    action: Optional[int]  # index into the sequence, None for the final assets
+    kind: str
+    baseline: object
+    candidate: object
+
+    def __str__(self):
+        where = "final assets" if self.action is None else f"#{self.action} {self.kind}"
+        return f"{self.name} {where}: {self.baseline} -> {self.candidate}"
+
+
+def save_sequence(sequence: Sequence, path=None) -> Path:
+    path = Path(path or REPLAY_DIR / f"{sequence.name}.json")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {
+        "name": sequence.name,
+        "actions": [a._asdict() for a in sequence.actions],
+    }
+    path.write_text(json.dumps(data, indent=2) + "\n")
+    return path
+
+
+def load_sequence(path) -> Sequence:
+    data = json.loads(Path(path).read_text())
+    actions = tuple(Action(**a) for a in data["actions"])
+    unknown = {a.kind for a in actions} - set(KINDS)
+    if unknown:
+        raise ValueError(f"unknown actions {sorted(unknown)}")
+    return Sequence(data["name"], actions)
+
+
+# capture
+
+
+def _topic(address) -> str:
+    return "0x" + "00" * 12 + str(address)[2:].lower()
+
+
+def _logs(address, topics, from_block, to_block) -> List[dict]:
+    logs = []
+    for start in range(from_block, to_block + 1, MAX_LOG_RANGE):
+        logs += web3.eth.get_logs(
+            {
+                "address": str(address),
+                "topics": topics,
+                "fromBlock": start,
+                "toBlock": min(start + MAX_LOG_RANGE - 1, to_block),
+            }
+        )
+    return logs
+
+
+def _position(log) -> Tuple[int, int, int]:
+    return log["blockNumber"], log["transactionIndex"], log["logIndex"]
+
+
+def _words(data) -> List[int]:
+    data = HexBytes(data)
+    return [int.from_bytes(data[i : i + 32], "big") for i in range(0, len(data), 32)]
+
+
+def _keeper_calls(strategy, vault, lp, from_block, to_block) -> Dict[str, tuple]:
+    """tx hash -> (position, keeper action) of the strategy's keeper calls."""
+    strategy_topic = _topic(strategy.address)
+    logs = _logs(vault, [STRATEGY_REPORTED_TOPIC, strategy_topic], from_block, to_block)
+    logs += _logs(lp, [TRANSFER_TOPIC, strategy_topic], from_block, to_block)
+    logs += _logs(lp, [TRANSFER_TOPIC, None, strategy_topic], from_block, to_block)
+    calls = {}
+    for log in sorted(logs, key=_position):
+        tx_hash = log["transactionHash"].hex()
+        if tx_hash in calls:
+            continue
+        tx = web3.eth.get_transaction(tx_hash)
+        kind = SELECTORS.get(bytes(HexBytes(tx["input"])[:4]))
+        calls[tx_hash] = (_position(log), kind)
+    return calls
+
+
+def _share_changes(vault, from_block, to_block) -> List[tuple]:
+    """(position, tx hash, kind, fraction) of every share burn and mint."""
+    vault = interface.IVault(str(vault))
+    changes = []
+    for kind, topics in (
+        ("withdraw", [TRANSFER_TOPIC, None, _ZERO_TOPIC]),
+        ("deposit", [TRANSFER_TOPIC, _ZERO_TOPIC]),
+    ):
+        for log in _logs(vault, topics, from_block, to_block):
+            shares = _words(log["data"])[0]
+            supply = vault.totalSupply(block_identifier=log["blockNumber"] - 1)
+            fraction = shares * PRECISION // supply if supply else PRECISION
+            changes.append(
+                (_position(log), log["transactionHash"].hex(), kind, fraction)
+            )
+    return changes
+
+
+def _market_swaps(pairs, from_block, to_block) -> List[tuple]:
+    """(position, tx hash, params) of every swap on the strategy's pairs."""
+    lp_tokens = ("shortA", "shortB")
+    want_lp_tokens = ("want", "shortA")
+    tracked = [
+        (
+            pairs.short_a_short_b_lp,
+            "lp",
+            lp_tokens if pairs.short_a_is_token0 else lp_tokens[::-1],
+        ),
+        (
+            pairs.want_short_a_lp,
+            "want_lp",
+            want_lp_tokens if pairs.want_is_token0 else want_lp_tokens[::-1],
+        ),
+    ]
+    swaps = []
+    for pair, name, tokens in tracked:
+        logs = _logs(pair, [[SYNC_TOPIC, SWAP_TOPIC]], from_block, to_block)
+        reserves = None
+        for log in sorted(logs, key=_position):
+            words = _words(log["data"])
+            if HexBytes(log["topics"][0]) == HexBytes(SYNC_TOPIC):
+                reserves = words
+                continue
+            # a pair emits Sync with the reserves after the swap, then Swap
+            amount0_in, amount1_in, amount0_out, amount1_out = words
+            i = 0 if amount0_in > amount0_out else 1
+            amount_in = (amount0_in, amount1_in)[i]
+            reserve_in = reserves[i] - amount_in + (amount0_out, amount1_out)[i]
+            params = {
+                "pair": name,
+                "token_in": tokens[i],
+                "fraction": amount_in * PRECISION // reserve_in,
+            }
+            swaps.append((_position(log), log["transactionHash"].hex(), params))
+    return swaps
+
+
+def capture(strategy, name, from_block, to_block) -> Sequence:
+    """
+    The `Sequence` of what happened to `strategy` between `from_block` and
+    `to_block`, inclusive.
+    """
+    cfg = get_config(strategy)
+    vault = strategy.vault()
+    pairs = strategy_pairs(strategy)
+
+    keeper = _keeper_calls(
+        strategy, vault, cfg.short_a_short_b_lp, from_block, to_block
+    )
+    shares = _share_changes(vault, from_block, to_block)
+    user_txs = {tx_hash for _, tx_hash, _, _ in shares}
+
+    events = [(position, kind, {}) for position, kind in keeper.values() if kind]
+    events += [
+        (position, kind, {"fraction": fraction})
+        for position, tx_hash, kind, fraction in shares
+        if tx_hash not in keeper or not keeper[tx_hash][1]
+    ]
+    events += [
+        (position, "swap", params)
+        for position, tx_hash, params in _market_swaps(pairs, from_block, to_block)
+        if tx_hash not in keeper and tx_hash not in user_txs
+    ]
+    events.sort(key=lambda e: e[0])
+
+    timestamps = {}
+
+    def timestamp(block_number):
+        if block_number not in timestamps:
+            timestamps[block_number] = web3.eth.get_block(block_number).timestamp
+        return timestamps[block_number]
+
+    start = timestamp(from_block)
+    actions = tuple(
+        Action(kind, timestamp(position[0]) - start, params)
+        for position, kind, params in events
+    )
+    return Sequence(name, actions)
+
+
+# replay
+
+
+def _token(strategy, role):
+    address = {
+        "want": strategy.want,
+        "shortA": strategy.shortA,
+        "shortB": strategy.shortB,
+    }
+    return interface.IERC20Extended(address[role]())
+
+
+def _swap(action: Action, env: ReplayEnv):
+    params = action.params
+    cfg = get_config(env.strategy)
+    pair = interface.IUniswapV2Pair(
+        cfg.short_a_short_b_lp if params["pair"] == "lp" else cfg.want_short_a_lp
+    )
+    roles = ("shortA", "shortB") if params["pair"] == "lp" else ("want", "shortA")
+    token_in = _token(env.strategy, params["token_in"])
+    token_out = _token(
+        env.strategy, roles[1] if params["token_in"] == roles[0] else roles[0]
+    )
+    reserves = pair.getReserves()
+    reserve_in = reserves[0] if pair.token0() == token_in.address else reserves[1]
+    whale = env.whales[params["token_in"]]
+    amount = min(
+        reserve_in * params["fraction"] // PRECISION, token_in.balanceOf(whale)
+    )
+    if amount == 0:
+        return None
+    if token_in.allowance(whale, env.router) < amount:
+        token_in.approve(env.router, 2 ** 256 - 1, {"from": whale})
+    return env.router.swapExactTokensForTokens(
+        amount, 0, [token_in, token_out], whale, 2 ** 256 - 1, {"from": whale}
+    )
+
+
+def _apply(action: Action, env: ReplayEnv):
+    """Run one action, returning its transaction, None if it had nothing to do."""
+    if action.kind in KEEPER_ACTIONS:
+        return getattr(env.strategy, action.kind)({"from": env.keeper})
+    if action.kind == "withdraw":
+        shares = env.vault.totalSupply() * action.params["fraction"] // PRECISION
+        shares = min(shares, env.vault.balanceOf(env.user))
+        if shares == 0:
+            return None
+        return env.vault.withdraw(shares, {"from": env.user})
+    if action.kind == "deposit":
+        token = _token(env.strategy, "want")
+        whale = env.whales["want"]
+        amount = env.vault.totalAssets() * action.params["fraction"] // PRECISION
+        amount = min(amount, token.balanceOf(whale))
+        if amount == 0:
+            return None
+        token.approve(env.vault, amount, {"from": whale})
+        return env.vault.deposit(amount, {"from": whale})
+    if action.kind == "swap":
+        return _swap(action, env)
+    raise ValueError(f"unknown action {action.kind}")
+
+
+def replay(sequence: Sequence, env: ReplayEnv) -> ReplayResult:
+    """Replay `sequence` from the current state, which is restored afterwards."""
+    # chain.snapshot() replaces the snapshot chain.revert() goes back to, and
+    # brownie has no stack of them, so keep the outer one (eg fn_isolation's).
+    # Ganache keeps snapshots older than the one reverted to.
+    outer = chain._snapshot_id
+    chain.snapshot()
+    try:
+        # the offsets count from the block replayed from, not from wall-clock
+        # time, so every replay of a state mines the same timestamps
+        start = web3.eth.get_block("latest").timestamp + 1
+        gas_used = []
+        reverted = []
+        for i, action in enumerate(sequence.actions):
+            chain.mine(timestamp=start + action.timestamp)
+            try:
+                tx = _apply(action, env)
+            except VirtualMachineError:
+                reverted.append(i)
+                tx = None
+            gas_used.append(None if tx is None else tx.gas_used)
+        assets = env.strategy.estimatedTotalAssets()
+    finally:
+        chain.revert()
+        chain._snapshot_id = outer
+    return ReplayResult(sequence.name, tuple(gas_used), tuple(reverted), assets)
+
+
+def replay_batch(sequences, env: ReplayEnv) -> List[ReplayResult]:
+    """Replay each of `sequences` from the same, current, state."""
+    return [replay(sequence, env) for sequence in sequences]
+
+
+def compare(
+    baseline: List[ReplayResult],
+    candidate: List[ReplayResult],
+    sequences=None,
+    gas_tolerance=GAS_TOLERANCE,
+) -> List[ReplayDiff]:
+    """
+    What got worse from `baseline` to `candidate`, results of the same
+    sequences: an action using more than `gas_tolerance` extra gas or
+    reverting where it didn't, or a lower final `estimatedTotalAssets`.
+    Replays are deterministic, so any drop in assets counts. Pass the
+    `sequences` to name the actions.
+    """
+    diffs = []
+    for n, (base, cand) in enumerate(zip(baseline, candidate)):
+        if base.name != cand.name or len(base.gas_used) != len(cand.gas_used):
+            raise ValueError(f"{base.name} and {cand.name} are not the same sequence")
+        kinds = [a.kind for a in sequences[n].actions] if sequences else None
+        for i, (b, c) in enumerate(zip(base.gas_used, cand.gas_used)):
+            kind = kinds[i] if kinds else ""
+            if i in cand.reverted and i not in base.reverted:
+                diffs.append(ReplayDiff(base.name, i, kind, "ok", "reverted"))
+            elif b and c and c > b * (1 + gas_tolerance):
+                diffs.append(ReplayDiff(base.name, i, kind, b, c))
+        if cand.estimated_total_assets < base.estimated_total_assets:
+            diffs.append(
+                ReplayDiff(
+                    base.name,
+                    None,
+                    "",
+                    base.estimated_total_assets,
+                    cand.estimated_total_assets,
+                )
+            )
+    return diffs
+
+
+def main(strategy, from_block, to_block, name):
+    strategy = load_strategy(strategy)
+    sequence = capture(strategy, name, int(from_block), int(to_block))
+    path = save_sequence(sequence)
+    print(f"captured {len(sequence.actions)} actions to {path}")
@@ -0,0 +1,170 @@
+"""
+Track UniswapV2 pair reserves from `Sync` logs rather than `getReserves()`.
+
+Nearly every CoreStrategy view depends on the reserves of `shortAshortBLP` and
+`wantShortALP`, and a pair emits `Sync(reserve0, reserve1)` whenever they
+change. `ReserveIndex` reads `getReserves()` once per pair, then follows the
+`Sync` logs of every pair it tracks with one `eth_getLogs` per `sync()`, and
+keeps the reserves at each block it saw a change in memory. Fantom blocks are
+final once seen, so reorgs are not handled.
+
+`with_reserves` swaps the reserves in a `PositionState` for the index's, so
+the `scripts.strategy_math` views can be recomputed at every block the pools
+move without touching the strategy:
+
+    pairs = strategy_pairs(strategy)
+    index = ReserveIndex(pairs.addresses)
+    state = read_snapshot(strategy).position_state()
+    while True:
+        for block in index.sync():
+            views = strategy_math.evaluate(with_reserves(state, index, pairs, block))
+"""
+from bisect import bisect_right
+from typing import Dict, List, NamedTuple
+
+from brownie import interface, multicall, web3
+from eth_utils import keccak
+from hexbytes import HexBytes
+
+from scripts import strategy_math
+from scripts.snapshot import forget_reverted_multicall
+from scripts.strategy_config import get_config
+
+SYNC_TOPIC = "0x" + keccak(text="Sync(uint112,uint112)").hex()
+
+# blocks of reserves kept per pair, older ones are dropped
+DEFAULT_HISTORY = 1024
+# block range per eth_getLogs request, to stay under provider limits
+MAX_LOG_RANGE = 2000
+
+
+class StrategyPairs(NamedTuple):
+    short_a_short_b_lp: str
+    want_short_a_lp: str
+    short_a_is_token0: bool
+    want_is_token0: bool
+
+    @property
+    def addresses(self):
+        return [self.short_a_short_b_lp, self.want_short_a_lp]
+
+
+def strategy_pairs(strategy) -> StrategyPairs:
+    """The two pairs behind a strategy's reserves, and their token order."""
+    cfg = get_config(strategy)
+    lp = interface.IUniswapV2Pair(cfg.short_a_short_b_lp)
+    want_lp = interface.IUniswapV2Pair(cfg.want_short_a_lp)
+    return StrategyPairs(
+        short_a_short_b_lp=lp.address,
+        want_short_a_lp=want_lp.address,
+        short_a_is_token0=lp.token0() == cfg.short_a,
+        want_is_token0=want_lp.token0() == cfg.want,
+    )
+
+
+class ReserveIndex:
+    def __init__(self, pairs, start_block=None, history=DEFAULT_HISTORY):
+        """
+        Track `pairs` from `start_block` (default: latest), with their
+        reserves read at that block.
+        """
+        self.history = history
+        self.block_number = (
+            web3.eth.block_number if start_block is None else start_block
+        )
+        # pair -> ascending blocks, and the reserves from each of them on
+        self._blocks: Dict[str, List[int]] = {}
+        self._reserves: Dict[str, List[tuple]] = {}
+        self.add_pairs(pairs)
+
+    def add_pairs(self, pairs):
+        pairs = [web3.toChecksumAddress(str(p)) for p in pairs]
+        pairs = [p for p in pairs if p not in self._blocks]
+        if not pairs:
+            return
+        forget_reverted_multicall()
+        with multicall(block_identifier=self.block_number):
+            reserves = [interface.IUniswapV2Pair(p).getReserves() for p in pairs]
+        for pair, (reserve0, reserve1, _) in zip(pairs, reserves):
+            self._blocks[pair] = [self.block_number]
+            self._reserves[pair] = [(int(reserve0), int(reserve1))]
+
+    @property
+    def pairs(self):
+        return list(self._blocks)
+
+    def _ingest(self, log):
+        pair = web3.toChecksumAddress(log["address"])
+        block = log["blockNumber"]
+        data = HexBytes(log["data"])
+        reserves = (
+            int.from_bytes(data[:32], "big"),
+            int.from_bytes(data[32:64], "big"),
+        )
+        blocks = self._blocks[pair]
+        # a pair can sync several times in one block, the last one stands
+        if blocks[-1] == block:
+            self._reserves[pair][-1] = reserves
+        else:
+            blocks.append(block)
+            self._reserves[pair].append(reserves)
+        if len(blocks) > self.history:
+            del blocks[0]
+            del self._reserves[pair][0]
+
+    def sync(self, to_block=None) -> List[int]:
+        """
+        Ingest `Sync` logs up to `to_block` (default: latest) and return the
+        blocks any tracked pair's reserves changed in, in order.
+        """
+        to_block = web3.eth.block_number if to_block is None else to_block
+        changed = []
+        while self.block_number < to_block:
+            start = self.block_number + 1
+            end = min(to_block, self.block_number + MAX_LOG_RANGE)
+            logs = web3.eth.get_logs(
+                {
+                    "address": self.pairs,
+                    "topics": [SYNC_TOPIC],
+                    "fromBlock": start,
+                    "toBlock": end,
+                }
+            )
+            for log in logs:
+                self._ingest(log)
+                if not changed or changed[-1] != log["blockNumber"]:
+                    changed.append(log["blockNumber"])
+            self.block_number = end
+        return changed
+
+    def reserves(self, pair, block=None):
+        """`getReserves()` of `pair` at `block` (default: latest ingested)."""
+        pair = web3.toChecksumAddress(str(pair))
+        if block is None:
+            return self._reserves[pair][-1]
+        blocks = self._blocks[pair]
+        i = bisect_right(blocks, block)
+        if i == 0 or block > self.block_number:
+            raise KeyError(f"{pair} reserves at block {block} are not indexed")
+        return self._reserves[pair][i - 1]
+
+
+def with_reserves(
+    state: strategy_math.PositionState,
+    index: ReserveIndex,
+    pairs: StrategyPairs,
+    block=None,
+) -> strategy_math.PositionState:
+    """`state` with its pair reserves taken from `index` at `block`."""
+    short_a_in_lp, short_b_in_lp = strategy_math.get_lp_reserves(
+        *index.reserves(pairs.short_a_short_b_lp, block), pairs.short_a_is_token0
+    )
+    want_in_lp, short_a_in_lp_want = strategy_math.get_lp_reserves_want_short(
+        *index.reserves(pairs.want_short_a_lp, block), pairs.want_is_token0
+    )
+    return state._replace(
+        short_a_in_lp=short_a_in_lp,
+        short_b_in_lp=short_b_in_lp,
+        want_in_lp=want_in_lp,
+        short_a_in_lp_want=short_a_in_lp_want,
+    )
@@ -0,0 +1,275 @@
+"""
+Best swap routes between the `CONFIG` tokens, cached until the pools move.
+
+`getTokenOutPath` always routes through shortA on the strategy's own router,
+and `convertAtoB` prices shortB in want through the same two pairs. Neither
+looks at other pools. `RouteCache` indexes every UniswapV2 pair between the
+tokens of `STRATEGY_CONFIG` on Spooky and Spirit, follows their reserves with
+a `scripts.reserve_index.ReserveIndex`, and considers every route of 1 to
+`max_hops` swaps on one router (so it can be sent as one
+`swapExactTokensForTokens`).
+
+For each (token in, token out) asked for, the output of every candidate
+route is computed on a log-spaced grid of input sizes at once, and the best
+route at each size is kept. A lookup is then an index into that grid, O(1),
+followed by one swap quote along the chosen route. An entry is dropped as
+soon as `sync` sees a `Sync` log on any pair its routes go through:
+
+    cache = RouteCache()
+    while True:
+        cache.sync()
+        choice = cache.best(farm_token, want, amount)
+
+`left_on_table` compares the strategy's fixed path with the best route.
+Amounts are floats in wei; the route choice is exact at the grid sizes and
+nearly so between them.
+"""
+from itertools import combinations
+from typing import Dict, List, NamedTuple, Set, Tuple
+
+import numpy as np
+from brownie import ZERO_ADDRESS, interface, multicall, web3
+
+from scripts.reserve_index import ReserveIndex
+from scripts.snapshot import forget_reverted_multicall
+from scripts.strategy_config import (
+    SPIRIT_ROUTER,
+    SPOOKY_ROUTER,
+    STRATEGY_CONFIG,
+    get_config,
+    load_strategy,
+)
+from scripts.strategy_math import BASIS_PRECISION
+from scripts.swap_predictor import path_amount_out, token_out_path
+
+DEX_ROUTERS = {"spooky": SPOOKY_ROUTER, "spirit": SPIRIT_ROUTER}
+DEFAULT_MAX_HOPS = 3
+# input sizes routes are ranked at, four per decade
+DEFAULT_SIZES = np.geomspace(1e3, 1e30, 109)
+
+
+class Pair(NamedTuple):
+    router: str
+    address: str
+    token0: str
+    token1: str
+
+
+class Route(NamedTuple):
+    router: str
+    tokens: Tuple[str, ...]  # the swap path
+    pairs: Tuple[str, ...]  # the pair of each hop
+
+
+class RouteChoice(NamedTuple):
+    route: Route
+    amount_in: float
+    amount_out: float
+
+
+class PathGap(NamedTuple):
+    fixed: RouteChoice  # getTokenOutPath on the strategy's router
+    best: RouteChoice
+
+    @property
+    def left_on_table(self) -> float:
+        return self.best.amount_out - self.fixed.amount_out
+
+    @property
+    def left_on_table_bps(self) -> float:
+        return self.left_on_table * BASIS_PRECISION / self.fixed.amount_out
+
+
+class _Entry(NamedTuple):
+    routes: List[Route]
+    best: np.ndarray  # index into routes at each grid size
+
+
+def config_tokens(configs=None) -> Set[str]:
+    """The tokens strategies swap: want, shorts, farm and comp tokens."""
+    configs = STRATEGY_CONFIG.values() if configs is None else configs
+    return {
+        web3.toChecksumAddress(token)
+        for cfg in configs
+        for token in (
+            cfg.want,
+            cfg.short_a,
+            cfg.short_b,
+            cfg.farm_token,
+            cfg.comp_token,
+        )
+    }
+
+
+def read_pairs(routers, tokens, multicall_address=None) -> List[Pair]:
+    """Every pair between two of `tokens` on each of `routers`' factories."""
+    tokens = sorted(tokens)
+    factories = {
+        r: interface.IUniswapV2Factory(interface.IUniswapV2Router01(r).factory())
+        for r in routers
+    }
+    if multicall_address is None:
+        forget_reverted_multicall()
+    with multicall(address=multicall_address):
+        found = [
+            (router, factory.getPair(a, b))
+            for router, factory in factories.items()
+            for a, b in combinations(tokens, 2)
+        ]
+    found = [(r, str(p)) for r, p in found if str(p) != ZERO_ADDRESS]
+    with multicall(address=multicall_address):
+        ends = [
+            (interface.IUniswapV2Pair(p).token0(), interface.IUniswapV2Pair(p).token1())
+            for _, p in found
+        ]
+    return [
+        Pair(router, address, str(token0), str(token1))
+        for (router, address), (token0, token1) in zip(found, ends)
+    ]
+
+
+class RouteCache:
+    def __init__(
+        self,
+        routers=None,
+        tokens=None,
+        start_block=None,
+        max_hops=DEFAULT_MAX_HOPS,
+        sizes=DEFAULT_SIZES,
+        multicall_address=None,
+    ):
+        """
+        Index the pairs between `tokens` (default: every config token) on
+        `routers` (default: Spooky and Spirit), with reserves from
+        `start_block` (default: latest).
+        """
+        routers = list(DEX_ROUTERS.values() if routers is None else routers)
+        tokens = config_tokens() if tokens is None else tokens
+        self.max_hops = max_hops
+        self.sizes = np.asarray(sizes, float)
+        self._log_sizes = np.log(self.sizes)
+        self.pairs: Dict[str, Pair] = {
+            p.address: p for p in read_pairs(routers, tokens, multicall_address)
+        }
+        # router -> token -> [(other token, pair)]
+        self._graph: Dict[str, Dict[str, list]] = {r: {} for r in routers}
+        for p in self.pairs.values():
+            edges = self._graph[p.router]
+            edges.setdefault(p.token0, []).append((p.token1, p.address))
+            edges.setdefault(p.token1, []).append((p.token0, p.address))
+        self.index = ReserveIndex(list(self.pairs), start_block)
+        self._entries: Dict[Tuple[str, str], _Entry] = {}
+        # pair -> entries with a route through it
+        self._by_pair: Dict[str, Set[Tuple[str, str]]] = {}
+        self._seen = {p: self.index.reserves(p) for p in self.pairs}
+
+    @property
+    def block_number(self) -> int:
+        return self.index.block_number
+
+    def routes(self, token_in, token_out) -> List[Route]:
+        """Every route of 1 to `max_hops` swaps on one router."""
+        token_in = web3.toChecksumAddress(str(token_in))
+        token_out = web3.toChecksumAddress(str(token_out))
+        routes = []
+        for router, edges in self._graph.items():
+            stack = [((token_in,), ())]
+            while stack:
+                tokens, pairs = stack.pop()
+                for other, pair in edges.get(tokens[-1], []):
+                    if other in tokens:
+                        continue
+                    if other == token_out:
+                        routes.append(Route(router, tokens + (other,), pairs + (pair,)))
+                    elif len(pairs) + 1 < self.max_hops:
+                        stack.append((tokens + (other,), pairs + (pair,)))
+        return routes
+
+    def _hops(self, route: Route):
+        hops = []
+        for token_in, pair in zip(route.tokens, route.pairs):
+            reserve0, reserve1 = self.index.reserves(pair)
+            if self.pairs[pair].token0 == token_in:
+                hops.append((float(reserve0), float(reserve1)))
+            else:
+                hops.append((float(reserve1), float(reserve0)))
+        return hops
+
+    def amount_out(self, route: Route, amount_in):
+        """What `amount_in` (a float or array) gets along `route` now."""
+        return path_amount_out(amount_in, self._hops(route))[0]
+
+    def _entry(self, token_in, token_out) -> _Entry:
+        key = (
+            web3.toChecksumAddress(str(token_in)),
+            web3.toChecksumAddress(str(token_out)),
+        )
+        if key not in self._entries:
+            routes = self.routes(*key)
+            if not routes:
+                raise KeyError(f"no route from {key[0]} to {key[1]}")
+            outputs = np.array([self.amount_out(r, self.sizes) for r in routes])
+            self._entries[key] = _Entry(routes, np.argmax(outputs, 0))
+            for route in routes:
+                for pair in route.pairs:
+                    self._by_pair.setdefault(pair, set()).add(key)
+        return self._entries[key]
+
+    def best(self, token_in, token_out, amount_in) -> RouteChoice:
+        """The best route for `amount_in`, from the nearest grid size."""
+        entry = self._entry(token_in, token_out)
+        step = self._log_sizes[1] - self._log_sizes[0]
+        i = int(round((np.log(max(amount_in, 1.0)) - self._log_sizes[0]) / step))
+        route = entry.routes[entry.best[min(max(i, 0), len(self.sizes) - 1)]]
+        return RouteChoice(route, amount_in, float(self.amount_out(route, amount_in)))
+
+    def sync(self, to_block=None) -> List[Tuple[str, str]]:
+        """
+        Follow the pairs up to `to_block` (default: latest), dropping every
+        entry a moved pair is on. Returns the dropped (token in, token out).
+        """
+        if not self.index.sync(to_block):
+            return []
+        dropped = set()
+        for pair, reserves in self._seen.items():
+            current = self.index.reserves(pair)
+            if current != reserves:
+                self._seen[pair] = current
+                dropped |= self._by_pair.pop(pair, set())
+        for key in dropped:
+            self._entries.pop(key, None)
+        return sorted(dropped)
+
+    def left_on_table(self, strategy, token_in, token_out, amount_in) -> PathGap:
+        """The strategy's `getTokenOutPath` swap against the best route."""
+        cfg = get_config(strategy)
+        tokens = tuple(
+            web3.toChecksumAddress(t)
+            for t in token_out_path(str(token_in), str(token_out), cfg.short_a)
+        )
+        fixed = next(
+            r for r in self.routes(token_in, token_out) if r[:2] == (cfg.router, tokens)
+        )
+        return PathGap(
+            fixed=RouteChoice(
+                fixed, amount_in, float(self.amount_out(fixed, amount_in))
+            ),
+            best=self.best(token_in, token_out, amount_in),
+        )
+
+
+def main(strategy, amount):
+    strategy = load_strategy(strategy)
+    cfg = get_config(strategy)
+    cache = RouteCache()
+    for token_in, token_out in (
+        (cfg.farm_token, cfg.short_a),
+        (cfg.farm_token, cfg.short_b),
+        (cfg.short_a, cfg.want),
+        (cfg.short_b, cfg.want),
+    ):
+        gap = cache.left_on_table(strategy, token_in, token_out, float(amount))
+        print(
+            f"{' -> '.join(gap.best.route.tokens)} on {gap.best.route.router}: "
+            f"{gap.left_on_table_bps:.1f} bps over {' -> '.join(gap.fixed.route.tokens)}"
+        )
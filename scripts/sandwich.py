@@ -0,0 +1,218 @@
+"""
+How much a sandwich takes from the strategy's unprotected swaps.
+
+`swapHarvestsTo` sells the farm token with `minOut = 0`, and `swapExactFromTo`
+only measures the slippage after the swap, so a searcher can buy ahead of
+either swap and sell straight after it. For a victim swap of size `v` along a
+route, the attacker picks the front-run `f` that maximises
+
+    back(f, v) - f
+
+where `back` is what selling the front-run's output back along the reversed
+route returns once the victim's swap has moved the reserves further. The
+victim receives `attacked_out` rather than `clean_out`, and the difference is
+the value extracted.
+
+Everything is vectorised over victim sizes. `sweep` solves the best front-run
+for every size at once with a golden-section search in log space, and
+`chunk_plan` uses that to weigh splitting one harvest into `n` swaps in
+separate blocks. A harvest's size is the farm's reward rate times the time
+between harvests, so the sweep over sizes is also a sweep over harvest
+intervals:
+
+    route = harvest_route(strategy)
+    sizes = np.geomspace(1e18, 1e22, 200)
+    result = sweep(route, sizes, attack_cost=gas_in_farm_token)
+    plan = chunk_plan(route, pending, chunk_cost=gas_per_harvest_in_sell_token)
+
+Amounts are floats in wei of the route's first token (front-run, profit) or
+last token (outputs). Between chunks the pools are assumed to be arbitraged
+back to where they were.
+"""
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+from brownie import interface, multicall
+
+from scripts.snapshot import forget_reverted_multicall
+from scripts.strategy_config import get_config, load_strategy
+from scripts.strategy_math import BASIS_PRECISION
+from scripts.swap_predictor import path_amount_out, token_out_path
+
+# golden-section steps, each shrinks the bracket by 0.618
+SEARCH_STEPS = 80
+# bracket of front-runs searched, relative to the first pool's input reserve
+MIN_FRONT = 1e-12
+MAX_FRONT = 10.0
+DEFAULT_MAX_CHUNKS = 16
+
+_INV_PHI = (np.sqrt(5) - 1) / 2
+
+
+class Route(NamedTuple):
+    block_number: int
+    tokens: Tuple[str, ...]  # the swap path
+    pairs: Tuple[str, ...]  # the pair of each hop
+    reserves: Tuple[Tuple[int, int], ...]  # (reserve in, reserve out) of each hop
+
+    @property
+    def hops(self):
+        return [(float(r_in), float(r_out)) for r_in, r_out in self.reserves]
+
+
+class SandwichSweep(NamedTuple):
+    sizes: np.ndarray  # victim swap sizes
+    front_run: np.ndarray  # best front-run, 0 where no attack pays
+    profit: np.ndarray  # attacker profit before attack_cost, in the input token
+    clean_out: np.ndarray  # victim output without the attack
+    attacked_out: np.ndarray  # victim output with it
+
+    @property
+    def extracted(self) -> np.ndarray:
+        return self.clean_out - self.attacked_out
+
+    @property
+    def extracted_bps(self) -> np.ndarray:
+        return self.extracted * BASIS_PRECISION / self.clean_out
+
+
+class ChunkPlan(NamedTuple):
+    chunks: np.ndarray  # 1 .. max_chunks
+    net_out: np.ndarray  # total output under attack, less chunk_cost per chunk
+    extracted: np.ndarray  # total extracted over all chunks
+
+    @property
+    def best(self) -> int:
+        return int(self.chunks[np.argmax(self.net_out)])
+
+
+def _reversed(hops):
+    return [(reserve_out, reserve_in) for reserve_in, reserve_out in reversed(hops)]
+
+
+def sandwich(front, victim, hops):
+    """Attacker profit and victim output of front-running `victim` with `front`."""
+    front_out, hops = path_amount_out(front, hops)
+    victim_out, hops = path_amount_out(victim, hops)
+    back, _ = path_amount_out(front_out, _reversed(hops))
+    return back - front, victim_out
+
+
+def best_front_run(victim, hops, max_front=None):
+    """The most profitable front-run for each of `victim`, and its profit."""
+    victim = np.asarray(victim, float)
+    reserve = hops[0][0]
+    lo = np.full(victim.shape, np.log(reserve * MIN_FRONT))
+    cap = (
+        reserve * MAX_FRONT
+        if max_front is None
+        else np.minimum(max_front, reserve * MAX_FRONT)
+    )
+    hi = np.broadcast_to(np.log(cap), victim.shape).astype(float)
+
+    def profit(log_front):
+        return sandwich(np.exp(log_front), victim, hops)[0]
+
+    for _ in range(SEARCH_STEPS):
+        c = hi - _INV_PHI * (hi - lo)
+        d = lo + _INV_PHI * (hi - lo)
+        left = profit(c) > profit(d)
+        hi = np.where(left, d, hi)
+        lo = np.where(left, lo, c)
+    front = np.exp((lo + hi) / 2)
+    return front, profit((lo + hi) / 2)
+
+
+def sweep(route: Route, sizes, attack_cost=0.0, max_front=None) -> SandwichSweep:
+    """
+    The best sandwich of a swap of each of `sizes` along `route`. Attacks
+    that don't make more than `attack_cost`, in the input token, aren't made.
+    `max_front` caps the attacker's capital, unlimited with flash loans.
+    """
+    sizes = np.asarray(sizes, float)
+    hops = route.hops
+    front, profit = best_front_run(sizes, hops, max_front)
+    attack = profit > attack_cost
+    front = np.where(attack, front, 0.0)
+    profit = np.where(attack, profit, 0.0)
+    clean_out, _ = path_amount_out(sizes, hops)
+    _, attacked_out = sandwich(front, sizes, hops)
+    return SandwichSweep(sizes, front, profit, clean_out, attacked_out)
+
+
+def chunk_plan(
+    route: Route,
+    amount,
+    max_chunks=DEFAULT_MAX_CHUNKS,
+    attack_cost=0.0,
+    chunk_cost=0.0,
+) -> ChunkPlan:
+    """
+    Selling `amount` as 1 to `max_chunks` equal swaps, each one sandwiched
+    and costing `chunk_cost` in the output token.
+    """
+    chunks = np.arange(1, max_chunks + 1)
+    result = sweep(route, amount / chunks, attack_cost)
+    net_out = chunks * result.attacked_out - chunks * chunk_cost
+    return ChunkPlan(chunks, net_out, chunks * result.extracted)
+
+
+def read_route(router, tokens, block_identifier=None, multicall_address=None) -> Route:
+    """The reserves along `tokens` on `router`'s factory."""
+    factory = interface.IUniswapV2Factory(
+        interface.IUniswapV2Router01(router).factory()
+    )
+    pairs = [
+        interface.IUniswapV2Pair(factory.getPair(a, b))
+        for a, b in zip(tokens, tokens[1:])
+    ]
+    if multicall_address is None:
+        forget_reverted_multicall()
+    with multicall(address=multicall_address, block_identifier=block_identifier):
+        block_number = multicall.block_number
+        reads = [(pair.token0(), pair.getReserves()) for pair in pairs]
+
+    reserves = []
+    for token_in, (token0, (reserve0, reserve1, _)) in zip(tokens, reads):
+        if str(token0) == str(token_in):
+            reserves.append((int(reserve0), int(reserve1)))
+        else:
+            reserves.append((int(reserve1), int(reserve0)))
+    return Route(
+        block_number=block_number,
+        tokens=tuple(str(t) for t in tokens),
+        pairs=tuple(p.address for p in pairs),
+        reserves=tuple(reserves),
+    )
+
+
+def harvest_route(
+    strategy,
+    block_identifier=None,
+    multicall_address=None,
+    sell_token: Optional[str] = None,
+) -> Route:
+    """
+    The route `_harvestInternal` sells the farm token along: to shortA when
+    `calcDebtRatioA() > calcDebtRatioB()`, else to shortB.
+    """
+    cfg = get_config(strategy)
+    if sell_token is None:
+        debt_a = strategy.calcDebtRatioA(block_identifier=block_identifier)
+        debt_b = strategy.calcDebtRatioB(block_identifier=block_identifier)
+        sell_token = cfg.short_a if debt_a > debt_b else cfg.short_b
+    path = token_out_path(cfg.farm_token, sell_token, cfg.short_a)
+    return read_route(cfg.router, path, block_identifier, multicall_address)
+
+
+def main(strategy):
+    strategy = load_strategy(strategy)
+    route = harvest_route(strategy)
+    sizes = route.hops[0][0] * np.geomspace(1e-6, 1e-1, 11)
+    result = sweep(route, sizes)
+    print(f"harvest route {' -> '.join(route.tokens)} at block {route.block_number}")
+    print(f"{'size':>12} {'front-run':>12} {'profit':>12} {'extracted bps':>14}")
+    for size, front, profit, bps in zip(
+        result.sizes, result.front_run, result.profit, result.extracted_bps
+    ):
+        print(f"{size:12.4e} {front:12.4e} {profit:12.4e} {bps:14.1f}")
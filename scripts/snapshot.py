@@ -0,0 +1,315 @@
+"""
+Read the full state of a CoreStrategy in a single aggregated call.
+
+Keepers and tests used to read `calcDebtRatioA()`, `calcDebtRatioB()`,
+`calcCollateral()`, `estimatedTotalAssets()` and friends one RPC call at a
+time. `read_snapshot` queues every public view of the strategy, the reserves of
+both pairs, the lending market and the vault params into one Multicall2
+`tryAggregate` at a pinned block, and returns an immutable `StrategySnapshot`.
+
+Views that revert on-chain (eg the debt ratios before anything is deployed)
+come back as `None`.
+
+To batch snapshots with other reads, queue them into a multicall that is
+already open and build them once it has returned. The strategies' handles
+are read by `prepare_snapshots`, before the multicall opens:
+
+    prepare_snapshots(strategies)
+    with multicall(block_identifier=block):
+        pending = [queue_snapshot(s) for s in strategies]
+        queue = [vault.withdrawalQueue(i) for i in range(20)]
+    snapshots = [p.result() for p in pending]
+"""
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from brownie import interface, multicall, web3
+from brownie._config import CONFIG
+
+from scripts.oracle_cache import price_cache
+from scripts.strategy_config import get_config
+from scripts.strategy_math import PositionState
+
+
+class StrategySnapshot(NamedTuple):
+    block_number: int
+    timestamp: int
+    strategy: str
+    # thresholds and settings
+    collat_lower: int
+    collat_target: int
+    collat_upper: int
+    debt_lower: int
+    debt_upper: int
+    rebalance_percent: int
+    slippage_adj: int
+    price_source_diff: int
+    do_price_check: bool
+    force_harvest_trigger_once: bool
+    emergency_exit: bool
+    pending_farm_rewards: int
+    min_deploy: int
+    max_report_delay: int
+    min_report_delay: int
+    # balances
+    balance_of_want: int
+    balance_short_a: int
+    balance_short_b: int
+    balance_lend: int
+    balance_lp: Optional[int]
+    balance_short_a_in_lp: Optional[int]
+    balance_short_b_in_lp: Optional[int]
+    balance_debt_lp: Optional[int]
+    balance_debt: int
+    balance_debt_in_short_a: int
+    balance_debt_in_short_b: int
+    balance_deployed: Optional[int]
+    estimated_total_assets: Optional[int]
+    count_lp_pooled: int
+    # ratios
+    debt_ratio_a: Optional[int]
+    debt_ratio_b: Optional[int]
+    collateral: Optional[int]
+    harvest_trigger: Optional[bool]
+    # shortAshortBLP and wantShortALP
+    short_a_in_lp: int
+    short_b_in_lp: int
+    want_in_lp: int
+    short_a_in_lp_want: int
+    lp_total_supply: int
+    lp_balance_unpooled: int
+    # lending market and oracle
+    lend_ctokens: int
+    exchange_rate: int
+    price_a: int
+    price_b: int
+    # vault
+    total_debt: int
+    last_report: int
+
+    def position_state(self) -> PositionState:
+        """Inputs for `scripts.strategy_math` at the snapshot block."""
+        return PositionState(
+            want_balance=self.balance_of_want,
+            lend_ctokens=self.lend_ctokens,
+            exchange_rate=self.exchange_rate,
+            debt_short_a=self.balance_debt_in_short_a,
+            debt_short_b=self.balance_debt_in_short_b,
+            lp_balance=self.count_lp_pooled + self.lp_balance_unpooled,
+            lp_total_supply=self.lp_total_supply,
+            short_a_in_lp=self.short_a_in_lp,
+            short_b_in_lp=self.short_b_in_lp,
+            want_in_lp=self.want_in_lp,
+            short_a_in_lp_want=self.short_a_in_lp_want,
+            price_a=self.price_a,
+            price_b=self.price_b,
+        )
+
+
+# snapshot field -> strategy view, for views that map one to one
+STRATEGY_VIEWS = {
+    "collat_lower": "collatLower",
+    "collat_target": "collatTarget",
+    "collat_upper": "collatUpper",
+    "debt_lower": "debtLower",
+    "debt_upper": "debtUpper",
+    "rebalance_percent": "rebalancePercent",
+    "slippage_adj": "slippageAdj",
+    "price_source_diff": "priceSourceDiff",
+    "do_price_check": "doPriceCheck",
+    "force_harvest_trigger_once": "forceHarvestTriggerOnce",
+    "emergency_exit": "emergencyExit",
+    "pending_farm_rewards": "pendingFarmRewards",
+    "min_deploy": "minDeploy",
+    "max_report_delay": "maxReportDelay",
+    "min_report_delay": "minReportDelay",
+    "balance_of_want": "balanceOfWant",
+    "balance_short_a": "balanceShortA",
+    "balance_short_b": "balanceShortB",
+    "balance_lend": "balanceLend",
+    "balance_lp": "balanceLp",
+    "balance_short_a_in_lp": "balanceShortAinLP",
+    "balance_short_b_in_lp": "balanceShortBinLP",
+    "balance_debt_lp": "balanceDebtLP",
+    "balance_debt": "balanceDebt",
+    "balance_debt_in_short_a": "balanceDebtInShortA",
+    "balance_debt_in_short_b": "balanceDebtInShortB",
+    "balance_deployed": "balanceDeployed",
+    "estimated_total_assets": "estimatedTotalAssets",
+    "count_lp_pooled": "countLpPooled",
+    "debt_ratio_a": "calcDebtRatioA",
+    "debt_ratio_b": "calcDebtRatioB",
+    "collateral": "calcCollateral",
+}
+
+
+class _Contracts(NamedTuple):
+    vault: object
+    lp: object
+    c_token_lend: object
+    oracle: object
+
+
+# Creating a brownie contract object costs an `eth_getCode` round trip, so the
+# handles for each strategy are only built once. The vault is immutable on the
+# strategy and the comptroller oracle is assumed not to change under us. After a
+# `chain.reset()` the next entry contract can be deployed at the same address
+# (same deployer, same nonce), so handles are keyed by entry contract too.
+_contracts: Dict[Tuple[str, str], _Contracts] = {}
+
+
+def _get_contracts(strategy) -> _Contracts:
+    key = (strategy._name, strategy.address)
+    if key not in _contracts:
+        cfg = get_config(strategy)
+        comptroller = interface.ComptrollerV5Storage(cfg.comptroller)
+        _contracts[key] = _Contracts(
+            vault=interface.IVault(strategy.vault()),
+            lp=interface.IUniswapV2Pair(cfg.short_a_short_b_lp),
+            c_token_lend=interface.ICTokenErc20(cfg.c_token_lend),
+            oracle=interface.ICompPriceOracle(comptroller.oracle()),
+        )
+    return _contracts[key]
+
+
+def prepare_snapshots(strategies):
+    """
+    Look up the contracts `queue_snapshot` reads for each of `strategies`.
+    Their addresses are contract calls themselves, so this has to run before
+    the multicall opens.
+    """
+    for strategy in strategies:
+        _get_contracts(strategy)
+
+
+def forget_reverted_multicall():
+    """
+    Drop brownie's Multicall2 address when a chain revert removed the contract.
+
+    On development networks brownie deploys Multicall2 on first use and keeps
+    its address, which a chain revert (eg test isolation) leaves dangling.
+    Call this before opening a multicall without an explicit address.
+    """
+    active_network = CONFIG.active_network
+    if "cmd" in active_network and "multicall2" in active_network:
+        if not web3.eth.get_code(active_network["multicall2"]):
+            del active_network["multicall2"]
+
+
+def result_value(result):
+    """A multicall result as a plain int, bool or None."""
+    # multicall results are proxies, so compare and convert rather than `is`
+    if result == None:  # noqa: E711
+        return None
+    return bool(result) if isinstance(result, bool) else int(result)
+
+
+def block_timestamp():
+    """
+    `block.timestamp` of the block the open multicall reads at, queued with
+    the other calls.
+    """
+    # brownie exposes no public handle on the Multicall2 it batches into
+    return multicall._contract.getCurrentBlockTimestamp()
+
+
+class PendingSnapshot(NamedTuple):
+    """The calls `queue_snapshot` added to a multicall, until it returns."""
+
+    strategy: object
+    block_number: int
+    timestamp: object
+    views: dict
+    lp_reserves: object
+    want_reserves: object
+    lp_total_supply: object
+    lp_balance_unpooled: object
+    lend_ctokens: object
+    exchange_rate: object
+    oracle: str
+    prices: dict  # c_token -> price, from the cache
+    pending: dict  # c_token -> price, queued
+    params: object
+
+    def result(self) -> StrategySnapshot:
+        """The snapshot, once the multicall the calls were queued in has closed."""
+        cfg = get_config(self.strategy)
+        fresh = {c_token: result_value(p) for c_token, p in self.pending.items()}
+        price_cache.store(self.oracle, self.block_number, fresh)
+        prices = {**self.prices, **fresh}
+        quote_price = prices[cfg.c_token_lend]
+        return StrategySnapshot(
+            block_number=self.block_number,
+            timestamp=int(self.timestamp),
+            strategy=self.strategy.address,
+            **{field: result_value(result) for field, result in self.views.items()},
+            short_a_in_lp=int(self.lp_reserves[0]),
+            short_b_in_lp=int(self.lp_reserves[1]),
+            want_in_lp=int(self.want_reserves[0]),
+            short_a_in_lp_want=int(self.want_reserves[1]),
+            lp_total_supply=result_value(self.lp_total_supply),
+            lp_balance_unpooled=result_value(self.lp_balance_unpooled),
+            lend_ctokens=result_value(self.lend_ctokens),
+            exchange_rate=result_value(self.exchange_rate),
+            # same maths as ScreamPriceOracle.getPrice
+            price_a=prices[cfg.c_token_borrow_a] * 10 ** 18 // quote_price,
+            price_b=prices[cfg.c_token_borrow_b] * 10 ** 18 // quote_price,
+            total_debt=int(self.params["totalDebt"]),
+            last_report=int(self.params["lastReport"]),
+        )
+
+
+def queue_snapshot(strategy, call_cost=0) -> PendingSnapshot:
+    """
+    Queue the reads of a snapshot of `strategy` into the open multicall, so
+    they go out with whatever else it batches. Call `result()` on what this
+    returns once the multicall has closed. `prepare_snapshots` must have seen
+    the strategy first.
+    """
+    cfg = get_config(strategy)
+    contracts = _contracts.get((strategy._name, strategy.address))
+    if contracts is None:
+        raise ValueError(f"prepare_snapshots has not seen {strategy.address}")
+    block_number = multicall.block_number
+    # oracle prices are shared by every strategy on the comptroller
+    c_tokens = (cfg.c_token_lend, cfg.c_token_borrow_a, cfg.c_token_borrow_b)
+    prices = price_cache.lookup(contracts.oracle.address, c_tokens, block_number)
+    views = {field: getattr(strategy, fn)() for field, fn in STRATEGY_VIEWS.items()}
+    views["harvest_trigger"] = strategy.harvestTrigger(call_cost)
+    return PendingSnapshot(
+        strategy=strategy,
+        block_number=block_number,
+        timestamp=block_timestamp(),
+        views=views,
+        lp_reserves=strategy.getLpReserves(),
+        want_reserves=strategy.getLpReservesWantShort(),
+        lp_total_supply=contracts.lp.totalSupply(),
+        lp_balance_unpooled=contracts.lp.balanceOf(strategy),
+        lend_ctokens=contracts.c_token_lend.balanceOf(strategy),
+        exchange_rate=contracts.c_token_lend.exchangeRateStored(),
+        oracle=contracts.oracle.address,
+        prices=prices,
+        pending={
+            c_token: contracts.oracle.getUnderlyingPrice(c_token)
+            for c_token in c_tokens
+            if c_token not in prices
+        },
+        params=contracts.vault.strategies(strategy),
+    )
+
+
+def read_snapshot(
+    strategy, block_identifier=None, call_cost=0, multicall_address=None
+) -> StrategySnapshot:
+    """
+    Snapshot `strategy` at `block_identifier` (default: latest) in one call.
+
+    `call_cost` is passed to `harvestTrigger`. `multicall_address` is only
+    needed on live networks brownie has no Multicall2 address for; forks deploy
+    their own.
+    """
+    prepare_snapshots([strategy])
+    if multicall_address is None:
+        forget_reverted_multicall()
+    with multicall(address=multicall_address, block_identifier=block_identifier):
+        pending = queue_snapshot(strategy, call_cost)
+    return pending.result()
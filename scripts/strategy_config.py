@@ -0,0 +1,135 @@
+"""
+Python mirror of the `CoreStrategyConfig` each entry contract under
+`contracts/entry/` hands to the `CoreStrategy` constructor.
+
+Most of these addresses are stored in internal variables on the strategy, so
+off-chain tooling can't read them back from a deployment. Keep this file in
+sync with the entry contracts.
+"""
+from typing import NamedTuple
+
+from brownie import project
+
+
+SPOOKY_ROUTER = "0xF491e7B69E4244ad4002BC14e878a34207E38c29"
+SPIRIT_ROUTER = "0x16327E3FbDaCA3bcF7E38F5Af2599D2DDc33aE52"
+SCREAM_COMPTROLLER = "0x260E596DAbE3AFc463e75B6CC05d8c46aCAcFB09"
+
+
+class CoreStrategyConfig(NamedTuple):
+    want: str
+    short_a: str
+    short_b: str
+    want_short_a_lp: str
+    short_a_short_b_lp: str
+    farm_token: str
+    farm_token_lp: str
+    farm_master_chef: str
+    farm_pid: int
+    c_token_lend: str
+    c_token_borrow_a: str
+    c_token_borrow_b: str
+    comp_token: str
+    comp_token_lp: str
+    comptroller: str
+    router: str
+    min_deploy: int
+
+
+STRATEGY_CONFIG = {
+    "USDCWFTMCRVScreamSpooky": CoreStrategyConfig(
+        want="0x04068DA6C83AFCFA0e13ba15A6696662335D5B75",
+        short_a="0x21be370D5312f44cB42ce377BC9b8a0cEF1A4C83",  # WFTM
+        short_b="0x1E4F97b9f9F913c46F1632781732927B9019C68b",  # CRV
+        want_short_a_lp="0x2b4C76d0dc16BE1C31D4C1DC53bF9B45987Fc75c",
+        short_a_short_b_lp="0xB471Ac6eF617e952b84C6a9fF5de65A9da96C93B",
+        farm_token="0x841FAD6EAe12c286d1Fd18d1d525DFfA75C7EFFE",
+        farm_token_lp="0xEc7178F4C41f346b2721907F5cF7628E388A7a58",
+        farm_master_chef="0x2b2929E785374c651a81A63878Ab22742656DcDd",
+        farm_pid=14,
+        c_token_lend="0xE45Ac34E528907d0A0239ab5Db507688070B20bf",
+        c_token_borrow_a="0x5AA53f03197E08C4851CAD8C92c7922DA5857E5d",
+        c_token_borrow_b="0x1E4F97b9f9F913c46F1632781732927B9019C68b",
+        comp_token="0xe0654C8e6fd4D733349ac7E09f6f23DA256bF475",
+        comp_token_lp="0x30872e4fc4edbFD7a352bFC2463eb4fAe9C09086",
+        comptroller=SCREAM_COMPTROLLER,
+        router=SPOOKY_ROUTER,
+        min_deploy=10_000,
+    ),
+    "USDCWFTMLINKScreamSpooky": CoreStrategyConfig(
+        want="0x04068DA6C83AFCFA0e13ba15A6696662335D5B75",
+        short_a="0x21be370D5312f44cB42ce377BC9b8a0cEF1A4C83",  # WFTM
+        short_b="0xb3654dc3D10Ea7645f8319668E8F54d2574FBdC8",  # LINK
+        want_short_a_lp="0x2b4C76d0dc16BE1C31D4C1DC53bF9B45987Fc75c",
+        short_a_short_b_lp="0x89d9bC2F2d091CfBFc31e333D6Dc555dDBc2fd29",
+        farm_token="0x841FAD6EAe12c286d1Fd18d1d525DFfA75C7EFFE",
+        farm_token_lp="0xEc7178F4C41f346b2721907F5cF7628E388A7a58",
+        farm_master_chef="0x2b2929E785374c651a81A63878Ab22742656DcDd",
+        farm_pid=6,
+        c_token_lend="0xE45Ac34E528907d0A0239ab5Db507688070B20bf",
+        c_token_borrow_a="0x5AA53f03197E08C4851CAD8C92c7922DA5857E5d",
+        c_token_borrow_b="0x2359012ebE36cCa231203D78b914284947B58aa3",
+        comp_token="0xe0654C8e6fd4D733349ac7E09f6f23DA256bF475",
+        comp_token_lp="0x30872e4fc4edbFD7a352bFC2463eb4fAe9C09086",
+        comptroller=SCREAM_COMPTROLLER,
+        router=SPOOKY_ROUTER,
+        min_deploy=10_000,
+    ),
+    "WETHWFTMLINKScreamSpooky": CoreStrategyConfig(
+        want="0x74b23882a30290451A17c44f4F05243b6b58C76d",
+        short_a="0x21be370D5312f44cB42ce377BC9b8a0cEF1A4C83",  # WFTM
+        short_b="0xb3654dc3D10Ea7645f8319668E8F54d2574FBdC8",  # LINK
+        want_short_a_lp="0xf0702249F4D3A25cD3DED7859a165693685Ab577",
+        short_a_short_b_lp="0x89d9bC2F2d091CfBFc31e333D6Dc555dDBc2fd29",
+        farm_token="0x841FAD6EAe12c286d1Fd18d1d525DFfA75C7EFFE",
+        farm_token_lp="0xEc7178F4C41f346b2721907F5cF7628E388A7a58",
+        farm_master_chef="0x2b2929E785374c651a81A63878Ab22742656DcDd",
+        farm_pid=6,
+        c_token_lend="0xC772BA6C2c28859B7a0542FAa162a56115dDCE25",
+        c_token_borrow_a="0x5AA53f03197E08C4851CAD8C92c7922DA5857E5d",
+        c_token_borrow_b="0x2359012ebE36cCa231203D78b914284947B58aa3",
+        comp_token="0xe0654C8e6fd4D733349ac7E09f6f23DA256bF475",
+        comp_token_lp="0x30872e4fc4edbFD7a352bFC2463eb4fAe9C09086",
+        comptroller=SCREAM_COMPTROLLER,
+        router=SPOOKY_ROUTER,
+        min_deploy=10_000,
+    ),
+    "WETHWFTMLINKScreamLqdrSpooky": CoreStrategyConfig(
+        want="0x74b23882a30290451A17c44f4F05243b6b58C76d",
+        short_a="0x21be370D5312f44cB42ce377BC9b8a0cEF1A4C83",  # WFTM
+        short_b="0xb3654dc3D10Ea7645f8319668E8F54d2574FBdC8",  # LINK
+        want_short_a_lp="0xf0702249F4D3A25cD3DED7859a165693685Ab577",
+        short_a_short_b_lp="0x89d9bC2F2d091CfBFc31e333D6Dc555dDBc2fd29",
+        farm_token="0x10b620b2dbAC4Faa7D7FFD71Da486f5D44cd86f9",
+        farm_token_lp="0x4Fe6f19031239F105F753D1DF8A0d24857D0cAA2",
+        farm_master_chef="0x6e2ad6527901c9664f016466b8DA1357a004db0f",
+        farm_pid=14,
+        c_token_lend="0xC772BA6C2c28859B7a0542FAa162a56115dDCE25",
+        c_token_borrow_a="0x5AA53f03197E08C4851CAD8C92c7922DA5857E5d",
+        c_token_borrow_b="0x2359012ebE36cCa231203D78b914284947B58aa3",
+        comp_token="0xe0654C8e6fd4D733349ac7E09f6f23DA256bF475",
+        comp_token_lp="0x30872e4fc4edbFD7a352bFC2463eb4fAe9C09086",
+        comptroller=SCREAM_COMPTROLLER,
+        router=SPOOKY_ROUTER,
+        min_deploy=10_000,
+    ),
+}
+
+
+def register_config(name: str, config: CoreStrategyConfig):
+    """
+    Register the config of an entry contract that takes it as a constructor
+    argument (eg the local stand-in chain) rather than hardcoding it.
+    """
+    STRATEGY_CONFIG[name] = config
+
+
+def get_config(strategy) -> CoreStrategyConfig:
+    """Look up the config for a deployed strategy by its contract name."""
+    return STRATEGY_CONFIG[strategy._name]
+
+
+def load_strategy(entry: str):
+    """The deployed strategy named by `entry`, as `<entry contract>:<address>`."""
+    name, address = entry.split(":")
+    return getattr(project.GenleveragelpProject, name).at(address)
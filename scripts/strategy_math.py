@@ -0,0 +1,270 @@
+"""
+Off-chain mirror of the `CoreStrategy.sol` position accounting.
+
+Every function here follows the contract line by line, including the order of
+its `mul`/`div` calls, so results match the on-chain views to the wei when fed
+the same inputs. All arithmetic is integer arithmetic, which means a
+`PositionState` can hold plain ints (one state) or numpy object arrays of ints
+(a batch of states evaluated in one call, see `stack` and `price_shock_grid`).
+Object arrays keep Python's arbitrary precision, so a batch never overflows
+where a uint256 would not.
+
+Reverts are mirrored as `ArithmeticError` (SafeMath underflow) and
+`ZeroDivisionError` (SafeMath division by zero).
+"""
+import math
+from typing import NamedTuple, Sequence
+
+import numpy as np
+
+
+BASIS_PRECISION = 10_000
+STD_PRECISION = 10 ** 18
+
+# token identifiers accepted by `convert_a_to_b`
+WANT = "want"
+SHORT_A = "shortA"
+SHORT_B = "shortB"
+
+
+class PositionState(NamedTuple):
+    """Raw inputs the strategy views read from chain."""
+
+    want_balance: int  # want.balanceOf(strategy)
+    lend_ctokens: int  # cTokenLend.balanceOf(strategy)
+    exchange_rate: int  # cTokenLend.exchangeRateStored()
+    debt_short_a: int  # cTokenBorrowA.borrowBalanceStored(strategy)
+    debt_short_b: int  # cTokenBorrowB.borrowBalanceStored(strategy)
+    lp_balance: int  # countLpPooled() + shortAshortBLP.balanceOf(strategy)
+    lp_total_supply: int  # shortAshortBLP.totalSupply()
+    short_a_in_lp: int  # getLpReserves()[0]
+    short_b_in_lp: int  # getLpReserves()[1]
+    want_in_lp: int  # getLpReservesWantShort()[0]
+    short_a_in_lp_want: int  # getLpReservesWantShort()[1]
+    price_a: int  # oracleA.getPrice()
+    price_b: int  # oracleB.getPrice()
+
+
+class PositionViews(NamedTuple):
+    balance_lend: int
+    balance_lp: int
+    balance_debt_lp: int
+    balance_debt: int
+    balance_deployed: int
+    estimated_total_assets: int
+    debt_ratio_a: int
+    debt_ratio_b: int
+    collateral: int
+
+
+def any_true(value) -> bool:
+    """`bool(value)`, true when any element of a batch is."""
+    return bool(value.any()) if hasattr(value, "any") else bool(value)
+
+
+def safe_sub(a, b):
+    """SafeMath `sub`, on ints or batches."""
+    if any_true(b > a):
+        raise ArithmeticError("SafeMath: subtraction overflow")
+    return a - b
+
+
+def safe_div(a, b):
+    """SafeMath `div`, on ints or batches."""
+    if any_true(b == 0):
+        raise ZeroDivisionError("SafeMath: division by zero")
+    return a // b
+
+
+def get_lp_reserves(reserve0, reserve1, short_a_is_token0: bool):
+    """Order `shortAshortBLP.getReserves()` as (shortA, shortB)."""
+    if short_a_is_token0:
+        return reserve0, reserve1
+    return reserve1, reserve0
+
+
+def get_lp_reserves_want_short(reserve0, reserve1, want_is_token0: bool):
+    """Order `wantShortALP.getReserves()` as (want, shortA)."""
+    if want_is_token0:
+        return reserve0, reserve1
+    return reserve1, reserve0
+
+
+def convert_a_to_b(state: PositionState, token_a: str, token_b: str, amount_in):
+    s = state
+    amount_out = 0
+    if token_a == WANT or token_b == WANT:
+        # NOTE: the contract checks every branch in turn, later ones win
+        if token_b == SHORT_A:
+            amount_out = safe_div(amount_in * s.short_a_in_lp_want, s.want_in_lp)
+        if token_a == SHORT_A:
+            amount_out = safe_div(amount_in * s.want_in_lp, s.short_a_in_lp_want)
+        if token_b == SHORT_B:
+            amount_out = safe_div(
+                safe_div(amount_in * s.short_a_in_lp_want, s.want_in_lp)
+                * s.short_b_in_lp,
+                s.short_a_in_lp,
+            )
+        if token_a == SHORT_B:
+            amount_out = safe_div(
+                safe_div(amount_in * s.short_a_in_lp, s.short_b_in_lp) * s.want_in_lp,
+                s.short_a_in_lp_want,
+            )
+    elif token_a == SHORT_A:
+        amount_out = safe_div(amount_in * s.short_b_in_lp, s.short_a_in_lp)
+    else:
+        amount_out = safe_div(amount_in * s.short_a_in_lp, s.short_b_in_lp)
+    return amount_out
+
+
+def balance_lend(state: PositionState):
+    return safe_div(state.lend_ctokens * state.exchange_rate, STD_PRECISION)
+
+
+def balance_short_a_in_lp(state: PositionState):
+    return safe_div(state.short_a_in_lp * state.lp_balance, state.lp_total_supply)
+
+
+def balance_short_b_in_lp(state: PositionState):
+    return safe_div(state.short_b_in_lp * state.lp_balance, state.lp_total_supply)
+
+
+def balance_lp(state: PositionState):
+    bal_a = convert_a_to_b(state, SHORT_A, WANT, balance_short_a_in_lp(state))
+    return bal_a * 2
+
+
+def balance_debt_lp(state: PositionState):
+    debt_a = convert_a_to_b(state, SHORT_A, WANT, state.debt_short_a)
+    debt_b = convert_a_to_b(state, SHORT_B, WANT, state.debt_short_b)
+    return debt_a + debt_b
+
+
+def balance_debt(state: PositionState):
+    return safe_div(state.debt_short_a * state.price_a, STD_PRECISION) + safe_div(
+        state.debt_short_b * state.price_b, STD_PRECISION
+    )
+
+
+def balance_deployed(state: PositionState):
+    return safe_sub(balance_lend(state) + balance_lp(state), balance_debt_lp(state))
+
+
+def estimated_total_assets(state: PositionState):
+    return state.want_balance + balance_deployed(state)
+
+
+def calc_debt_ratio_a(state: PositionState):
+    return safe_div(state.debt_short_a * BASIS_PRECISION, balance_short_a_in_lp(state))
+
+
+def calc_debt_ratio_b(state: PositionState):
+    return safe_div(state.debt_short_b * BASIS_PRECISION, balance_short_b_in_lp(state))
+
+
+def calc_collateral(state: PositionState):
+    return safe_div(balance_debt(state) * BASIS_PRECISION, balance_lend(state))
+
+
+def price_source_ratios(state: PositionState):
+    """Oracle over pool price of shortA and shortB, as `_testPriceSource`."""
+    ratio_a = safe_div(
+        state.price_a * BASIS_PRECISION,
+        convert_a_to_b(state, SHORT_A, WANT, STD_PRECISION),
+    )
+    ratio_b = safe_div(
+        state.price_b * BASIS_PRECISION,
+        convert_a_to_b(state, SHORT_B, WANT, STD_PRECISION),
+    )
+    return ratio_a, ratio_b
+
+
+def price_source_ok(state: PositionState, do_price_check: bool, price_source_diff):
+    """`_testPriceSource`: the oracle prices agree with the pools."""
+    if not do_price_check:
+        return True
+    lower = safe_sub(BASIS_PRECISION, price_source_diff)
+    upper = BASIS_PRECISION + price_source_diff
+    ratio_a, ratio_b = price_source_ratios(state)
+    return (ratio_a > lower) & (ratio_a < upper) & (ratio_b > lower) & (ratio_b < upper)
+
+
+def evaluate(state: PositionState) -> PositionViews:
+    """Compute every public accounting view for one state or a batch."""
+    return PositionViews(
+        balance_lend=balance_lend(state),
+        balance_lp=balance_lp(state),
+        balance_debt_lp=balance_debt_lp(state),
+        balance_debt=balance_debt(state),
+        balance_deployed=balance_deployed(state),
+        estimated_total_assets=estimated_total_assets(state),
+        debt_ratio_a=calc_debt_ratio_a(state),
+        debt_ratio_b=calc_debt_ratio_b(state),
+        collateral=calc_collateral(state),
+    )
+
+
+def as_batch(values) -> np.ndarray:
+    """Wrap ints in an object array so batch math stays exact."""
+    return np.array([int(v) for v in values], dtype=object)
+
+
+def stack(states: Sequence[PositionState]) -> PositionState:
+    """Combine many states into a single batched state."""
+    return PositionState(*(as_batch(field) for field in zip(*states)))
+
+
+def unstack(batch) -> list:
+    """Split a batched `PositionState` or `PositionViews` back into records."""
+    return [type(batch)(*row) for row in zip(*batch)]
+
+
+_isqrt = np.frompyfunc(math.isqrt, 1, 1)
+
+
+def _move_price(reserve_x, reserve_y, num, den):
+    """
+    Move the price of x (quoted in y) by `num / den` along the constant product
+    curve, the way arbitrage would leave a UniswapV2 pair.
+    """
+    new_y = _isqrt(reserve_y * reserve_y * num // den)
+    new_x = reserve_x * reserve_y // new_y
+    return new_x, new_y
+
+
+def price_shock_grid(
+    state: PositionState, moves_a: Sequence[int], moves_b: Sequence[int]
+) -> PositionState:
+    """
+    Build a batched state for every combination of price moves.
+
+    `moves_a` and `moves_b` are the new shortA and shortB prices in want, in
+    BASIS_PRECISION of the current price (eg 9000 is a 10% drop). Pair reserves
+    are moved along their constant product curves and the oracle prices follow
+    the market, while balances and debt are left as they are.
+    """
+    grid_a, grid_b = np.meshgrid(as_batch(moves_a), as_batch(moves_b), indexing="ij")
+    grid_a = grid_a.ravel()
+    grid_b = grid_b.ravel()
+    size = len(grid_a)
+
+    def _tile(value):
+        return np.full(size, int(value), dtype=object)
+
+    tiled = PositionState(*(_tile(value) for value in state))
+    # shortA priced in want on wantShortALP
+    short_a_in_lp_want, want_in_lp = _move_price(
+        tiled.short_a_in_lp_want, tiled.want_in_lp, grid_a, BASIS_PRECISION
+    )
+    # shortB priced in shortA on shortAshortBLP moves by move_b / move_a
+    short_b_in_lp, short_a_in_lp = _move_price(
+        tiled.short_b_in_lp, tiled.short_a_in_lp, grid_b, grid_a
+    )
+    return tiled._replace(
+        short_a_in_lp=short_a_in_lp,
+        short_b_in_lp=short_b_in_lp,
+        want_in_lp=want_in_lp,
+        short_a_in_lp_want=short_a_in_lp_want,
+        price_a=tiled.price_a * grid_a // BASIS_PRECISION,
+        price_b=tiled.price_b * grid_b // BASIS_PRECISION,
+    )
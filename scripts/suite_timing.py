@@ -0,0 +1,64 @@
+"""
+Wall clock of the test suite, before and after a change.
+
+`brownie test --junitxml <file>` records how long every test took, setup and
+teardown included, and the whole run. The report is written by pytest
+itself, so it can be taken on any commit, also on those before the timing
+summary `tests/conftest.py` prints. To compare the suite before and after
+the session-scoped fixtures (`ceb1af9` is the commit before them):
+
+    git checkout ceb1af9
+    brownie test --junitxml reports/timing/before.xml
+    git checkout -
+    brownie test --junitxml reports/timing/after.xml
+    brownie run suite_timing main reports/timing/before.xml reports/timing/after.xml
+
+Both runs should fork the same block (`ftm-main@<block>`) with a warm
+`--fork-state`, so the upstream RPC doesn't dominate either of them.
+"""
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Dict, NamedTuple
+
+# slowest tests listed by `main`
+DEFAULT_TOP = 10
+
+
+class SuiteTiming(NamedTuple):
+    total: float  # seconds, the whole run
+    tests: Dict[str, float]  # test id -> seconds, setup and teardown included
+
+
+def load_junit(path) -> SuiteTiming:
+    root = ET.parse(Path(path)).getroot()
+    suites = [root] if root.tag == "testsuite" else root.findall("testsuite")
+    tests = {}
+    for suite in suites:
+        for case in suite.iter("testcase"):
+            name = f"{case.get('classname')}::{case.get('name')}"
+            tests[name] = tests.get(name, 0.0) + float(case.get("time", 0))
+    return SuiteTiming(sum(float(s.get("time", 0)) for s in suites), tests)
+
+
+def compare(before: SuiteTiming, after: SuiteTiming) -> Dict[str, float]:
+    """Seconds saved by each test run in both, largest saving first."""
+    saved = {
+        name: before.tests[name] - seconds
+        for name, seconds in after.tests.items()
+        if name in before.tests
+    }
+    return dict(sorted(saved.items(), key=lambda item: -item[1]))
+
+
+def main(before, after, top=DEFAULT_TOP):
+    before, after = load_junit(before), load_junit(after)
+    saved = compare(before, after)
+    print(
+        f"total: {before.total:.1f}s -> {after.total:.1f}s "
+        f"({after.total / before.total - 1:+.1%}), "
+        f"{len(before.tests)} -> {len(after.tests)} tests"
+    )
+    common = sum(before.tests[name] for name in saved)
+    print(f"tests run in both: {common:.1f}s -> {common - sum(saved.values()):.1f}s")
+    for name in list(saved)[: int(top)]:
+        print(f"  {name}: {before.tests[name]:.2f}s -> {after.tests[name]:.2f}s")
@@ -0,0 +1,494 @@
+"""
+Predict the swaps, slippage and loss of a CoreStrategy withdrawal off chain.
+
+`quote_withdraw` replays `liquidatePosition` -> `_withdraw` step by step: the
+LP removal, the debt-ratio swap, debt repayment and the lending redeem.
+Above a `stratPercent` of 9500 it replays `liquidateAllPositionsInternal`
+instead. `quote_rebalance_debt` replays `_rebalanceDebtInternal`. Pair
+reserves move with every LP burn and swap along the way. The swaps use the
+router's UniswapV2 library math with the 0.2% fee, so `amounts` are exact for
+the input reserves. Everything is integer math on a `QuoteState`, so a quote
+takes well under a millisecond and never touches the chain:
+
+    state = quote_state(read_snapshot(strategy))
+    quote = quote_withdraw(state, amount)
+    quote.loss, [swap.amount_out for swap in quote.swaps]
+
+As in the contract, the slippage `liquidateAllPositionsInternal` measures is
+never added up (`_slippage.add(...)` is not assigned). So the full
+liquidation path reports no slippage, and its swap cost only shows up as a
+smaller `liquidated`.
+
+Not modelled: interest accrued since the state was read, a protocol fee
+minted on LP burn, and the comptroller's liquidity check on redeem.
+`require` failures are mirrored as `ValueError`. Like `scripts.strategy_math`,
+SafeMath reverts are mirrored as `ArithmeticError` and `ZeroDivisionError`.
+"""
+from typing import NamedTuple, Optional, Tuple
+
+from scripts import strategy_math
+from scripts.strategy_math import (
+    BASIS_PRECISION,
+    SHORT_A,
+    SHORT_B,
+    STD_PRECISION,
+    WANT,
+    PositionState,
+    safe_div,
+    safe_sub,
+)
+
+# UniswapV2Library.getAmountOut / getAmountIn as deployed by SpookySwap
+FEE_NUMERATOR = 998
+FEE_DENOMINATOR = 1000
+
+# _withdraw only swaps above this stratPercent ...
+SWAP_THRESHOLD = 500
+# ... and liquidates everything above this one
+FULL_LIQUIDATION_THRESHOLD = 9500
+# _rebalanceDebtInternal noise between the debt ratios
+DEBT_RATIO_NOISE = 50
+
+
+class QuoteState(NamedTuple):
+    """Everything a withdrawal reads, on top of the `PositionState`."""
+
+    position: PositionState
+    lp_unpooled: int  # shortAshortBLP.balanceOf(strategy)
+    balance_short_a: int  # shortA.balanceOf(strategy)
+    balance_short_b: int  # shortB.balanceOf(strategy)
+    total_debt: int  # vault.strategies(strategy).totalDebt
+    slippage_adj: int
+    collat_upper: int
+    do_price_check: bool
+    price_source_diff: int
+
+
+class SwapQuote(NamedTuple):
+    token_in: str
+    token_out: str
+    amounts: Tuple[int, ...]  # the router's amounts, one per path token
+    expected: int  # convertAtoB at the spot price, in token_out (token_in for exact out)
+    slippage_want: int
+
+    @property
+    def amount_in(self):
+        return self.amounts[0]
+
+    @property
+    def amount_out(self):
+        return self.amounts[-1]
+
+
+class WithdrawQuote(NamedTuple):
+    amount_needed: int
+    strat_percent: int  # 0 when the want balance covers the withdrawal
+    full_liquidation: bool
+    swaps: Tuple[SwapQuote, ...]
+    slippage: int  # as returned by _withdraw, in want
+    liquidated: int
+    loss: int
+    state_after: QuoteState
+
+
+class DebtRebalanceQuote(NamedTuple):
+    swaps: Tuple[SwapQuote, ...]
+    slippage: int  # in want, not reported by the contract
+    state_after: QuoteState
+
+
+def quote_state(snapshot) -> QuoteState:
+    """A `QuoteState` from a `scripts.snapshot.StrategySnapshot`."""
+    return QuoteState(
+        position=snapshot.position_state(),
+        lp_unpooled=snapshot.lp_balance_unpooled,
+        balance_short_a=snapshot.balance_short_a,
+        balance_short_b=snapshot.balance_short_b,
+        total_debt=snapshot.total_debt,
+        slippage_adj=snapshot.slippage_adj,
+        collat_upper=snapshot.collat_upper,
+        do_price_check=snapshot.do_price_check,
+        price_source_diff=snapshot.price_source_diff,
+    )
+
+
+def get_amount_out(amount_in, reserve_in, reserve_out):
+    if amount_in <= 0:
+        raise ValueError("UniswapV2Library: INSUFFICIENT_INPUT_AMOUNT")
+    if reserve_in <= 0 or reserve_out <= 0:
+        raise ValueError("UniswapV2Library: INSUFFICIENT_LIQUIDITY")
+    amount_in_with_fee = amount_in * FEE_NUMERATOR
+    numerator = amount_in_with_fee * reserve_out
+    denominator = reserve_in * FEE_DENOMINATOR + amount_in_with_fee
+    return numerator // denominator
+
+
+def get_amount_in(amount_out, reserve_in, reserve_out):
+    if amount_out <= 0:
+        raise ValueError("UniswapV2Library: INSUFFICIENT_OUTPUT_AMOUNT")
+    if reserve_in <= 0 or reserve_out <= 0:
+        raise ValueError("UniswapV2Library: INSUFFICIENT_LIQUIDITY")
+    numerator = reserve_in * amount_out * FEE_DENOMINATOR
+    denominator = safe_sub(reserve_out, amount_out) * FEE_NUMERATOR
+    return safe_div(numerator, denominator) + 1
+
+
+def get_amount_out_float(amount_in, reserve_in, reserve_out):
+    """`get_amount_out` in floats, so it broadcasts over arrays of amounts."""
+    with_fee = amount_in * FEE_NUMERATOR
+    return with_fee * reserve_out / (reserve_in * FEE_DENOMINATOR + with_fee)
+
+
+def path_amount_out(amount, hops):
+    """
+    `get_amount_out_float` along `hops`, each (reserve in, reserve out).
+    Returns the output and the hops' reserves after the swaps.
+    """
+    after = []
+    for reserve_in, reserve_out in hops:
+        out = get_amount_out_float(amount, reserve_in, reserve_out)
+        after.append((reserve_in + amount, reserve_out - out))
+        amount = out
+    return amount, after
+
+
+def token_out_path(token_a, token_b, weth=SHORT_A):
+    """
+    `getTokenOutPath`, through the router's WETH, which is shortA in every
+    config. Pass `weth` to route addresses rather than token identifiers.
+    """
+    if token_a == weth or token_b == weth:
+        return (token_a, token_b)
+    return (token_a, weth, token_b)
+
+
+class _Strategy:
+    """Mutable replay of the strategy's balances and both pairs."""
+
+    def __init__(self, state: QuoteState):
+        s = state.position
+        self.settings = state
+        self.want = s.want_balance
+        self.short = {SHORT_A: state.balance_short_a, SHORT_B: state.balance_short_b}
+        self.debt = {SHORT_A: s.debt_short_a, SHORT_B: s.debt_short_b}
+        self.lend_ctokens = s.lend_ctokens
+        self.lp_unpooled = state.lp_unpooled
+        self.lp_pooled = safe_sub(s.lp_balance, state.lp_unpooled)
+        self.lp_total_supply = s.lp_total_supply
+        # reserves by pair, keyed by token
+        self.pairs = {
+            frozenset((SHORT_A, SHORT_B)): {
+                SHORT_A: s.short_a_in_lp,
+                SHORT_B: s.short_b_in_lp,
+            },
+            frozenset((WANT, SHORT_A)): {
+                WANT: s.want_in_lp,
+                SHORT_A: s.short_a_in_lp_want,
+            },
+        }
+        self.swaps = []
+
+    def balance(self, token):
+        return self.want if token == WANT else self.short[token]
+
+    def _credit(self, token, amount):
+        if token == WANT:
+            self.want += amount
+        else:
+            self.short[token] += amount
+
+    def _debit(self, token, amount):
+        if token == WANT:
+            self.want = safe_sub(self.want, amount)
+        else:
+            self.short[token] = safe_sub(self.short[token], amount)
+
+    def position(self) -> PositionState:
+        lp = self.pairs[frozenset((SHORT_A, SHORT_B))]
+        want_lp = self.pairs[frozenset((WANT, SHORT_A))]
+        return self.settings.position._replace(
+            want_balance=self.want,
+            lend_ctokens=self.lend_ctokens,
+            debt_short_a=self.debt[SHORT_A],
+            debt_short_b=self.debt[SHORT_B],
+            lp_balance=self.lp_pooled + self.lp_unpooled,
+            lp_total_supply=self.lp_total_supply,
+            short_a_in_lp=lp[SHORT_A],
+            short_b_in_lp=lp[SHORT_B],
+            want_in_lp=want_lp[WANT],
+            short_a_in_lp_want=want_lp[SHORT_A],
+        )
+
+    def quote_state(self) -> QuoteState:
+        return self.settings._replace(
+            position=self.position(),
+            lp_unpooled=self.lp_unpooled,
+            balance_short_a=self.short[SHORT_A],
+            balance_short_b=self.short[SHORT_B],
+        )
+
+    def convert(self, token_a, token_b, amount):
+        return strategy_math.convert_a_to_b(self.position(), token_a, token_b, amount)
+
+    # -- router --
+
+    def _hops(self, path):
+        return [self.pairs[frozenset(hop)] for hop in zip(path, path[1:])]
+
+    def _settle(self, path, amounts):
+        for (token_in, token_out), pair, amount_in, amount_out in zip(
+            zip(path, path[1:]), self._hops(path), amounts, amounts[1:]
+        ):
+            pair[token_in] += amount_in
+            pair[token_out] -= amount_out
+        self._debit(path[0], amounts[0])
+        self._credit(path[-1], amounts[-1])
+
+    def swap_exact_tokens_for_tokens(self, amount_in, path):
+        amounts = [amount_in]
+        for (token_in, token_out), pair in zip(zip(path, path[1:]), self._hops(path)):
+            amounts.append(get_amount_out(amounts[-1], pair[token_in], pair[token_out]))
+        if amounts[0] > self.balance(path[0]):
+            raise ValueError("TransferHelper: TRANSFER_FROM_FAILED")
+        self._settle(path, amounts)
+        return amounts
+
+    def swap_tokens_for_exact_tokens(self, amount_out, amount_in_max, path):
+        amounts = [amount_out]
+        hops = list(zip(zip(path, path[1:]), self._hops(path)))
+        for (token_in, token_out), pair in reversed(hops):
+            amounts.insert(
+                0, get_amount_in(amounts[0], pair[token_in], pair[token_out])
+            )
+        if amounts[0] > amount_in_max:
+            raise ValueError("UniswapV2Router: EXCESSIVE_INPUT_AMOUNT")
+        self._settle(path, amounts)
+        return amounts
+
+    # -- strategy internals --
+
+    def swap_exact_from_to(self, swap_from, swap_to, amount_in):
+        expected = self.convert(swap_from, swap_to, amount_in)
+        if self.balance(swap_from) < 1 or expected < 1:
+            return 0
+        path = token_out_path(swap_from, swap_to)
+        amounts = self.swap_exact_tokens_for_tokens(amount_in, path)
+        slippage = safe_sub(expected, amounts[-1])
+        if swap_to == WANT:
+            slippage_want = slippage
+        else:
+            slippage_want = self.convert(swap_to, WANT, slippage)
+        self.swaps.append(
+            SwapQuote(swap_from, swap_to, tuple(amounts), expected, slippage_want)
+        )
+        return slippage_want
+
+    def swap_exact_out_from_to(self, swap_from, swap_to, amount_out):
+        from_balance = self.balance(swap_from)
+        if from_balance == 0:
+            return 0
+        expected = self.convert(swap_to, swap_from, amount_out)
+        path = token_out_path(swap_from, swap_to)
+        amounts = self.swap_tokens_for_exact_tokens(amount_out, from_balance, path)
+        slippage = safe_sub(amounts[0], expected)
+        if swap_from == WANT:
+            slippage_want = slippage
+        else:
+            slippage_want = self.convert(swap_from, WANT, slippage)
+        self.swaps.append(
+            SwapQuote(swap_from, swap_to, tuple(amounts), expected, slippage_want)
+        )
+        return slippage_want
+
+    def remove_all_lp(self):
+        amount = self.lp_unpooled
+        lp = self.pairs[frozenset((SHORT_A, SHORT_B))]
+        supply = self.lp_total_supply
+        slippage_adj = self.settings.slippage_adj
+        amount_a_min = safe_div(
+            safe_div(amount * lp[SHORT_A] * slippage_adj, BASIS_PRECISION), supply
+        )
+        amount_b_min = safe_div(
+            safe_div(amount * lp[SHORT_B] * slippage_adj, BASIS_PRECISION), supply
+        )
+        if amount_a_min == 0 or amount_b_min == 0:
+            return
+        # UniswapV2Pair.burn, the pair's balances being its reserves
+        amount_a = amount * lp[SHORT_A] // supply
+        amount_b = amount * lp[SHORT_B] // supply
+        lp[SHORT_A] -= amount_a
+        lp[SHORT_B] -= amount_b
+        self.lp_total_supply -= amount
+        self.lp_unpooled = 0
+        self.short[SHORT_A] += amount_a
+        self.short[SHORT_B] += amount_b
+
+    def withdraw_lp(self, amount):
+        if amount > self.lp_pooled:
+            raise ValueError("_withdrawSomeLp: more than pooled")
+        self.lp_pooled -= amount
+        self.lp_unpooled += amount
+
+    def remove_lp_percent(self, deployed_percent):
+        lp_count = self.lp_unpooled + self.lp_pooled
+        lp_req = safe_div(lp_count * deployed_percent, BASIS_PRECISION)
+        self.withdraw_lp(safe_sub(lp_req, self.lp_unpooled))
+        self.remove_all_lp()
+
+    def repay_debt(self, token):
+        balance = self.short[token]
+        if balance == 0:
+            return
+        repay = min(balance, self.debt[token])
+        self.short[token] -= repay
+        self.debt[token] -= repay
+
+    def balance_lend(self):
+        return strategy_math.balance_lend(self.position())
+
+    def redeem_want(self, amount):
+        # CToken.redeemUnderlying fails without reverting on an underflow
+        rate = self.settings.position.exchange_rate
+        redeem_tokens = safe_div(amount * STD_PRECISION, rate)
+        if redeem_tokens > self.lend_ctokens:
+            return
+        self.lend_ctokens -= redeem_tokens
+        self.want += amount
+
+    def rebalance_debt_internal(self):
+        position = self.position()
+        debt_ratio_a = strategy_math.calc_debt_ratio_a(position)
+        debt_ratio_b = strategy_math.calc_debt_ratio_b(position)
+        if debt_ratio_a > debt_ratio_b + DEBT_RATIO_NOISE:
+            self.remove_lp_percent(safe_sub(debt_ratio_a, debt_ratio_b) // 2)
+            self.swap_exact_from_to(SHORT_B, SHORT_A, self.short[SHORT_B])
+            self.repay_debt(SHORT_A)
+        if debt_ratio_b > debt_ratio_a + DEBT_RATIO_NOISE:
+            self.remove_lp_percent(safe_sub(debt_ratio_b, debt_ratio_a) // 2)
+            self.swap_exact_from_to(SHORT_A, SHORT_B, self.short[SHORT_A])
+            self.repay_debt(SHORT_B)
+
+    def liquidate_all_to_lend(self):
+        self.withdraw_lp(self.lp_pooled)
+        self.remove_all_lp()
+        self.repay_debt(SHORT_A)
+        self.repay_debt(SHORT_B)
+
+    def liquidate_all_positions_internal(self):
+        self.rebalance_debt_internal()
+        self.liquidate_all_to_lend()
+        bal_short = dict(self.short)
+        self.redeem_want(self.balance_lend() // 3)
+        for token in (SHORT_A, SHORT_B):
+            # the contract drops the slippage of these swaps
+            if self.debt[token] > 0:
+                self.swap_exact_out_from_to(WANT, token, self.debt[token])
+                self.repay_debt(token)
+            else:
+                self.swap_exact_from_to(token, WANT, bal_short[token])
+        redeem_amount = self.balance_lend()
+        balance_debt = strategy_math.balance_debt(self.position())
+        if balance_debt > 0:
+            redeem_amount = safe_sub(
+                redeem_amount,
+                safe_div(balance_debt * BASIS_PRECISION, self.settings.collat_upper),
+            )
+        self.redeem_want(redeem_amount)
+        return self.want, 0
+
+    def withdraw(self, amount_needed):
+        """`_withdraw`, returning `(stratPercent, slippage)`."""
+        position = self.position()
+        if not strategy_math.price_source_ok(
+            position, self.settings.do_price_check, self.settings.price_source_diff
+        ):
+            raise ValueError("_testPriceSource")
+        if amount_needed <= self.want:
+            return 0, 0
+        balance_deployed = strategy_math.balance_deployed(position)
+        debt_ratio_a = strategy_math.calc_debt_ratio_a(position)
+        debt_ratio_b = strategy_math.calc_debt_ratio_b(position)
+        strat_percent = safe_div(
+            safe_sub(amount_needed, self.want) * BASIS_PRECISION, balance_deployed
+        )
+        if strat_percent > FULL_LIQUIDATION_THRESHOLD:
+            _, slippage = self.liquidate_all_positions_internal()
+            return strat_percent, slippage
+
+        self.remove_lp_percent(strat_percent)
+        slippage = 0
+        if strat_percent > SWAP_THRESHOLD:
+            if debt_ratio_a > debt_ratio_b:
+                swap_amt = (
+                    self.short[SHORT_B]
+                    * (debt_ratio_a - debt_ratio_b)
+                    * strat_percent
+                    // BASIS_PRECISION
+                    // BASIS_PRECISION
+                )
+                slippage = self.swap_exact_from_to(SHORT_B, SHORT_A, swap_amt)
+            else:
+                swap_amt = (
+                    self.short[SHORT_A]
+                    * safe_sub(debt_ratio_b, debt_ratio_a)
+                    * strat_percent
+                    // BASIS_PRECISION
+                    // BASIS_PRECISION
+                )
+                slippage = self.swap_exact_from_to(SHORT_A, SHORT_B, swap_amt)
+        self.repay_debt(SHORT_A)
+        self.repay_debt(SHORT_B)
+        self.redeem_want(safe_sub(amount_needed, slippage))
+        return strat_percent, slippage
+
+
+def quote_withdraw(state: QuoteState, amount_needed: int) -> WithdrawQuote:
+    """
+    `liquidatePosition(amount_needed)`: what the strategy hands back to the
+    vault (`liquidated`) and the loss it reports, with every swap on the way.
+    """
+    strategy = _Strategy(state)
+    position = state.position
+    total_assets = strategy_math.estimated_total_assets(position)
+    loss = 0
+    new_amount = amount_needed
+    if state.total_debt > total_assets:
+        ratio = safe_div(total_assets * STD_PRECISION, state.total_debt)
+        new_amount = safe_div(amount_needed * ratio, STD_PRECISION)
+        loss = safe_sub(amount_needed, new_amount)
+
+    strat_percent, slippage = strategy.withdraw(new_amount)
+    loss += slippage
+
+    liquidated = strategy.want
+    if liquidated + loss > amount_needed:
+        liquidated = safe_sub(amount_needed, loss)
+    else:
+        loss = safe_sub(amount_needed, liquidated)
+
+    return WithdrawQuote(
+        amount_needed=amount_needed,
+        strat_percent=strat_percent,
+        full_liquidation=strat_percent > FULL_LIQUIDATION_THRESHOLD,
+        swaps=tuple(strategy.swaps),
+        slippage=slippage,
+        liquidated=liquidated,
+        loss=loss,
+        state_after=strategy.quote_state(),
+    )
+
+
+def quote_rebalance_debt(state: QuoteState) -> Optional[DebtRebalanceQuote]:
+    """
+    `_rebalanceDebtInternal`, as run by `rebalanceDebt`. Returns None when
+    neither debt ratio is far enough apart from the other to swap.
+    """
+    strategy = _Strategy(state)
+    strategy.rebalance_debt_internal()
+    if not strategy.swaps:
+        return None
+    return DebtRebalanceQuote(
+        swaps=tuple(strategy.swaps),
+        slippage=sum(swap.slippage_want for swap in strategy.swaps),
+        state_after=strategy.quote_state(),
+    )
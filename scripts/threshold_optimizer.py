@@ -0,0 +1,249 @@
+"""
+Search the CoreStrategy threshold space for the lowest expected loss plus
+keeper gas, using the Monte-Carlo backtester in `scripts.backtest`.
+
+Two modes over the same `SearchSpace`:
+
+  - `grid_search` backtests every valid combination, sharded across all cores
+  - `sequential_search` is a Bayesian optimisation (Gaussian process with
+    expected improvement) for when each evaluation is expensive, eg many long
+    paths
+
+Every backtest is cached on disk under a hash of the thresholds, the market
+params and the price paths, so repeating or widening a sweep only backtests
+what's new:
+
+    p_a, p_b = gbm_paths(2_000, 24 * 30, vol_a=1.2, vol_b=1.2, seed=1)
+    ranked = grid_search(SearchSpace(), p_a, p_b, gas_price)
+    best_cost, best = ranked[0]
+
+`gas_price` is required, as it is what weighs the keeper gas of tight
+thresholds against the loss they save; without it rebalancing is free. Like
+`MarketParams.gas_price`, whose value it replaces, it is in want per unit of
+gas per deposit: the gas price in the gas token, times the gas token's price
+in want, over the deposit size (100 gwei on a 10k FTM deposit is 1e-11).
+
+Thresholds are validated with the same `require`s as `setDebtThresholds` and
+`setCollateralThresholds`.
+"""
+import hashlib
+import itertools
+import json
+import math
+import os
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+from scripts.backtest import BacktestResult, MarketParams, Thresholds, sweep
+from scripts.strategy_math import BASIS_PRECISION
+
+CACHE_DIR = Path(
+    os.getenv("BACKTEST_CACHE_DIR", Path.home() / ".brownie" / "backtest_cache")
+)
+# bump when the backtest model changes, so stale results aren't reused
+CACHE_VERSION = 1
+
+
+class SearchSpace(NamedTuple):
+    """(low, high, step) in BASIS_PRECISION for each threshold."""
+
+    collat_lower: Tuple[int, int, int] = (3000, 5000, 250)
+    collat_target: Tuple[int, int, int] = (4000, 6000, 250)
+    collat_upper: Tuple[int, int, int] = (5000, 7000, 250)
+    debt_lower: Tuple[int, int, int] = (9000, 10000, 100)
+    debt_upper: Tuple[int, int, int] = (10000, 11000, 100)
+    # not read by _rebalanceDebtInternal, so fixed by default
+    rebalance_percent: Tuple[int, int, int] = (10000, 10000, 1)
+
+    def values(self, field) -> List[int]:
+        low, high, step = getattr(self, field)
+        return list(range(low, high + 1, step))
+
+
+def valid(t: Thresholds) -> bool:
+    """The `require`s of `setDebtThresholds` and `setCollateralThresholds`."""
+    return (
+        t.debt_lower <= BASIS_PRECISION
+        and t.rebalance_percent <= BASIS_PRECISION
+        and t.debt_upper >= BASIS_PRECISION
+        and t.collat_upper <= BASIS_PRECISION
+        and t.collat_lower <= t.collat_target <= t.collat_upper
+    )
+
+
+def objective(result: BacktestResult, risk_aversion=0.0) -> float:
+    """Expected loss net of income, plus gas, plus `risk_aversion` stdevs."""
+    net = result.pnl - result.gas_cost
+    return float(-np.mean(net) + risk_aversion * np.std(net))
+
+
+def paths_fingerprint(p_a, p_b) -> str:
+    digest = hashlib.sha256()
+    for path in (p_a, p_b):
+        path = np.ascontiguousarray(path, dtype=float)
+        digest.update(str(path.shape).encode())
+        digest.update(path.tobytes())
+    return digest.hexdigest()
+
+
+def param_hash(thresholds: Thresholds, market: MarketParams, fingerprint: str) -> str:
+    params = {
+        "version": CACHE_VERSION,
+        "thresholds": thresholds._asdict(),
+        "market": market._asdict(),
+        "paths": fingerprint,
+    }
+    encoded = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def _load(key):
+    path = CACHE_DIR / f"{key}.npz"
+    if not path.exists():
+        return None
+    with np.load(path) as data:
+        return BacktestResult(*(data[field] for field in BacktestResult._fields))
+
+
+def _store(key, result: BacktestResult):
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = CACHE_DIR / f"{key}.tmp.npz"
+    np.savez(tmp, **result._asdict())
+    os.replace(tmp, CACHE_DIR / f"{key}.npz")
+
+
+def evaluate(
+    threshold_sets, p_a, p_b, market=MarketParams(), processes=None
+) -> Dict[Thresholds, BacktestResult]:
+    """Backtest `threshold_sets`, reusing cached results where there are any."""
+    fingerprint = paths_fingerprint(p_a, p_b)
+    keys = {t: param_hash(t, market, fingerprint) for t in threshold_sets}
+    results = {}
+    missing = []
+    for thresholds, key in keys.items():
+        cached = _load(key)
+        if cached is None:
+            missing.append(thresholds)
+        else:
+            results[thresholds] = cached
+    if missing:
+        for thresholds, result in sweep(missing, p_a, p_b, market, processes).items():
+            _store(keys[thresholds], result)
+            results[thresholds] = result
+    return results
+
+
+def grid(space: SearchSpace) -> List[Thresholds]:
+    """Every valid combination in `space`."""
+    values = [space.values(field) for field in Thresholds._fields]
+    return [
+        t for t in itertools.starmap(Thresholds, itertools.product(*values)) if valid(t)
+    ]
+
+
+def _ranked(results, risk_aversion):
+    scored = [(objective(r, risk_aversion), t) for t, r in results.items()]
+    return sorted(scored, key=lambda item: item[0])
+
+
+def grid_search(
+    space: SearchSpace,
+    p_a,
+    p_b,
+    gas_price: float,
+    market=MarketParams(),
+    risk_aversion=0.0,
+    processes=None,
+) -> List[Tuple[float, Thresholds]]:
+    """Backtest the whole grid; returns `(objective, thresholds)`, best first."""
+    market = market._replace(gas_price=gas_price)
+    return _ranked(evaluate(grid(space), p_a, p_b, market, processes), risk_aversion)
+
+
+def _encode(space: SearchSpace, t: Thresholds) -> np.ndarray:
+    # each threshold scaled to [0, 1] over its range
+    out = []
+    for field, value in zip(Thresholds._fields, t):
+        low, high, _ = getattr(space, field)
+        out.append(0.0 if high == low else (value - low) / (high - low))
+    return np.array(out)
+
+
+def _sample(space: SearchSpace, rng, n) -> List[Thresholds]:
+    samples = set()
+    # bounded, as a narrow space may not have n valid points
+    for _ in range(n * 20):
+        t = Thresholds(*(int(rng.choice(space.values(f))) for f in Thresholds._fields))
+        if valid(t):
+            samples.add(t)
+        if len(samples) == n:
+            break
+    return list(samples)
+
+
+_erf = np.vectorize(math.erf)
+
+
+def _expected_improvement(x_seen, y_seen, x_new, length_scale, noise):
+    """Expected improvement over the best `y_seen` under an RBF kernel GP."""
+
+    def _kernel(a, b):
+        sq = ((a[:, None, :] - b[None, :, :]) ** 2).sum(-1)
+        return np.exp(-sq / (2 * length_scale ** 2))
+
+    mean_y, std_y = y_seen.mean(), y_seen.std() or 1.0
+    y = (y_seen - mean_y) / std_y
+    k = _kernel(x_seen, x_seen) + noise * np.eye(len(x_seen))
+    k_new = _kernel(x_new, x_seen)
+    alpha = np.linalg.solve(k, y)
+    mu = k_new @ alpha
+    var = 1 - np.einsum("ij,ji->i", k_new, np.linalg.solve(k, k_new.T))
+    sigma = np.sqrt(np.maximum(var, 1e-12))
+    improvement = y.min() - mu
+    z = improvement / sigma
+    cdf = 0.5 * (1 + _erf(z / math.sqrt(2)))
+    pdf = np.exp(-(z ** 2) / 2) / math.sqrt(2 * math.pi)
+    return improvement * cdf + sigma * pdf
+
+
+def sequential_search(
+    space: SearchSpace,
+    p_a,
+    p_b,
+    gas_price: float,
+    market=MarketParams(),
+    n_iter=30,
+    n_initial=8,
+    n_candidates=2000,
+    risk_aversion=0.0,
+    length_scale=0.25,
+    noise=1e-3,
+    seed=None,
+    processes=None,
+) -> List[Tuple[float, Thresholds]]:
+    """
+    Bayesian optimisation: backtest `n_initial` random threshold sets, then
+    `n_iter` more, one at a time, each picked by expected improvement over
+    `n_candidates` random valid points. Returns every evaluated set as
+    `(objective, thresholds)`, best first.
+    """
+    market = market._replace(gas_price=gas_price)
+    rng = np.random.default_rng(seed)
+    seen = evaluate(_sample(space, rng, n_initial), p_a, p_b, market, processes)
+    scores = {t: objective(r, risk_aversion) for t, r in seen.items()}
+
+    for _ in range(n_iter):
+        candidates = [t for t in _sample(space, rng, n_candidates) if t not in scores]
+        if not candidates:
+            break
+        x_seen = np.array([_encode(space, t) for t in scores])
+        y_seen = np.array(list(scores.values()))
+        x_new = np.array([_encode(space, t) for t in candidates])
+        ei = _expected_improvement(x_seen, y_seen, x_new, length_scale, noise)
+        pick = candidates[int(np.argmax(ei))]
+        [result] = evaluate([pick], p_a, p_b, market, processes).values()
+        scores[pick] = objective(result, risk_aversion)
+
+    return sorted(((s, t) for t, s in scores.items()), key=lambda item: item[0])
@@ -0,0 +1,121 @@
+"""
+Token prices from UniswapV2 pair reserves, cached per block.
+
+Reward tokens have no cToken, so the comptroller oracle can't price them. A
+token is priced in another at the pools' mid price instead, along the path
+`getTokenOutPath` would swap on: directly when either token is the router's
+WETH (WFTM on Fantom, shortA in every config), otherwise through it. For BOO
+or LQDR in want that is `farmTokenLP` and `wantShortALP`.
+
+`TokenPriceFeed` keeps the reserves read at each block, by pair, in a
+`scripts.block_cache.BlockCache`, so every price asked for at a block comes
+out of one multicall for all the pairs not yet read, whichever tokens are
+asked for. Pair addresses and token order are read once.
+
+`price_feed` is the instance shared by the test fixtures and the tooling:
+
+    price = price_feed.price(router, farm_token, want, block)  # want wei per farm token wei
+    prices = price_feed.prices(router, [lqdr, boo], want, block)
+"""
+from typing import Dict, Iterable, Tuple
+
+from brownie import interface, multicall, web3
+
+from scripts.block_cache import DEFAULT_MAX_BLOCKS, BlockCache
+from scripts.snapshot import forget_reverted_multicall
+from scripts.swap_predictor import token_out_path
+
+
+class TokenPriceFeed(BlockCache):
+    def __init__(self, max_blocks=DEFAULT_MAX_BLOCKS):
+        super().__init__(max_blocks)
+        # (router, token a, token b) -> (pair, token0), and router -> WETH
+        self._pairs: Dict[Tuple[str, str, str], Tuple[str, str]] = {}
+        self._hubs: Dict[str, str] = {}
+
+    def hub(self, router) -> str:
+        """`router.WETH()`, read once per router."""
+        router = str(router)
+        if router not in self._hubs:
+            self._hubs[router] = str(interface.IUniswapV2Router01(router).WETH())
+        return self._hubs[router]
+
+    def pair(self, router, token_a, token_b) -> Tuple[str, str]:
+        """The pair of two tokens on `router`'s factory, and its token0."""
+        key = (str(router), str(token_a), str(token_b))
+        if key not in self._pairs:
+            factory = interface.IUniswapV2Factory(
+                interface.IUniswapV2Router01(key[0]).factory()
+            )
+            pair = interface.IUniswapV2Pair(factory.getPair(key[1], key[2]))
+            self._pairs[key] = (pair.address, str(pair.token0()))
+        return self._pairs[key]
+
+    def path(self, router, token, quote) -> Tuple[str, ...]:
+        """The `getTokenOutPath` route from `token` to `quote`, none to itself."""
+        token, quote = str(token), str(quote)
+        if token == quote:
+            return (token,)
+        return token_out_path(token, quote, self.hub(router))
+
+    def reserves(self, pairs: Iterable[str], block_number, multicall_address=None):
+        """`getReserves()` of each of `pairs`, reading the uncached together."""
+        pairs = [str(p) for p in pairs]
+        found = self.get_many(block_number, pairs)
+        missing = [p for p in pairs if p not in found]
+        if missing:
+            if multicall_address is None:
+                forget_reverted_multicall()
+            with multicall(address=multicall_address, block_identifier=block_number):
+                reads = [interface.IUniswapV2Pair(p).getReserves() for p in missing]
+            fresh = {p: (int(r[0]), int(r[1])) for p, r in zip(missing, reads)}
+            self.put_many(block_number, fresh)
+            found.update(fresh)
+        return found
+
+    def prices(
+        self, router, tokens, quote, block_number=None, multicall_address=None
+    ) -> Dict[str, float]:
+        """
+        The mid price of each of `tokens` in `quote` at `block_number`
+        (default: latest), as `quote` wei per token wei.
+        """
+        block_number = web3.eth.block_number if block_number is None else block_number
+        paths = {str(t): self.path(router, t, quote) for t in tokens}
+        hops = {
+            t: [(a, self.pair(router, a, b)) for a, b in zip(path, path[1:])]
+            for t, path in paths.items()
+            if len(path) > 1
+        }
+        reserves = self.reserves(
+            {pair for steps in hops.values() for _, (pair, _) in steps},
+            block_number,
+            multicall_address,
+        )
+        prices = {}
+        for token in paths:
+            price = 1.0
+            for token_in, (pair, token0) in hops.get(token, []):
+                reserve0, reserve1 = reserves[pair]
+                if token0 == token_in:
+                    price *= reserve1 / reserve0
+                else:
+                    price *= reserve0 / reserve1
+            prices[token] = price
+        return prices
+
+    def price(
+        self, router, token, quote, block_number=None, multicall_address=None
+    ) -> float:
+        """`quote` wei per `token` wei at `block_number` (default: latest)."""
+        return self.prices(router, [token], quote, block_number, multicall_address)[
+            str(token)
+        ]
+
+    def _reset(self):
+        super()._reset()
+        self._pairs.clear()
+        self._hubs.clear()
+
+
+price_feed = TokenPriceFeed()
@@ -1,15 +1,13 @@
-import pytest
-from brownie import config
-from brownie import Contract
-from brownie import interface, project
-
- # TODO - Pull from coingecko
-LQDR_PRICE = 15
-SPOOKY_PRICE = 11.78
-SPIRIT_PRICE = 5.78
+import time
 
-WETH_PRICE = 3400
+import pytest
+from brownie import chain, config
+from brownie import interface, network, project
 
+from scripts.abi_cache import cached_contract
+from scripts.fork_state import install as install_fork_state
+from scripts.local_chain import LOCAL_STRATEGY, deploy_local_chain
+from scripts.token_prices import price_feed
 
 SPOOKY_MASTERCHEF = '0x2b2929E785374c651a81A63878Ab22742656DcDd'
 BOO = '0x841FAD6EAe12c286d1Fd18d1d525DFfA75C7EFFE'
@@ -20,19 +18,22 @@ lqdr = '0x10b620b2dbAC4Faa7D7FFD71Da486f5D44cd86f9'
 SPIRIT_ROUTER = '0x16327E3FbDaCA3bcF7E38F5Af2599D2DDc33aE52'
 SPOOKY_ROUTER = '0xF491e7B69E4244ad4002BC14e878a34207E38c29'
 
+# holds both short tokens, used to simulate trading fees accruing in the LP
+TRADING_FEE_WHALE = '0xd061c6586670792331E14a80f3b3Bb267189C681'
+
 CONFIG = {
     'USDCWFTMCRVScreamSpooky': {
         'token': '0x04068DA6C83AFCFA0e13ba15A6696662335D5B75',
         'whale': '0xe578C856933D8e1082740bf7661e379Aa2A30b26',
         'deposit': 1e6,
         'harvest_token': '0x841FAD6EAe12c286d1Fd18d1d525DFfA75C7EFFE',
-        'harvest_token_price': SPOOKY_PRICE * 1e-12,
         'harvest_token_whale': '0xa48d959AE2E88f1dAA7D5F611E01908106dE7598',
         'lp_token': '0xB471Ac6eF617e952b84C6a9fF5de65A9da96C93B',
         'lp_whale': '0x2b2929E785374c651a81A63878Ab22742656DcDd',
         'lp_farm': '0x2b2929E785374c651a81A63878Ab22742656DcDd',
         'pid': 14,
         'router': SPOOKY_ROUTER,
+        'trading_fee_whale': TRADING_FEE_WHALE,
 
     },
     'USDCWFTMLINKScreamSpooky': {
@@ -40,13 +41,13 @@ CONFIG = {
         'whale': '0xe578C856933D8e1082740bf7661e379Aa2A30b26',
         'deposit': 1e6,
         'harvest_token': '0x841FAD6EAe12c286d1Fd18d1d525DFfA75C7EFFE',
-        'harvest_token_price': SPOOKY_PRICE * 1e-12,
         'harvest_token_whale': '0xa48d959AE2E88f1dAA7D5F611E01908106dE7598',
         'lp_token': '0x89d9bC2F2d091CfBFc31e333D6Dc555dDBc2fd29',
         'lp_whale': '0x7F41312B5D2D31D49482F31C9a53e6485Df37E1D',
         'lp_farm': '0x2b2929E785374c651a81A63878Ab22742656DcDd',
         'pid': 6,
         'router': SPOOKY_ROUTER,
+        'trading_fee_whale': TRADING_FEE_WHALE,
 
     },
     'WETHWFTMLINKScreamSpooky': {
@@ -54,13 +55,13 @@ CONFIG = {
         'whale': '0x613BF4E46b4817015c01c6Bb31C7ae9edAadc26e',
         'deposit': 1e6,
         'harvest_token': '0x841FAD6EAe12c286d1Fd18d1d525DFfA75C7EFFE',
-        'harvest_token_price': SPOOKY_PRICE / WETH_PRICE,
         'harvest_token_whale': '0xa48d959AE2E88f1dAA7D5F611E01908106dE7598',
         'lp_token': '0x89d9bC2F2d091CfBFc31e333D6Dc555dDBc2fd29',
         'lp_whale': '0x7F41312B5D2D31D49482F31C9a53e6485Df37E1D',
         'lp_farm': '0x2b2929E785374c651a81A63878Ab22742656DcDd',
         'pid': 6,
         'router': SPOOKY_ROUTER,
+        'trading_fee_whale': TRADING_FEE_WHALE,
 
     },
 
@@ -69,71 +70,202 @@ CONFIG = {
         'whale': '0x613BF4E46b4817015c01c6Bb31C7ae9edAadc26e',
         'deposit': 1e6,
         'harvest_token': lqdr,
-        'harvest_token_price': LQDR_PRICE / WETH_PRICE,
         'harvest_token_whale': lqdrMasterChef,
         'lp_token': '0x89d9bC2F2d091CfBFc31e333D6Dc555dDBc2fd29',
         'lp_whale': '0x7F41312B5D2D31D49482F31C9a53e6485Df37E1D',
         'lp_farm': lqdrMasterChef,
         'pid': 14,
         'router': SPOOKY_ROUTER,
+        'trading_fee_whale': TRADING_FEE_WHALE,
 
     }
 
 }
 
 
-@pytest.fixture
-def strategy_contract():
-    yield  project.GenleveragelpProject.WETHWFTMLINKScreamLqdrSpooky
+def is_local():
+    # `brownie test --network development` runs against the local stand-in
+    # chain from scripts/local_chain.py rather than a Fantom fork
+    return network.show_active() == "development"
 
 
-@pytest.fixture
-def conf(strategy_contract):
-    yield CONFIG[strategy_contract._name]
+# The vault and strategy are deployed once per session, and `deployed_vault`
+# deposits and harvests once on top of that. Brownie's `module_isolation` resets
+# the chain around every module, which would throw those deployments away, so it
+# is replaced with a single reset per session. `fn_isolation` still reverts every
+# test back to the state the session fixtures left.
+@pytest.fixture(scope="session")
+def session_isolation():
+    chain.reset()
+    yield
+    chain.reset()
 
-@pytest.fixture
+
+@pytest.fixture(scope="module")
+def module_isolation(session_isolation):
+    yield
+
+
+@pytest.fixture(scope="session", autouse=True)
+def local_chain(session_isolation, accounts):
+    if not is_local():
+        yield None
+        return
+    yield deploy_local_chain(accounts[9], accounts[6])
+
+
+DEFAULT_STRATEGY = 'WETHWFTMLINKScreamLqdrSpooky'
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--strategy",
+        action="append",
+        help="entry contract(s) from CONFIG to test, or 'all' for every entry "
+        f"(default {DEFAULT_STRATEGY})",
+    )
+    parser.addoption(
+        "--update-gas-baseline",
+        action="store_true",
+        help="store the gas used by tests/test_gas.py as the new baseline",
+    )
+    parser.addoption(
+        "--fork-state",
+        action="store_true",
+        help="serve the fork's remote state reads from a local file, recording new ones",
+    )
+
+
+_fork_state = []
+
+
+def pytest_configure(config):
+    # before brownie launches the forked node, which then reads through the proxy
+    if config.getoption("fork_state"):
+        proxy = install_fork_state(config.getoption("network"))
+        if proxy is not None:
+            _fork_state.append(proxy)
+
+
+def pytest_unconfigure(config):
+    for proxy in _fork_state:
+        proxy.save()
+        proxy.stop()
+
+
+def selected_strategies(config):
+    # `--network` is read from the command line as the network itself is only
+    # connected once collection has finished
+    if config.getoption("network") == "development":
+        return [LOCAL_STRATEGY]
+    names = config.getoption("strategy") or [DEFAULT_STRATEGY]
+    if "all" in names:
+        return list(CONFIG)
+    unknown = set(names) - set(CONFIG)
+    if unknown:
+        raise pytest.UsageError(f"--strategy: no CONFIG entry for {', '.join(sorted(unknown))}")
+    return names
+
+
+def pytest_generate_tests(metafunc):
+    # Session scoped so every test for one strategy shares its deployments, and
+    # pytest runs all the tests for one strategy before moving on to the next
+    if "strategy_contract" in metafunc.fixturenames:
+        names = selected_strategies(metafunc.config)
+        metafunc.parametrize("strategy_contract", names, ids=names, indirect=True, scope="session")
+
+
+_strategies_run = []
+
+
+@pytest.fixture(scope="session")
+def strategy_contract(request, session_isolation):
+    if _strategies_run:
+        # a worker can be handed more than one strategy, so drop the previous
+        # strategy's deployments before the next one's session fixtures deploy
+        chain.reset()
+    _strategies_run.append(request.param)
+    yield getattr(project.GenleveragelpProject, request.param)
+
+
+@pytest.fixture(scope="session")
+def strategy_args(local_chain):
+    # constructor args after the vault
+    yield (local_chain.config,) if local_chain else ()
+
+
+@pytest.fixture(scope="session")
+def conf(strategy_contract, local_chain, accounts):
+    if local_chain:
+        conf = local_conf(local_chain, accounts)
+    else:
+        conf = dict(CONFIG[strategy_contract._name])
+    # want wei per harvest token wei, at the pools' price at the fork block
+    conf['harvest_token_price'] = price_feed.price(conf['router'], conf['harvest_token'], conf['token'], chain.height)
+    yield conf
+
+
+def local_conf(local_chain, accounts):
+    whale = accounts[6].address
+    config = local_chain.config
+    return {
+        'token': config.want,
+        'whale': whale,
+        'deposit': 1e6,
+        'harvest_token': config.farm_token,
+        'harvest_token_whale': whale,
+        'lp_token': config.short_a_short_b_lp,
+        'lp_whale': accounts[9].address,
+        'lp_farm': config.farm_master_chef,
+        'pid': config.farm_pid,
+        'router': config.router,
+        'trading_fee_whale': whale,
+        'short_whale': whale,
+    }
+
+@pytest.fixture(scope="session")
 def gov(accounts):
     yield accounts.at("0x7601630eC802952ba1ED2B6e4db16F699A0a5A87", force=True)
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def user(accounts):
     yield accounts[0]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def rewards(accounts):
     yield accounts[1]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def guardian(accounts):
     yield accounts[2]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def management(accounts):
     yield accounts[3]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def strategist(accounts):
     yield accounts[4]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def keeper(accounts):
     yield accounts[5]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def token(conf):
     # token_address = "0x04068DA6C83AFCFA0e13ba15A6696662335D5B75"  # USDC
     # token_address = "0x21be370D5312f44cB42ce377BC9b8a0cEF1A4C83"  # this should be the address of the ERC-20 used by the strategy/vault (DAI)
     yield interface.IERC20Extended(conf['token'])
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def amount(accounts, token, user, conf):
     amount = 10_000 * 10 ** token.decimals()
     # In order to get some funds for the token you are about to use,
@@ -163,11 +295,11 @@ def weth_amout(user, weth):
 
 @pytest.fixture
 def router(conf):
-    yield Contract(conf['router'])
+    yield interface.IUniswapV2Router02(conf['router'])
 
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def vault(pm, gov, rewards, guardian, management, token):
     Vault = pm(config["dependencies"][0]).Vault
     vault = guardian.deploy(Vault)
@@ -178,9 +310,9 @@ def vault(pm, gov, rewards, guardian, management, token):
     yield vault
 
 
-@pytest.fixture
-def strategy(strategist, keeper, vault, strategy_contract, gov):
-    strategy = strategist.deploy(strategy_contract, vault)
+@pytest.fixture(scope="session")
+def strategy(strategist, keeper, vault, strategy_contract, strategy_args, gov):
+    strategy = strategist.deploy(strategy_contract, vault, *strategy_args)
     #insurance = strategist.deploy(StrategyInsurance, strategy)
     strategy.setKeeper(keeper)
     #strategy.setInsurance(insurance, {'from': gov})
@@ -202,7 +334,7 @@ def lp_whale(accounts, conf):
 
 @pytest.fixture
 def harvest_token(conf):
-    yield Contract(conf['harvest_token'])
+    yield interface.IERC20Extended(conf['harvest_token'])
 
 @pytest.fixture
 def harvest_token_whale(conf, accounts):
@@ -212,6 +344,20 @@ def harvest_token_whale(conf, accounts):
 def whale(conf, accounts):
     yield accounts.at(conf['whale'], True)
 
+@pytest.fixture
+def trading_fee_whale(conf, accounts):
+    yield accounts.at(conf['trading_fee_whale'], True)
+
+@pytest.fixture
+def short_whale(conf, strategy, accounts):
+    # the shortA/shortB LP on the other AMM, so swaps don't move the strategy's
+    if 'short_whale' in conf:
+        yield accounts.at(conf['short_whale'], True)
+        return
+    altRouter = SPIRIT_ROUTER if conf['router'] == SPOOKY_ROUTER else SPOOKY_ROUTER
+    factory = cached_contract(cached_contract(altRouter).factory())
+    yield accounts.at(factory.getPair(strategy.shortA(), strategy.shortB()), True)
+
 @pytest.fixture
 def pid(conf):
     yield conf['pid']
@@ -227,7 +373,10 @@ def lp_farm(conf):
 def lp_price(token, lp_token):
     yield (token.balanceOf(lp_token) * 2) / lp_token.totalSupply()  
 
-@pytest.fixture
+# Warmed checkpoint: tests taking `deployed_vault` start from a vault that has
+# been deposited into and harvested once. They are ordered after the tests that
+# want the empty vault, see `pytest_collection_modifyitems`.
+@pytest.fixture(scope="session")
 def deployed_vault(chain, accounts, gov, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX):
     # Deposit to the vault
     token.approve(vault.address, amount, {"from": user})
@@ -252,9 +401,74 @@ def steal(stealPercent, strategy, token, chain, gov, user):
     chain.mine(1)
 
 
+@pytest.fixture
+def offset_debt_ratio(strategy, lp_token, short_whale, router):
+    # Swap shortA into shortB (or back, with reverse) from the short whale,
+    # moving the shortA/shortB pair by swapPct of its reserve to offset the
+    # debt ratios.
+    def offset(swapPct, reverse=False):
+        shortA = interface.IERC20Extended(strategy.shortA())
+        shortB = interface.IERC20Extended(strategy.shortB())
+        tokenIn, tokenOut = (shortB, shortA) if reverse else (shortA, shortB)
+        swapAmt = min(tokenIn.balanceOf(lp_token) * swapPct, tokenIn.balanceOf(short_whale))
+        tokenIn.approve(router, 2**256-1, {"from": short_whale})
+        router.swapExactTokensForTokens(swapAmt, 0, [tokenIn, tokenOut], short_whale, 2**256-1, {"from": short_whale})
+    yield offset
+
+
 # Function scoped isolation fixture to enable xdist.
 # Snapshots the chain before each test and reverts after test completion.
 @pytest.fixture(scope="function", autouse=True)
 def shared_setup(fn_isolation):
     pass
 
+
+def strategy_of(item):
+    callspec = getattr(item, "callspec", None)
+    return callspec.params.get("strategy_contract") if callspec else None
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(config, items):
+    # Keep each strategy's tests together, and within them run every test that
+    # needs the empty vault first, as the warmed checkpoint is built on top of
+    # it and persists until the strategy changes
+    order = selected_strategies(config)
+    items.sort(key=lambda item: (
+        order.index(strategy_of(item)) if strategy_of(item) in order else -1,
+        "deployed_vault" in getattr(item, "fixturenames", ()),
+    ))
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_xdist_make_scheduler(config, log):
+    # With more than one strategy, hand each xdist worker whole strategies so it
+    # compiles, forks and deploys once per strategy rather than once per module.
+    # Grouping is by the strategy id in each node id, as the xdist version brownie
+    # pins predates `--dist loadgroup`.
+    if len(selected_strategies(config)) < 2:
+        return None
+    from xdist.scheduler import LoadScopeScheduling
+
+    class StrategyScheduling(LoadScopeScheduling):
+        def _split_scope(self, nodeid):
+            params = nodeid.rpartition("[")[2].rstrip("]").split("-")
+            return next((name for name in params if name in CONFIG), nodeid)
+
+    return StrategyScheduling(config, log)
+
+
+# Wall clock spent in each test phase, to compare fixture setup cost between runs
+_durations = {"setup": 0.0, "call": 0.0, "teardown": 0.0}
+_started = time.perf_counter()
+
+
+def pytest_runtest_logreport(report):
+    _durations[report.when] += report.duration
+
+
+def pytest_terminal_summary(terminalreporter):
+    total = time.perf_counter() - _started
+    phases = ", ".join(f"{when} {secs:.1f}s" for when, secs in _durations.items())
+    terminalreporter.write_sep("-", f"wall clock {total:.1f}s ({phases})")
+
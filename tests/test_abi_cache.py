@@ -0,0 +1,28 @@
+import pytest
+
+from scripts import abi_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(abi_cache, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(abi_cache, "_abis", {})
+    yield tmp_path
+
+
+def test_abi_cache_round_trip(cache_dir, strategy, vault):
+    contract = abi_cache.cached_contract(strategy)
+    assert contract.vault() == vault.address
+    assert abi_cache.load_abi(strategy.address) == (strategy._name, strategy.abi)
+
+    # a fresh process resolves from disk rather than refetching
+    abi_cache.store_abi(strategy.address, "FromDisk", strategy.abi)
+    abi_cache._abis.clear()
+    assert abi_cache.cached_contract(strategy)._name == "FromDisk"
+
+
+def test_abi_cache_is_content_addressed(cache_dir, strategy, vault):
+    abi_cache.store_abi(strategy.address, "A", strategy.abi)
+    abi_cache.store_abi(vault.address, "B", strategy.abi)
+    assert len(list((cache_dir / "abis").iterdir())) == 1
+    assert abi_cache.load_abi(vault.address) == ("B", strategy.abi)
@@ -0,0 +1,43 @@
+import pytest
+
+from scripts import archive
+from scripts.snapshot import read_snapshot
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_backfill_and_resume(chain, deployed_vault, strategy, tmp_path, monkeypatch, fmt):
+    monkeypatch.setattr(archive, "CHUNK_BLOCKS", 4)
+    chain.mine(20)
+    # two whole chunks, with a third mined after them
+    end = chain.height - chain.height % 4 - 4
+    start = end - 8
+
+    assert archive.backfill([strategy], start, end, step=2, fmt=fmt, archive_dir=tmp_path) == 4
+    table = archive.load(strategy.address, fmt, tmp_path)
+    assert table.column("block_number").to_pylist() == list(range(start, end, 2))
+
+    row = table.slice(1, 1).to_pylist()[0]
+    snap = read_snapshot(strategy, start + 2)
+    assert row["debt_ratio_a"] == snap.debt_ratio_a
+    assert row["estimated_total_assets"] == snap.estimated_total_assets
+    assert row["short_a_in_lp"] == snap.short_a_in_lp
+    assert row["timestamp"].timestamp() == snap.timestamp
+
+    # done chunks are skipped, only the new one is read
+    assert archive.backfill([strategy], start, end, step=2, fmt=fmt, archive_dir=tmp_path) == 0
+    assert archive.backfill([strategy], start, end + 4, step=2, fmt=fmt, archive_dir=tmp_path) == 2
+    assert archive.load(strategy.address, fmt, tmp_path).num_rows == 6
+
+
+def test_backfill_workers(chain, deployed_vault, strategy, tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "CHUNK_BLOCKS", 4)
+    # Multicall2 must exist at every block read
+    read_snapshot(strategy)
+    chain.mine(20)
+    end = chain.height - chain.height % 4
+    start = end - 16
+
+    assert archive.backfill([strategy], start, end, step=2, workers=2, archive_dir=tmp_path) == 8
+    table = archive.load(strategy.address, archive_dir=tmp_path)
+    expected = archive.to_table([read_snapshot(strategy, block) for block in range(start, end, 2)])
+    assert table.to_pylist() == expected.to_pylist()
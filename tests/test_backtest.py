@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from scripts.backtest import MarketParams, Thresholds, gbm_paths, historical_paths, run_backtest, sweep
+
+
+def test_backtest_flat_prices():
+    flat = np.ones((4, 200))
+    result = run_backtest(Thresholds(), flat, flat, processes=1)
+    assert (result.rebalance_debt == 0).all()
+    assert (result.rebalance_collateral == 0).all()
+    assert pytest.approx(0, abs=1e-9) == result.il
+    assert (result.pnl > 0).all()
+
+
+def test_backtest_price_jump_rebalances():
+    # shortA doubles halfway through, pushing debt ratio A and collateral up
+    p_a = np.ones((1, 100))
+    p_a[:, 50:] = 2
+    p_b = np.ones((1, 100))
+    result = run_backtest(Thresholds(), p_a, p_b, processes=1)
+    assert result.rebalance_debt[0] >= 1
+    assert result.rebalance_collateral[0] >= 1
+    assert result.il[0] < 0
+    assert result.gas_used[0] > 0
+
+
+def test_backtest_pool_matches_serial():
+    p_a, p_b = gbm_paths(64, 100, seed=1)
+    thresholds = [Thresholds(), Thresholds(debt_upper=10500)]
+    serial = sweep(thresholds, p_a, p_b, processes=1, chunk_size=16)
+    pooled = sweep(thresholds, p_a, p_b, processes=2)
+    for t in thresholds:
+        assert np.allclose(serial[t].pnl, pooled[t].pnl)
+        assert (serial[t].rebalance_debt == pooled[t].rebalance_debt).all()
+
+
+def test_historical_paths():
+    prices = np.arange(1, 21, dtype=float)
+    p_a, p_b = historical_paths(prices, prices * 2, window=10, stride=5)
+    assert p_a.shape == (2, 11)
+    assert (p_a[:, 0] == 1).all() and (p_b[:, 0] == 1).all()
+
+
+def test_gas_units_override_defaults():
+    market = MarketParams(gas_units={"harvest": 1})
+    market.gas_per_call["rebalanceDebt"] = 0
+    assert market.gas_per_call["harvest"] == 1
+    assert MarketParams().gas_per_call["harvest"] == 1_500_000
+    assert MarketParams().gas_per_call["rebalanceDebt"] == 900_000
@@ -0,0 +1,65 @@
+import json
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from scripts.fork_state import ForkStateProxy, state_key
+
+
+class Upstream(BaseHTTPRequestHandler):
+    # stands in for the remote RPC, answering every request with its params
+    calls = []
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        batch = payload if isinstance(payload, list) else [payload]
+        Upstream.calls.extend(r["method"] for r in batch)
+        answers = [{"jsonrpc": "2.0", "id": r["id"], "result": r["params"][-1]} for r in batch]
+        body = json.dumps(answers if isinstance(payload, list) else answers[0]).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def rpc(url, payload):
+    request = urllib.request.Request(url, json.dumps(payload).encode(), {"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def test_state_key():
+    assert state_key("eth_getStorageAt", ["0xAb", "0x0", "0x10"]) == state_key("eth_getStorageAt", ["0xab", "0x0", "0x10"])
+    assert state_key("eth_getStorageAt", ["0xab", "0x0", "latest"]) is None
+    assert state_key("eth_call", [{}, "0x10"]) is None
+
+
+def test_proxy_records_and_serves(tmp_path):
+    upstream = ThreadingHTTPServer(("127.0.0.1", 0), Upstream)
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+    upstreamUrl = "http://127.0.0.1:{}".format(upstream.server_address[1])
+    path = tmp_path / "ftm-main-fork.json"
+    read = {"jsonrpc": "2.0", "id": 1, "method": "eth_getStorageAt", "params": ["0xab", "0x0", "0x10"]}
+    latest = {"jsonrpc": "2.0", "id": 2, "method": "eth_getStorageAt", "params": ["0xab", "0x0", "latest"]}
+
+    proxy = ForkStateProxy(upstreamUrl, path).start()
+    assert rpc(proxy.url, read)["result"] == "0x10"
+    assert rpc(proxy.url, [read, latest]) == [
+        {"jsonrpc": "2.0", "id": 1, "result": "0x10"},
+        {"jsonrpc": "2.0", "id": 2, "result": "latest"},
+    ]
+    assert Upstream.calls == ["eth_getStorageAt", "eth_getStorageAt"]
+    proxy.save()
+    proxy.stop()
+
+    # a later run answers recorded reads without the upstream
+    Upstream.calls.clear()
+    proxy = ForkStateProxy(upstreamUrl, path).start()
+    assert rpc(proxy.url, read)["result"] == "0x10"
+    assert Upstream.calls == []
+    assert proxy.hits == 1
+    proxy.stop()
+    upstream.shutdown()
@@ -0,0 +1,85 @@
+import pytest
+
+from scripts import gas
+
+# Gas benchmarks for the CoreStrategy entry points. Each test runs one path from
+# the warmed checkpoint (or the empty vault for the first deploy), records the
+# gas used and fails if it regressed against tests/gas_baseline.json. A path
+# with no baseline yet is skipped once recorded, rather than passing unchecked.
+# See scripts/gas.py.
+
+
+@pytest.fixture(scope="module")
+def gas_results(request):
+    results = {}
+    yield results
+    for strategy, paths in results.items():
+        gas.write_report(strategy, paths)
+    if request.config.getoption("update_gas_baseline"):
+        gas.update_baseline(results)
+
+
+@pytest.fixture
+def record_gas(request, gas_results, strategy_contract):
+    name = strategy_contract._name
+    baseline = gas.load_baseline()
+    update = request.config.getoption("update_gas_baseline")
+
+    def record(path, tx):
+        gas_results.setdefault(name, {})[path] = tx.gas_used
+        if not update:
+            result = {name: {path: tx.gas_used}}
+            if gas.missing(result, baseline):
+                pytest.skip(f"no gas baseline for {name} {path}, run with --update-gas-baseline")
+            found = gas.regressions(result, baseline)
+            assert not found, str(found[0])
+
+    yield record
+
+
+def test_gas_deploy(chain, vault, strategy, token, user, amount, record_gas):
+    # adjustPosition -> _deploy on the first harvest
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+    record_gas("adjustPosition_deploy", strategy.harvest())
+
+
+def test_gas_harvest(chain, deployed_vault, strategy, record_gas):
+    chain.sleep(3600)
+    chain.mine(100)
+    record_gas("harvest", strategy.harvest())
+
+
+def test_gas_rebalance_debt(chain, deployed_vault, strategy, gov, record_gas, offset_debt_ratio):
+    offset_debt_ratio(0.025)
+    record_gas("rebalanceDebt", strategy.rebalanceDebt({'from': gov}))
+
+
+def test_gas_rebalance_collateral(deployed_vault, strategy, gov, record_gas):
+    target = 6000
+    strategy.setCollateralThresholds(target - 500, target, target + 500, {'from': gov})
+    record_gas("rebalanceCollateral", strategy.rebalanceCollateral({'from': gov}))
+
+
+WITHDRAW_PATHS = {
+    "withdraw_below_swap_threshold": 300,
+    "withdraw_above_swap_threshold": 2000,
+    "withdraw_full_liquidation": 9700,
+}
+
+
+@pytest.mark.parametrize("path", WITHDRAW_PATHS)
+def test_gas_withdraw(deployed_vault, strategy, gov, path, record_gas):
+    # _withdraw only swaps above 5% of the deployed capital and liquidates
+    # everything above 95%
+    percent = WITHDRAW_PATHS[path]
+    amount = strategy.balanceDeployed() * percent // 10_000 + strategy.balanceOfWant()
+    record_gas(path, strategy.liquidatePositionAuth(amount, {'from': gov}))
+
+
+def test_gas_liquidate_all(chain, deployed_vault, strategy, gov, record_gas):
+    # harvest in emergency exit goes through liquidateAllPositions
+    strategy.setEmergencyExit({'from': gov})
+    chain.sleep(1)
+    record_gas("liquidateAllPositions", strategy.harvest({'from': gov}))
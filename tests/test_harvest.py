@@ -5,19 +5,8 @@ import time
 
 
 def test_profitable_harvest(
-    chain, accounts, gov, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, conf
+    chain, accounts, gov, token, vault, deployed_vault, strategy, user, strategist, amount, RELATIVE_APPROX, conf
 ):
-    #strategy.approveContracts({'from':gov})
-    # Deposit to the vault
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-    assert token.balanceOf(vault.address) == amount
-
-    # Harvest 1: Send funds through the strategy
-    chain.sleep(1)
-    strategy.harvest()
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
     harvest = interface.ERC20(conf['harvest_token'])
     harvestWhale = accounts.at(conf['harvest_token_whale'], True)
     sendAmount = round((vault.totalAssets() / conf['harvest_token_price']) * 0.0125)
@@ -51,27 +40,16 @@ def test_profitable_harvest(
 
 
 def test_profitable_harvest_trading_fees(
-    chain, accounts, gov, token, vault, strategy, user, strategist, lp_token ,amount, RELATIVE_APPROX, Contract, conf
+    chain, accounts, gov, token, vault, deployed_vault, strategy, user, strategist, lp_token ,amount, RELATIVE_APPROX, router, trading_fee_whale, conf
 ):
-    #strategy.approveContracts({'from':gov})
-    # Deposit to the vault
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-    assert token.balanceOf(vault.address) == amount
-
-    # Harvest 1: Send funds through the strategy
-    chain.sleep(1)
-    strategy.harvest()
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
     # Use a whale of the shortA & shortB (other LP) token to send & simulate high trading fees being accrued
     print("Simulate accooomulation of trading fees within LP")
 
-    tradingFeeWhale = '0xd061c6586670792331E14a80f3b3Bb267189C681'
+    tradingFeeWhale = trading_fee_whale
 
 
-    shortA = Contract(strategy.shortA())
-    shortB = Contract(strategy.shortB())
+    shortA = interface.IERC20Extended(strategy.shortA())
+    shortB = interface.IERC20Extended(strategy.shortB())
     sendAmtA = shortA.balanceOf(lp_token)*0.025
     sendAmtB = shortB.balanceOf(lp_token)*0.025
 
@@ -81,7 +59,7 @@ def test_profitable_harvest_trading_fees(
         shortA.transfer(lp_token, sendAmtA, {'from': tradingFeeWhale})
         shortB.transfer(lp_token, sendAmtB, {'from': tradingFeeWhale})
 
-        spookyRouter = Contract("0xF491e7B69E4244ad4002BC14e878a34207E38c29")
+        spookyRouter = router
 
         shortA.approve(spookyRouter, 2**256-1, {"from": tradingFeeWhale})
         swapAmt = sendAmtA*0.01 
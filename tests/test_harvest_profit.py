@@ -0,0 +1,43 @@
+import pytest
+from brownie import chain, interface
+
+from scripts.harvest_profit import HarvestInputs, pending_view, plan, read_fleet
+from scripts.swap_predictor import token_out_path
+from scripts.strategy_config import get_config
+from scripts.token_prices import price_feed
+
+
+def test_interval_grows_with_gas():
+    inputs = HarvestInputs(
+        strategy="0x0", block_number=1, since_report=86400, farm_rewards=10**20,
+        estimated_total_assets=10**22, debt_ratio_a=9800, debt_ratio_b=9900, debt_lower=9900,
+        balance_lp=2 * 10**22, route=((10**24, 5 * 10**24),), sell_in_want=0.0003, short_a_in_want=0.0003,
+    )
+    plans = plan([inputs] * 3, 100e9, [0, 2_000_000, 20_000_000])
+    intervals = [p.optimal_interval for p in plans]
+    assert intervals == sorted(intervals)
+    assert plans[0].optimal_apr > plans[1].optimal_apr > plans[2].optimal_apr
+    # neither debt ratio is under debtLower
+    assert plans[0].fees_recovered == 0
+
+
+def test_read_fleet_matches_chain(deployed_vault, strategy, harvest_token, harvest_token_whale):
+    cfg = get_config(strategy)
+    harvest_token.transfer(strategy, harvest_token.balanceOf(harvest_token_whale) // 1000, {'from': harvest_token_whale})
+    chain.sleep(3600)
+    chain.mine(100)
+
+    [inputs] = read_fleet([strategy])
+    pending = pending_view(strategy)(cfg.farm_pid, strategy)
+    assert inputs.farm_rewards == pending + harvest_token.balanceOf(strategy)
+    assert inputs.debt_ratio_a == strategy.calcDebtRatioA()
+    assert inputs.debt_ratio_b == strategy.calcDebtRatioB()
+    assert inputs.short_a_in_want == price_feed.price(cfg.router, cfg.short_a, cfg.want, inputs.block_number)
+
+    # the rewards sold along the strategy's own path
+    [harvestPlan] = plan([inputs], 0, 0)
+    sellToken = cfg.short_a if inputs.debt_ratio_a > inputs.debt_ratio_b else cfg.short_b
+    path = token_out_path(cfg.farm_token, sellToken, cfg.short_a)
+    amountOut = interface.IUniswapV2Router01(cfg.router).getAmountsOut(inputs.farm_rewards, path)[-1]
+    rewardValue = harvestPlan.harvest_value - harvestPlan.fees_recovered
+    assert rewardValue == pytest.approx(amountOut * inputs.sell_in_want, rel=1e-9)
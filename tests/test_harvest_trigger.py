@@ -0,0 +1,44 @@
+import pytest
+
+from scripts import harvest_trigger
+from scripts.harvest_trigger import evaluate_fleet
+
+
+def test_fleet_trigger_matches_chain(chain, deployed_vault, strategy, gov):
+    [result] = evaluate_fleet([strategy])
+    assert result.harvest_trigger == strategy.harvestTrigger(0)
+    assert result.triggered == result.harvest_trigger
+    assert result.reason == harvest_trigger.REPORT_NOT_DUE
+
+    chain.sleep(strategy.maxReportDelay() + 1)
+    chain.mine(1)
+    [result] = evaluate_fleet([strategy])
+    assert result.triggered == strategy.harvestTrigger(0)
+    assert result.reason in (
+        harvest_trigger.REPORT_DUE_IN_PROFIT,
+        harvest_trigger.REPORT_DUE_NOT_IN_PROFIT,
+    )
+
+    strategy.setForceHarvestTriggerOnce(True, {"from": gov})
+    [result] = evaluate_fleet([strategy.address])
+    assert result.triggered and result.harvest_trigger
+    assert result.reason == harvest_trigger.FORCED
+
+
+def test_fleet_trigger_keeps_order(deployed_vault, strategy, strategist, strategy_contract, strategy_args, vault):
+    other = strategist.deploy(strategy_contract, vault, *strategy_args)
+    results = evaluate_fleet([other, strategy])
+    assert [r.strategy for r in results] == [other.address, strategy.address]
+    assert results[0].total_debt == 0
+    assert results[1].total_debt == vault.strategies(strategy)["totalDebt"]
+
+
+@pytest.mark.parametrize("force,since,assets,expected", [
+    (True, 0, None, (True, harvest_trigger.FORCED)),
+    (False, 0, None, (None, harvest_trigger.ASSETS_REVERTED)),
+    (False, 10, 101, (False, harvest_trigger.REPORT_NOT_DUE)),
+    (False, 11, 101, (True, harvest_trigger.REPORT_DUE_IN_PROFIT)),
+    (False, 11, 100, (False, harvest_trigger.REPORT_DUE_NOT_IN_PROFIT)),
+])
+def test_replay_trigger(force, since, assets, expected):
+    assert harvest_trigger.replay_trigger(force, 10, since, assets, 100) == expected
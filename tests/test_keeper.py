@@ -0,0 +1,37 @@
+import asyncio
+
+import brownie
+import pytest
+from brownie import KeeperProxy
+
+from scripts.keeper import KeeperDaemon, KeeperJob, REBALANCE_COLLATERAL, due_action
+from scripts.snapshot import read_snapshot
+
+
+@pytest.fixture
+def keeper_job(strategy, strategist, gov, keeper):
+    proxy = strategist.deploy(KeeperProxy, strategy)
+    strategy.setKeeper(proxy, {'from': gov})
+    proxy.addKeeper(keeper, {'from': strategist})
+    yield KeeperJob(strategy, proxy, keeper)
+
+
+def test_keeper_skips_in_range(chain, deployed_vault, strategy, keeper_job, keeper):
+    assert due_action(read_snapshot(strategy)) is None
+    with brownie.reverts():
+        keeper_job.proxy.rebalanceCollateral({'from': keeper})
+
+    daemon = KeeperDaemon([keeper_job])
+    assert asyncio.run(daemon.tick()) == []
+
+
+def test_keeper_rebalances_collateral(chain, deployed_vault, strategy, keeper_job, gov):
+    target = 6000
+    strategy.setCollateralThresholds(target - 500, target, target + 500, {'from': gov})
+    assert due_action(read_snapshot(strategy)) == REBALANCE_COLLATERAL
+
+    daemon = KeeperDaemon([keeper_job])
+    actions = asyncio.run(daemon.tick())
+    assert actions[0].action == REBALANCE_COLLATERAL
+    assert all(action.error is None for action in actions)
+    assert pytest.approx(target, rel=1e-2) == strategy.calcCollateral()
@@ -0,0 +1,41 @@
+import pytest
+from brownie import chain, interface
+
+from scripts.liquidation_risk import LiquidationRiskEngine, liquidation_moves
+from scripts.strategy_config import get_config
+
+
+def test_liquidation_moves():
+    moveA, moveB, moveBoth = liquidation_moves([150, 90, 100], [50, 60, 0], [50, 40, 0])
+    assert list(moveA) == pytest.approx([1.0, -0.16666666, float("inf")])
+    assert list(moveB) == pytest.approx([1.0, -0.25, float("inf")])
+    assert list(moveBoth) == pytest.approx([0.5, -0.1, float("inf")])
+
+
+def test_engine_matches_comptroller(deployed_vault, strategy):
+    cfg = get_config(strategy)
+    engine = LiquidationRiskEngine([strategy])
+    [risk] = engine.ranked()
+    assert risk.debt_a == interface.ICToken(cfg.c_token_borrow_a).borrowBalanceStored(strategy)
+    assert risk.debt_b == interface.ICToken(cfg.c_token_borrow_b).borrowBalanceStored(strategy)
+
+    _, liquidity, shortfall = interface.IComptrollerMarkets(cfg.comptroller).getAccountLiquidity(strategy)
+    assert shortfall == 0
+    assert risk.collateral - risk.borrows == pytest.approx(liquidity, rel=1e-6)
+    # a delta neutral position is a long way from liquidation
+    assert 0 < risk.distance == min(risk.move_a, risk.move_b, risk.move_both)
+    assert risk.borrows * (1 + risk.move_both) == pytest.approx(risk.collateral, rel=1e-9)
+
+
+def test_engine_follows_positions(deployed_vault, strategy, user, vault):
+    cfg = get_config(strategy)
+    engine = LiquidationRiskEngine([strategy])
+    before = engine.ranked()[0]
+
+    # a withdrawal repays part of both borrows
+    vault.withdraw(vault.balanceOf(user) // 2, {'from': user})
+    chain.mine(5)
+    [risk] = engine.update()
+    assert risk.debt_a < before.debt_a
+    assert risk.debt_a == pytest.approx(interface.ICToken(cfg.c_token_borrow_a).borrowBalanceStored(strategy), rel=1e-9)
+    assert risk.debt_b == pytest.approx(interface.ICToken(cfg.c_token_borrow_b).borrowBalanceStored(strategy), rel=1e-9)
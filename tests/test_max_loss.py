@@ -0,0 +1,29 @@
+import brownie
+
+from scripts.max_loss import min_max_loss, quote_vault_withdraw, read_withdraw_state, required_max_loss
+
+
+def test_required_max_loss():
+    assert required_max_loss(0, 100) == 0
+    # 1 of 10_000 is exactly 1 bps, 1 more wei needs the next one
+    assert required_max_loss(1, 9_999) == 1
+    assert required_max_loss(2, 9_999) == 2
+    assert required_max_loss(100, 0) == 10_000
+
+
+def test_min_max_loss(chain, deployed_vault, vault, strategy, user, offset_debt_ratio):
+    # move the pair so the strategy is at a loss, then withdraw everything
+    offset_debt_ratio(0.025)
+    assert strategy.estimatedTotalAssets() < vault.strategies(strategy)["totalDebt"]
+
+    shares = vault.balanceOf(user)
+    state = read_withdraw_state(vault, [strategy])
+    quote = quote_vault_withdraw(state, shares)
+    maxLoss = min_max_loss(state, shares)
+    assert quote.total_loss > 0
+    assert maxLoss == quote.max_loss > 0
+
+    with brownie.reverts():
+        vault.withdraw(shares, user, maxLoss - 1, {"from": user})
+    tx = vault.withdraw(shares, user, maxLoss, {"from": user})
+    assert tx.return_value == quote.value
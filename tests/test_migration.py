@@ -10,24 +10,18 @@ def test_migration(
     chain,
     token,
     vault,
+    deployed_vault,
     strategy,
     amount,
     strategy_contract,
+    strategy_args,
     strategist,
     gov,
     user,
     RELATIVE_APPROX,
 ):
-    # Deposit to the vault and harvest
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-    chain.sleep(1)
-    #strategy.approveContracts({'from':gov})
-    strategy.harvest()
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
     # migrate to a new strategy
-    new_strategy = strategist.deploy(strategy_contract, vault)
+    new_strategy = strategist.deploy(strategy_contract, vault, *strategy_args)
     chain.mine(1)
     chain.sleep(1)
     #new_strategy.approveContracts({'from':gov})
@@ -60,7 +54,7 @@ def test_migration_with_low_calcdebtratio(
     # assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
 
     # # migrate to a new strategy
-    # new_strategy = strategist.deploy(strategy_contract, vault)
+    # new_strategy = strategist.deploy(strategy_contract, vault, *strategy_args)
     # new_strategy.approveContracts({'from':gov})
     # vault.migrateStrategy(strategy, new_strategy, {"from": gov})
     # assert (
@@ -90,7 +84,7 @@ def test_migration_with_high_calcdebtratio(
     # assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
 
     # # migrate to a new strategy
-    # new_strategy = strategist.deploy(strategy_contract, vault)
+    # new_strategy = strategist.deploy(strategy_contract, vault, *strategy_args)
     # new_strategy.approveContracts({'from':gov})
     # vault.migrateStrategy(strategy, new_strategy, {"from": gov})
     # assert (
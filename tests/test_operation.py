@@ -17,20 +17,9 @@ def strategySharePrice(strategy, vault):
 #CASE A = both debt ratios are less than 100%
 
 def test_operation_nomral(
-    chain, accounts, gov, token, vault, strategy, user, strategist, lp_token, Contract, amount, RELATIVE_APPROX, conf
+    chain, accounts, gov, token, vault, deployed_vault, strategy, user, strategist, lp_token, Contract, amount, RELATIVE_APPROX, conf
 ):
-    #strategy.approveContracts({'from':gov})
-    # Deposit to the vault
-    user_balance_before = token.balanceOf(user)
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-    assert token.balanceOf(vault.address) == amount
-    
-    # harvest
-    chain.sleep(1)
-    strategy.harvest()
-    strat = strategy
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
+    user_balance_before = token.balanceOf(user) + amount
 
     chain.sleep(1)
     chain.mine(1)
@@ -54,20 +43,9 @@ def test_operation_nomral(
     )
 
 def test_operation_lossy(
-    chain, accounts, gov, token, vault, strategy, user, strategist, lp_token, Contract, amount, RELATIVE_APPROX, conf
+    chain, accounts, gov, token, vault, deployed_vault, strategy, user, strategist, lp_token, Contract, amount, RELATIVE_APPROX, conf
 ):
-    #strategy.approveContracts({'from':gov})
-    # Deposit to the vault
-    user_balance_before = token.balanceOf(user)
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-    assert token.balanceOf(vault.address) == amount
-    
-    # harvest
-    chain.sleep(1)
-    strategy.harvest()
-    strat = strategy
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
+    user_balance_before = token.balanceOf(user) + amount
 
     chain.sleep(1)
     chain.mine(1)
@@ -92,31 +70,20 @@ def test_operation_lossy(
 
 
 def test_operation_case_A(
-    chain, accounts, gov, token, vault, strategy, user, strategist, lp_token, Contract, amount, RELATIVE_APPROX, conf
+    chain, accounts, gov, token, vault, deployed_vault, strategy, user, strategist, lp_token, router, trading_fee_whale, amount, RELATIVE_APPROX, conf
 ):
-    #strategy.approveContracts({'from':gov})
-    # Deposit to the vault
-    user_balance_before = token.balanceOf(user)
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-    assert token.balanceOf(vault.address) == amount
-    
-    # harvest
-    chain.sleep(1)
-    strategy.harvest()
-    strat = strategy
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
+    user_balance_before = token.balanceOf(user) + amount
 
-    tradingFeeWhale = '0xd061c6586670792331E14a80f3b3Bb267189C681'
-    shortA = Contract(strategy.shortA())
-    shortB = Contract(strategy.shortB())
+    tradingFeeWhale = trading_fee_whale
+    shortA = interface.IERC20Extended(strategy.shortA())
+    shortB = interface.IERC20Extended(strategy.shortB())
     sendAmtA = shortA.balanceOf(lp_token)*0.002
     sendAmtB = shortB.balanceOf(lp_token)*0.002
 
     shortA.transfer(lp_token, sendAmtA, {'from': tradingFeeWhale})
     shortB.transfer(lp_token, sendAmtB, {'from': tradingFeeWhale})
 
-    spookyRouter = Contract("0xF491e7B69E4244ad4002BC14e878a34207E38c29")
+    spookyRouter = router
 
     shortA.approve(spookyRouter, 2**256-1, {"from": tradingFeeWhale})
     swapAmt = sendAmtA*0.01 
@@ -146,16 +113,8 @@ def test_operation_case_A(
 
 
 def test_emergency_exit(
-    chain, accounts, gov, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, conf
+    chain, accounts, gov, token, vault, deployed_vault, strategy, user, strategist, amount, RELATIVE_APPROX, conf
 ):
-    #strategy.approveContracts({'from':gov})
-    # Deposit to the vault
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-    chain.sleep(1)
-    strategy.harvest()
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
     # set emergency and exit
     strategy.setEmergencyExit()
     chain.sleep(1)
@@ -195,17 +154,8 @@ def test_reduce_debt_half(
 
 
 def test_change_debt_lossy(
-    chain, gov, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, conf
+    chain, gov, token, vault, deployed_vault, strategy, user, strategist, amount, RELATIVE_APPROX, conf
 ):
-    # Deposit to the vault and harvest
-    #strategy.approveContracts({'from':gov})
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-
-
-    chain.sleep(1)
-    strategy.harvest()
-
     # Steal from the strategy
     steal = round(strategy.estimatedTotalAssets() * 0.01)
     strategy.liquidatePositionAuth(steal, {'from': gov})
@@ -270,19 +220,8 @@ def test_triggers(
 
 
 def test_lossy_withdrawal(
-    chain, gov, accounts, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, conf
+    chain, gov, accounts, token, vault, deployed_vault, strategy, user, strategist, amount, RELATIVE_APPROX, conf
 ):
-    # Deposit to the vault and harvest
-    ##strategy.approveContracts({'from':gov})
-
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-
-    vault.updateStrategyDebtRatio(strategy.address, 100_00, {"from": gov})
-    chain.sleep(1)
-    strategy.harvest()
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
     # Steal from the strategy
     stealPercent = 0.01
     steal(stealPercent, strategy, token, chain, gov, user)
@@ -294,20 +233,8 @@ def test_lossy_withdrawal(
     assert pytest.approx(balAfter - balBefore, rel = 2e-3) == int(amount * .99)
 
 def test_lossy_withdrawal_partial(
-    chain, gov, accounts, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, conf
+    chain, gov, accounts, token, vault, deployed_vault, strategy, user, strategist, amount, RELATIVE_APPROX, conf
 ):
-    # Deposit to the vault and harvest
-    ##strategy.approveContracts({'from':gov})
-
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-
-    vault.updateStrategyDebtRatio(strategy.address, 100_00, {"from": gov})
-    chain.sleep(1)
-    strategy.harvest()
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
-
     # Steal from the strategy
     stealPercent = 0.005
     steal(stealPercent, strategy, token, chain, gov, user)
@@ -328,21 +255,8 @@ def test_lossy_withdrawal_partial(
     assert pytest.approx(ssp_before, rel = 2e-5) == ssp_after
 
 def test_lossy_withdrawal_tiny(
-    chain, gov, accounts, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, conf
+    chain, gov, accounts, token, vault, deployed_vault, strategy, user, strategist, amount, RELATIVE_APPROX, conf
 ):
-    # Deposit to the vault and harvest
-    ##strategy.approveContracts({'from':gov})
-
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-
-
-    vault.updateStrategyDebtRatio(strategy.address, 100_00, {"from": gov})
-    chain.sleep(1)
-    strategy.harvest()
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
-
     # Steal from the strategy
     stealPercent = 0.005
     steal(stealPercent, strategy, token, chain, gov, user)
@@ -363,21 +277,8 @@ def test_lossy_withdrawal_tiny(
     assert pytest.approx(ssp_before, rel = 2e-5) == ssp_after
 
 def test_lossy_withdrawal_99pc(
-    chain, gov, accounts, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, conf
+    chain, gov, accounts, token, vault, deployed_vault, strategy, user, strategist, amount, RELATIVE_APPROX, conf
 ):
-    # Deposit to the vault and harvest
-
-    ##strategy.approveContracts({'from':gov})
-
-
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-
-    vault.updateStrategyDebtRatio(strategy.address, 100_00, {"from": gov})
-    chain.sleep(1)
-    strategy.harvest()
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
     # Steal from the strategy
     stealPercent = 0.005
     steal(stealPercent, strategy, token, chain, gov, user)
@@ -398,22 +299,8 @@ def test_lossy_withdrawal_99pc(
     assert pytest.approx(ssp_before, rel = 2e-5) == ssp_after
 
 def test_lossy_withdrawal_95pc(
-    chain, gov, accounts, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, conf
+    chain, gov, accounts, token, vault, deployed_vault, strategy, user, strategist, amount, RELATIVE_APPROX, conf
 ):
-    # Deposit to the vault and harvest
-
-    ##strategy.approveContracts({'from':gov})
-
-
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-
-    vault.updateStrategyDebtRatio(strategy.address, 100_00, {"from": gov})
-    chain.sleep(1)
-    strategy.harvest()
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
-
     # Steal from the strategy
     stealPercent = 0.005
     steal(stealPercent, strategy, token, chain, gov, user)
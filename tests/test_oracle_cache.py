@@ -0,0 +1,46 @@
+from brownie import interface
+
+from scripts.oracle_cache import OraclePriceCache, price_cache
+from scripts.snapshot import read_snapshot
+from scripts.strategy_config import get_config
+
+
+def test_prices_match_oracle(chain, deployed_vault, strategy):
+    cfg = get_config(strategy)
+    cache = OraclePriceCache()
+    oracle = cache.oracle(cfg.comptroller)
+    block = chain.height
+    cTokens = [cfg.c_token_lend, cfg.c_token_borrow_a, cfg.c_token_borrow_b]
+
+    prices = cache.prices(oracle, cTokens, block)
+    for cToken in cTokens:
+        assert prices[cToken] == interface.ICompPriceOracle(oracle).getUnderlyingPrice(cToken)
+    assert cache.misses == 3
+
+    # the second strategy on the comptroller reads nothing
+    assert cache.prices(oracle, cTokens, block) == prices
+    assert cache.hits == 3 and cache.misses == 3
+    assert cache.get_price(cfg.comptroller, cfg.c_token_lend, cfg.c_token_borrow_a, block) == prices[cfg.c_token_borrow_a] * 10**18 // prices[cfg.c_token_lend]
+
+
+def test_lru_and_revert(chain):
+    cache = OraclePriceCache(max_blocks=2)
+    cache.store("oracle", 1, {"c": 1})
+    cache.store("oracle", 2, {"c": 2})
+    assert cache.lookup("oracle", ["c"], 1) == {"c": 1}
+    # block 2 is now the least recently used
+    cache.store("oracle", 3, {"c": 3})
+    assert cache.lookup("oracle", ["c"], 2) == {}
+    assert cache.lookup("oracle", ["c"], 1) == {"c": 1}
+
+    cache._revert(2)
+    assert cache.lookup("oracle", ["c"], 3) == {}
+    assert cache.lookup("oracle", ["c"], 1) == {"c": 1}
+
+
+def test_snapshot_shares_prices(chain, deployed_vault, strategy):
+    block = chain.height
+    first = read_snapshot(strategy, block)
+    hits = price_cache.hits
+    assert read_snapshot(strategy, block) == first
+    assert price_cache.hits == hits + 3
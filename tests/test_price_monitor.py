@@ -0,0 +1,34 @@
+import pytest
+
+from scripts import strategy_math
+from scripts.price_monitor import PriceSourceMonitor, blocks_to_breach, render_metrics
+from scripts.snapshot import read_snapshot
+
+
+def test_blocks_to_breach():
+    assert blocks_to_breach([1, 2, 3], [10000, 10100, 10200], 9000, 11000) == pytest.approx(8)
+    assert blocks_to_breach([1, 2, 3], [10000, 9900, 9800], 9000, 11000) == pytest.approx(8)
+    assert blocks_to_breach([1, 2], [10000, 10000], 9000, 11000) is None
+    assert blocks_to_breach([1], [10000], 9000, 11000) is None
+    assert blocks_to_breach([1, 2], [10000, 11000], 9000, 11000) == 0
+
+
+def test_price_monitor(deployed_vault, strategy, offset_debt_ratio):
+    monitor = PriceSourceMonitor([strategy])
+    [reading] = monitor.readings()
+    state = read_snapshot(strategy, monitor.index.block_number).position_state()
+    assert (reading.ratio_a, reading.ratio_b) == strategy_math.price_source_ratios(state)
+    assert reading.ok
+    assert f'price_source_ok{{strategy="{strategy.address}"}} 1' in render_metrics([reading])
+
+    # nothing moved, nothing recomputed
+    assert monitor.update() == [reading]
+
+    # push shortB well past priceSourceDiff against the oracle
+    offset_debt_ratio(0.3)
+
+    [reading] = monitor.update()
+    assert reading.block_number == monitor.index.block_number
+    assert not reading.ok
+    assert reading.margin < 0
+    assert reading.predicted_failure_block == reading.block_number
@@ -5,49 +5,7 @@ import time
 
 # PUT ALL TESTS HERE WHERE WE OFFSET THE LP PRICE 
 
-#this gets LP on other AMM so we can SIM a swap to offset debt Ratios 
-def getWhaleAddress(strategy, routerAddress, Contract) : 
-    spiritRouter = '0x16327E3FbDaCA3bcF7E38F5Af2599D2DDc33aE52'
-    spookyRouter = '0xF491e7B69E4244ad4002BC14e878a34207E38c29'
-    if (routerAddress == spiritRouter):
-        altRouter = spookyRouter
-    else : altRouter = spiritRouter
-
-    altRouterContract = Contract(altRouter)
-    factory = Contract(altRouterContract.factory())
-    token = strategy.shortA()
-    short = strategy.shortB()
-
-    whale = factory.getPair(token, short)
-
-    return(whale)
-
-
-def offSetDebtRatioA(strategy, lp_token, token, Contract, swapPct, router):
-    # use other AMM's LP to force some swaps 
-    whale = getWhaleAddress(strategy, lp_token, Contract)
-    shortA = Contract(strategy.shortA())
-    shortB = Contract(strategy.shortB())
-    swapAmtMax = shortA.balanceOf(lp_token)*swapPct
-    swapAmt = min(swapAmtMax, shortA.balanceOf(whale))
-    print("Force Large Swap - to offset debt ratios")
-    shortA.approve(router, 2**256-1, {"from": whale})
-    router.swapExactTokensForTokens(swapAmt, 0, [shortA, shortB], whale, 2**256-1, {"from": whale})
-
-
-def offSetDebtRatioB(strategy, lp_token, token, Contract, swapPct, router):
-    # use other AMM's LP to force some swaps 
-    whale = getWhaleAddress(strategy, lp_token, Contract)
-    shortA = Contract(strategy.shortA())
-    shortB = Contract(strategy.shortB())
-    swapAmtMax = shortB.balanceOf(lp_token)*swapPct
-    swapAmt = min(swapAmtMax, shortB.balanceOf(whale))
-    print("Force Large Swap - to offset debt ratios")
-    shortB.approve(router, 2**256-1, {"from": whale})
-    router.swapExactTokensForTokens(swapAmt, 0, [shortB, shortA], whale, 2**256-1, {"from": whale})
-
-
-def test_debt_rebalance_low(chain, accounts, token, deployed_vault, strategy, user, conf, gov, lp_token, router, Contract):
+def test_debt_rebalance_low(chain, accounts, token, deployed_vault, strategy, user, conf, gov, lp_token, router, offset_debt_ratio):
     ###################################################################
     # Test Debt Rebalance
     ###################################################################
@@ -56,7 +14,7 @@ def test_debt_rebalance_low(chain, accounts, token, deployed_vault, strategy, us
     # USE SPIRIT LP 
     swapPct = 0.025
 
-    offSetDebtRatioA(strategy, lp_token, token, Contract, swapPct, router)
+    offset_debt_ratio(swapPct)
 
     print('debt Ratio A :  {0}'.format(strategy.calcDebtRatioA()))
     print('debt Ratio B :  {0}'.format(strategy.calcDebtRatioB()))
@@ -71,7 +29,7 @@ def test_debt_rebalance_low(chain, accounts, token, deployed_vault, strategy, us
     assert pytest.approx(10000, rel=1e-2) == strategy.calcDebtRatioA()
     assert pytest.approx(10000, rel=1e-2) == strategy.calcDebtRatioB()
 
-def test_debt_rebalance_high(chain, accounts, token, deployed_vault, strategy, user, conf, gov, lp_token, router, Contract):
+def test_debt_rebalance_high(chain, accounts, token, deployed_vault, strategy, user, conf, gov, lp_token, router, offset_debt_ratio):
     ###################################################################
     # Test Debt Rebalance
     ###################################################################
@@ -80,7 +38,7 @@ def test_debt_rebalance_high(chain, accounts, token, deployed_vault, strategy, u
     # USE SPIRIT LP 
     swapPct = 0.025
 
-    offSetDebtRatioB(strategy, lp_token, token, Contract, swapPct, router)
+    offset_debt_ratio(swapPct, reverse=True)
 
     print('debt Ratio A :  {0}'.format(strategy.calcDebtRatioA()))
     print('debt Ratio B :  {0}'.format(strategy.calcDebtRatioB()))
@@ -97,22 +55,10 @@ def test_debt_rebalance_high(chain, accounts, token, deployed_vault, strategy, u
 
 
 def test_operation_OffsetA(
-    chain, accounts, gov, token, vault, strategy, user, strategist, lp_token, Contract, amount, RELATIVE_APPROX, router, conf
+    chain, accounts, gov, token, vault, deployed_vault, strategy, user, strategist, lp_token, amount, RELATIVE_APPROX, router, conf, offset_debt_ratio
 ):
-    #strategy.approveContracts(Contracts({'from':gov})
-    # Deposit to the vault
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-    assert token.balanceOf(vault.address) == amount
-    
-    # harvest
-    chain.sleep(1)
-    strategy.harvest()
-    strat = strategy
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
     swapPct = 0.01
-    offSetDebtRatioA(strategy, lp_token, token, Contract, swapPct, router)
+    offset_debt_ratio(swapPct)
 
     chain.sleep(1)
     chain.mine(1)
@@ -139,22 +85,10 @@ def test_operation_OffsetA(
     )
 
 def test_operation_OffsetB(
-    chain, accounts, gov, token, vault, strategy, user, strategist, lp_token, Contract, amount, RELATIVE_APPROX, router, conf
+    chain, accounts, gov, token, vault, deployed_vault, strategy, user, strategist, lp_token, amount, RELATIVE_APPROX, router, conf, offset_debt_ratio
 ):
-    #strategy.approveContracts(Contracts({'from':gov})
-    # Deposit to the vault
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-    assert token.balanceOf(vault.address) == amount
-    
-    # harvest
-    chain.sleep(1)
-    strategy.harvest()
-    strat = strategy
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
     swapPct = 0.01
-    offSetDebtRatioB(strategy, lp_token, token, Contract, swapPct, router)
+    offset_debt_ratio(swapPct, reverse=True)
 
     chain.sleep(1)
     chain.mine(1)
@@ -182,7 +116,7 @@ def test_operation_OffsetB(
 
 
 def test_reduce_debt_offsetA(
-    chain, gov, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, router, lp_token , Contract, conf
+    chain, gov, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, router, lp_token , conf, offset_debt_ratio
 ):
     #strategy.approveContracts(Contracts({'from':gov})
     # Deposit to the vault and harvest
@@ -192,7 +126,7 @@ def test_reduce_debt_offsetA(
     half = int(amount / 2)
 
     swapPct = 0.02
-    offSetDebtRatioA(strategy, lp_token, token, Contract, swapPct, router)
+    offset_debt_ratio(swapPct)
 
     vault.updateStrategyDebtRatio(strategy.address, 0, {"from": gov})
     chain.sleep(1)
@@ -201,7 +135,7 @@ def test_reduce_debt_offsetA(
 
 
 def test_reduce_debt_offsetA_half(
-    chain, gov, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, router, lp_token , Contract, conf
+    chain, gov, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, router, lp_token , conf, offset_debt_ratio
 ):
     #strategy.approveContracts(Contracts({'from':gov})
     # Deposit to the vault and harvest
@@ -211,7 +145,7 @@ def test_reduce_debt_offsetA_half(
     half = int(amount / 2)
 
     swapPct = 0.02
-    offSetDebtRatioA(strategy, lp_token, token, Contract, swapPct, router)
+    offset_debt_ratio(swapPct)
 
     
     vault.updateStrategyDebtRatio(strategy.address, 50_00, {"from": gov})
@@ -221,7 +155,7 @@ def test_reduce_debt_offsetA_half(
 
 
 def test_reduce_debt_offsetB(
-    chain, gov, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, router, lp_token , Contract, conf
+    chain, gov, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, router, lp_token , conf, offset_debt_ratio
 ):
     #strategy.approveContracts(Contracts({'from':gov})
     # Deposit to the vault and harvest
@@ -231,7 +165,7 @@ def test_reduce_debt_offsetB(
     half = int(amount / 2)
 
     swapPct = 0.02
-    offSetDebtRatioB(strategy, lp_token, token, Contract, swapPct, router)
+    offset_debt_ratio(swapPct, reverse=True)
 
     vault.updateStrategyDebtRatio(strategy.address, 0, {"from": gov})
     chain.sleep(1)
@@ -240,7 +174,7 @@ def test_reduce_debt_offsetB(
 
 
 def test_reduce_debt_offsetB_half(
-    chain, gov, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, router, lp_token , Contract, conf
+    chain, gov, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, router, lp_token , conf, offset_debt_ratio
 ):
     #strategy.approveContracts(Contracts({'from':gov})
     # Deposit to the vault and harvest
@@ -250,7 +184,7 @@ def test_reduce_debt_offsetB_half(
     half = int(amount / 2)
 
     swapPct = 0.02
-    offSetDebtRatioB(strategy, lp_token, token, Contract, swapPct, router)
+    offset_debt_ratio(swapPct, reverse=True)
 
     vault.updateStrategyDebtRatio(strategy.address, 50_00, {"from": gov})
     chain.sleep(1)
@@ -259,7 +193,7 @@ def test_reduce_debt_offsetB_half(
 
 
 def test_increase_debt_offsetA(
-    chain, gov, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, router, lp_token , Contract, conf
+    chain, gov, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, router, lp_token , conf, offset_debt_ratio
 ):
     #strategy.approveContracts(Contracts({'from':gov})
     # Deposit to the vault and harvest
@@ -274,7 +208,7 @@ def test_increase_debt_offsetA(
     assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == half
 
     swapPct = 0.02
-    offSetDebtRatioA(strategy, lp_token, token, Contract, swapPct, router)
+    offset_debt_ratio(swapPct)
 
     lossAdj = strategy.estimatedTotalAssets() / half
 
@@ -285,7 +219,7 @@ def test_increase_debt_offsetA(
 
 
 def test_increase_debt_offsetB(
-    chain, gov, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, router, lp_token , Contract, conf
+    chain, gov, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, router, lp_token , conf, offset_debt_ratio
 ):
     #strategy.approveContracts(Contracts({'from':gov})
     # Deposit to the vault and harvest
@@ -301,7 +235,7 @@ def test_increase_debt_offsetB(
     assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == half
 
     swapPct = 0.02
-    offSetDebtRatioB(strategy, lp_token, token, Contract, swapPct, router)
+    offset_debt_ratio(swapPct, reverse=True)
 
     lossAdj = strategy.estimatedTotalAssets() / half
 
@@ -313,23 +247,10 @@ def test_increase_debt_offsetB(
 
 
 def test_partialWithdraw_OffsetA(
-    chain, accounts, gov, token, vault, strategy, user, strategist, lp_token, Contract, amount, RELATIVE_APPROX, router, conf
+    chain, accounts, gov, token, vault, deployed_vault, strategy, user, strategist, lp_token, amount, RELATIVE_APPROX, router, conf, offset_debt_ratio
 ):
-    #strategy.approveContracts(Contracts({'from':gov})
-    # Deposit to the vault
-    
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-    assert token.balanceOf(vault.address) == amount
-    
-    # harvest
-    chain.sleep(1)
-    strategy.harvest()
-    strat = strategy
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
     swapPct = 0.02
-    offSetDebtRatioA(strategy, lp_token, token, Contract, swapPct, router)
+    offset_debt_ratio(swapPct)
 
 
     chain.sleep(1)
@@ -382,23 +303,10 @@ def test_partialWithdraw_OffsetA(
     )
 
 def test_partialWithdraw_OffsetB(
-    chain, accounts, gov, token, vault, strategy, user, strategist, lp_token, Contract, amount, RELATIVE_APPROX, router, conf
+    chain, accounts, gov, token, vault, deployed_vault, strategy, user, strategist, lp_token, amount, RELATIVE_APPROX, router, conf, offset_debt_ratio
 ):
-    #strategy.approveContracts(Contracts({'from':gov})
-    # Deposit to the vault
-    
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-    assert token.balanceOf(vault.address) == amount
-    
-    # harvest
-    chain.sleep(1)
-    strategy.harvest()
-    strat = strategy
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
     swapPct = 0.02
-    offSetDebtRatioB(strategy, lp_token, token, Contract, swapPct, router)
+    offset_debt_ratio(swapPct, reverse=True)
 
     chain.sleep(1)
     chain.mine(1)
@@ -443,23 +351,10 @@ def test_partialWithdraw_OffsetB(
 
 
 def test_fullWithdraw_OffsetA(
-    chain, accounts, gov, token, vault, strategy, user, strategist, lp_token, Contract, amount, RELATIVE_APPROX, router, conf
+    chain, accounts, gov, token, vault, deployed_vault, strategy, user, strategist, lp_token, amount, RELATIVE_APPROX, router, conf, offset_debt_ratio
 ):
-    #strategy.approveContracts(Contracts({'from':gov})
-    # Deposit to the vault
-    
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-    assert token.balanceOf(vault.address) == amount
-    
-    # harvest
-    chain.sleep(1)
-    strategy.harvest()
-    strat = strategy
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
     swapPct = 0.02
-    offSetDebtRatioA(strategy, lp_token, token, Contract, swapPct, router)
+    offset_debt_ratio(swapPct)
 
     chain.sleep(1)
     chain.mine(1)
@@ -495,23 +390,10 @@ def test_fullWithdraw_OffsetA(
 
 
 def test_fullWithdraw_OffsetB(
-    chain, accounts, gov, token, vault, strategy, user, strategist, lp_token, Contract, amount, RELATIVE_APPROX, router, conf
+    chain, accounts, gov, token, vault, deployed_vault, strategy, user, strategist, lp_token, amount, RELATIVE_APPROX, router, conf, offset_debt_ratio
 ):
-    #strategy.approveContracts(Contracts({'from':gov})
-    # Deposit to the vault
-    
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-    assert token.balanceOf(vault.address) == amount
-    
-    # harvest
-    chain.sleep(1)
-    strategy.harvest()
-    strat = strategy
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
     swapPct = 0.02
-    offSetDebtRatioB(strategy, lp_token, token, Contract, swapPct, router)
+    offset_debt_ratio(swapPct, reverse=True)
 
     chain.sleep(1)
     chain.mine(1)
@@ -543,25 +425,14 @@ def test_fullWithdraw_OffsetB(
 
 
 def test_Sandwhich_A(
-    chain, gov, accounts, token, vault, strategy, user, strategist, lp_token ,amount, RELATIVE_APPROX, conf, router
+    chain, gov, accounts, token, vault, deployed_vault, strategy, user, strategist, lp_token ,amount, RELATIVE_APPROX, conf, router, offset_debt_ratio
 
 ):
-    #strategy.approveContracts(Contracts({'from':gov})
-    # Deposit to the vault and harvest
-
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-
     balBefore = token.balanceOf(user)
 
-    vault.updateStrategyDebtRatio(strategy.address, 100_00, {"from": gov})
-    chain.sleep(1)
-    strategy.harvest()
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
     # do a big swap to offset debt ratio's massively 
     swapPct = 0.7
-    offSetDebtRatioA(strategy, lp_token, token, Contract, swapPct, router)
+    offset_debt_ratio(swapPct)
 
     offsetEstimatedAssets  = strategy.estimatedTotalAssets()
     strategyLoss = amount - strategy.estimatedTotalAssets()
@@ -597,23 +468,13 @@ def test_Sandwhich_A(
         vault.withdraw({'from' : user}) 
 
 def test_Sandwhich_B(
-    chain, gov, accounts, token, vault, strategy, user, strategist, lp_token ,amount, RELATIVE_APPROX, conf, router
+    chain, gov, accounts, token, vault, deployed_vault, strategy, user, strategist, lp_token ,amount, RELATIVE_APPROX, conf, router, offset_debt_ratio
 ):
-    #strategy.approveContracts(Contracts({'from':gov})
-    # Deposit to the vault and harvest
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-
     balBefore = token.balanceOf(user)
 
-    vault.updateStrategyDebtRatio(strategy.address, 100_00, {"from": gov})
-    chain.sleep(1)
-    strategy.harvest()
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
     # do a big swap to offset debt ratio's massively 
     swapPct = 0.7
-    offSetDebtRatioB(strategy, lp_token, token, Contract, swapPct, router)
+    offset_debt_ratio(swapPct, reverse=True)
 
     print("Try to rebalance - this should fail due to _testPriceSource()")
     # for some reason brownie.reverts doesn't fail.... here although transaction reverts... 
@@ -654,6 +515,7 @@ def test_migration_offsetA(
     chain,
     token,
     vault,
+    deployed_vault,
     strategy,
     lp_token,
     router,
@@ -663,17 +525,10 @@ def test_migration_offsetA(
     gov,
     user,
     RELATIVE_APPROX,
+    strategy_args, offset_debt_ratio
 ):
-    # Deposit to the vault and harvest
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-    chain.sleep(1)
-    #strategy.approveContracts({'from':gov})
-    strategy.harvest()
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
     swapPct = 0.015
-    offSetDebtRatioA(strategy, lp_token, token, Contract, swapPct, router)
+    offset_debt_ratio(swapPct)
 
     chain.sleep(1)
     chain.mine(1)
@@ -691,7 +546,7 @@ def test_migration_offsetA(
     newAmount = strategy.estimatedTotalAssets()
 
     # migrate to a new strategy
-    new_strategy = strategist.deploy(strategy_contract, vault)
+    new_strategy = strategist.deploy(strategy_contract, vault, *strategy_args)
     chain.mine(1)
     chain.sleep(1)
     #new_strategy.approveContracts({'from':gov})
@@ -707,6 +562,7 @@ def test_migration_offsetB(
     chain,
     token,
     vault,
+    deployed_vault,
     strategy,
     lp_token,
     router,
@@ -716,17 +572,10 @@ def test_migration_offsetB(
     gov,
     user,
     RELATIVE_APPROX,
+    strategy_args, offset_debt_ratio
 ):
-    # Deposit to the vault and harvest
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-    chain.sleep(1)
-    #strategy.approveContracts({'from':gov})
-    strategy.harvest()
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
     swapPct = 0.015
-    offSetDebtRatioB(strategy, lp_token, token, Contract, swapPct, router)
+    offset_debt_ratio(swapPct, reverse=True)
 
     chain.sleep(1)
     chain.mine(1)
@@ -743,7 +592,7 @@ def test_migration_offsetB(
     newAmount = strategy.estimatedTotalAssets()
 
     # migrate to a new strategy
-    new_strategy = strategist.deploy(strategy_contract, vault)
+    new_strategy = strategist.deploy(strategy_contract, vault, *strategy_args)
     chain.mine(1)
     chain.sleep(1)
     #new_strategy.approveContracts({'from':gov})
@@ -757,6 +606,7 @@ def test_migration_offsetA(
     chain,
     token,
     vault,
+    deployed_vault,
     strategy,
     amount,
     strategy_contract,
@@ -766,22 +616,14 @@ def test_migration_offsetA(
     RELATIVE_APPROX,
     lp_token, 
     router,
-    Contract
+    strategy_args, offset_debt_ratio
 ):
-    # Deposit to the vault and harvest
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-    chain.sleep(1)
-    #strategy.approveContracts({'from':gov})
-    strategy.harvest()
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
     swapPct = 0.025
-    offSetDebtRatioA(strategy, lp_token, token, Contract, swapPct, router)
+    offset_debt_ratio(swapPct)
 
 
     # migrate to a new strategy
-    new_strategy = strategist.deploy(strategy_contract, vault)
+    new_strategy = strategist.deploy(strategy_contract, vault, *strategy_args)
     chain.mine(1)
     chain.sleep(1)
     #new_strategy.approveContracts({'from':gov})
@@ -796,6 +638,7 @@ def test_migration_offsetB(
     chain,
     token,
     vault,
+    deployed_vault,
     strategy,
     amount,
     strategy_contract,
@@ -805,22 +648,14 @@ def test_migration_offsetB(
     RELATIVE_APPROX,
     lp_token, 
     router,
-    Contract
+    strategy_args, offset_debt_ratio
 ):
-    # Deposit to the vault and harvest
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-    chain.sleep(1)
-    #strategy.approveContracts({'from':gov})
-    strategy.harvest()
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
     swapPct = 0.025
-    offSetDebtRatioB(strategy, lp_token, token, Contract, swapPct, router)
+    offset_debt_ratio(swapPct, reverse=True)
 
 
     # migrate to a new strategy
-    new_strategy = strategist.deploy(strategy_contract, vault)
+    new_strategy = strategist.deploy(strategy_contract, vault, *strategy_args)
     chain.mine(1)
     chain.sleep(1)
     #new_strategy.approveContracts({'from':gov})
@@ -0,0 +1,66 @@
+import pytest
+
+from scripts.replay import (
+    PRECISION,
+    Action,
+    ReplayEnv,
+    Sequence,
+    compare,
+    load_sequence,
+    replay,
+    replay_batch,
+    save_sequence,
+)
+
+# the same shape of traffic as test_price_offset: the pool moves, the keeper
+# rebalances and harvests, and a user leaves
+SEQUENCE = Sequence("offset_rebalance_harvest", (
+    Action("swap", 0, {"pair": "lp", "token_in": "shortA", "fraction": PRECISION * 25 // 1000}),
+    Action("rebalanceDebt", 60),
+    Action("swap", 120, {"pair": "lp", "token_in": "shortB", "fraction": PRECISION * 5 // 1000}),
+    Action("harvest", 3600),
+    Action("withdraw", 3660, {"fraction": PRECISION // 4}),
+))
+
+
+@pytest.fixture
+def env(deployed_vault, strategy, gov, user, router, whale, short_whale):
+    yield ReplayEnv(strategy, deployed_vault, gov, user, router, {"want": whale, "shortA": short_whale, "shortB": short_whale})
+
+
+def test_sequence_roundtrip(tmp_path):
+    path = save_sequence(SEQUENCE, tmp_path / "sequence.json")
+    assert load_sequence(path) == SEQUENCE
+
+
+def test_replay_is_deterministic(env, strategy):
+    assetsBefore = strategy.estimatedTotalAssets()
+    first, second = replay_batch([SEQUENCE, SEQUENCE], env)
+    # the chain is back where it started
+    assert strategy.estimatedTotalAssets() == assetsBefore
+
+    assert first.reverted == ()
+    assert first.gas_used == second.gas_used
+    assert all(gas > 0 for gas in first.gas_used)
+    assert second.estimated_total_assets == first.estimated_total_assets
+    assert compare([first], [second], [SEQUENCE]) == []
+
+
+def test_compare_flags_regressions(env):
+    result = replay(SEQUENCE, env)
+    worse = result._replace(
+        gas_used=(result.gas_used[0] * 2,) + result.gas_used[1:],
+        reverted=(3,),
+        estimated_total_assets=result.estimated_total_assets // 2,
+    )
+    diffs = compare([result], [worse], [SEQUENCE])
+    assert [(d.action, d.kind) for d in diffs] == [(0, "swap"), (3, "harvest"), (None, "")]
+
+
+def test_replay_keeps_isolation_snapshot(chain, env, strategy, gov):
+    debtUpper = strategy.debtUpper()
+    strategy.setDebtThresholds(9800, 10400, 5000, {"from": gov})
+    replay(SEQUENCE, env)
+    # chain.revert() still goes back to the snapshot fn_isolation took
+    chain.revert()
+    assert strategy.debtUpper() == debtUpper
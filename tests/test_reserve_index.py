@@ -0,0 +1,34 @@
+import pytest
+from brownie import interface
+
+from scripts import strategy_math
+from scripts.reserve_index import ReserveIndex, strategy_pairs, with_reserves
+from scripts.snapshot import read_snapshot
+
+
+def test_reserve_index_follows_swaps(chain, deployed_vault, strategy, lp_token, router, short_whale):
+    pairs = strategy_pairs(strategy)
+    index = ReserveIndex(pairs.addresses)
+    state = read_snapshot(strategy).position_state()
+    start = index.block_number
+    assert index.sync() == []
+
+    shortA = interface.IERC20Extended(strategy.shortA())
+    shortB = interface.IERC20Extended(strategy.shortB())
+    swapAmt = min(shortA.balanceOf(lp_token) // 40, shortA.balanceOf(short_whale))
+    shortA.approve(router, 2**256-1, {"from": short_whale})
+    tx = router.swapExactTokensForTokens(swapAmt, 0, [shortA, shortB], short_whale, 2**256-1, {"from": short_whale})
+
+    assert index.sync() == [tx.block_number]
+    assert index.reserves(pairs.short_a_short_b_lp) == interface.IUniswapV2Pair(pairs.short_a_short_b_lp).getReserves()[:2]
+    assert index.reserves(pairs.short_a_short_b_lp, start) != index.reserves(pairs.short_a_short_b_lp)
+    with pytest.raises(KeyError):
+        index.reserves(pairs.short_a_short_b_lp, start - 1)
+
+    # balances only move with the strategy, so the views follow the reserves
+    views = strategy_math.evaluate(with_reserves(state, index, pairs))
+    assert views.debt_ratio_a == strategy.calcDebtRatioA()
+    assert views.debt_ratio_b == strategy.calcDebtRatioB()
+    before = strategy_math.evaluate(with_reserves(state, index, pairs, start))
+    assert before == strategy_math.evaluate(state)
+    assert before.debt_ratio_a != views.debt_ratio_a
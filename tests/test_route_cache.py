@@ -0,0 +1,36 @@
+import pytest
+from brownie import interface
+
+from scripts.route_cache import RouteCache, config_tokens
+from scripts.strategy_config import get_config
+
+
+def test_best_route_matches_router(deployed_vault, strategy):
+    cfg = get_config(strategy)
+    cache = RouteCache(routers=[cfg.router], tokens=config_tokens([cfg]))
+    amount = 1e21
+
+    choice = cache.best(cfg.farm_token, cfg.want, amount)
+    router = interface.IUniswapV2Router01(choice.route.router)
+    assert choice.amount_out == pytest.approx(router.getAmountsOut(amount, choice.route.tokens)[-1], rel=1e-9)
+
+    # getTokenOutPath is one of the candidates, so the best is never worse
+    gap = cache.left_on_table(strategy, cfg.farm_token, cfg.want, amount)
+    fixedOut = interface.IUniswapV2Router01(cfg.router).getAmountsOut(amount, gap.fixed.route.tokens)[-1]
+    assert gap.fixed.amount_out == pytest.approx(fixedOut, rel=1e-9)
+    assert gap.left_on_table >= 0
+
+
+def test_swaps_invalidate_routes(deployed_vault, strategy, router, offset_debt_ratio):
+    cfg = get_config(strategy)
+    cache = RouteCache(routers=[cfg.router], tokens=config_tokens([cfg]))
+    before = cache.best(cfg.short_b, cfg.want, 1e18)
+    assert cache.sync() == []
+
+    offset_debt_ratio(0.025)
+
+    assert (str(cfg.short_b), str(cfg.want)) in cache.sync()
+    after = cache.best(cfg.short_b, cfg.want, 1e18)
+    # shortB is cheaper in shortA after the swap
+    assert after.amount_out < before.amount_out
+    assert after.amount_out == pytest.approx(router.getAmountsOut(1e18, after.route.tokens)[-1], rel=1e-9)
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from brownie import interface
+
+from scripts.sandwich import Route, chunk_plan, harvest_route, sandwich, sweep
+
+
+def test_best_front_run():
+    route = Route(0, ("farm", "shortA", "shortB"), ("p0", "p1"), ((10**24, 5 * 10**23), (2 * 10**23, 3 * 10**21)))
+    sizes = np.geomspace(1e18, 1e23, 12)
+    result = sweep(route, sizes)
+    assert (result.extracted >= 0).all()
+    # too small to pay for the pools' fees, then increasingly worth it
+    assert result.front_run[0] == 0 and result.profit[-1] > 0
+    assert (np.diff(result.profit) >= 0).all()
+
+    # no front-run on a grid does better than the search
+    fronts = np.geomspace(1e15, 1e25, 100_000)
+    grid, _ = sandwich(fronts, sizes[-1], route.hops)
+    assert result.profit[-1] >= grid.max() * (1 - 1e-9)
+
+    # splitting a large harvest leaves less to take
+    plan = chunk_plan(route, 1e23)
+    assert plan.best > 1
+    assert plan.extracted[plan.best - 1] < plan.extracted[0]
+
+
+def test_sandwich_matches_chain(deployed_vault, strategy, router, harvest_token, harvest_token_whale, user):
+    route = harvest_route(strategy)
+    path = list(route.tokens)
+    victim = route.reserves[0][0] // 100
+    result = sweep(route, [victim], max_front=harvest_token.balanceOf(harvest_token_whale) - victim)
+    front = int(result.front_run[0])
+    assert front > 0
+
+    harvest_token.transfer(user, victim, {'from': harvest_token_whale})
+    tokenOut = interface.IERC20Extended(path[-1])
+    balanceBefore = harvest_token.balanceOf(harvest_token_whale)
+    outBefore = tokenOut.balanceOf(harvest_token_whale)
+    userOutBefore = tokenOut.balanceOf(user)
+    harvest_token.approve(router, 2**256-1, {'from': harvest_token_whale})
+    harvest_token.approve(router, 2**256-1, {'from': user})
+    tokenOut.approve(router, 2**256-1, {'from': harvest_token_whale})
+
+    router.swapExactTokensForTokens(front, 0, path, harvest_token_whale, 2**256-1, {'from': harvest_token_whale})
+    router.swapExactTokensForTokens(victim, 0, path, user, 2**256-1, {'from': user})
+    router.swapExactTokensForTokens(tokenOut.balanceOf(harvest_token_whale) - outBefore, 0, path[::-1], harvest_token_whale, 2**256-1, {'from': harvest_token_whale})
+
+    assert tokenOut.balanceOf(user) - userOutBefore == pytest.approx(result.attacked_out[0], rel=1e-6)
+    assert harvest_token.balanceOf(harvest_token_whale) - balanceBefore == pytest.approx(result.profit[0], rel=1e-6)
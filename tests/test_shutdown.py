@@ -31,18 +31,8 @@ def test_vault_shutdown_can_withdraw(
 
 
 def test_basic_shutdown(
-    chain, token, vault, strategy, user, strategist, gov, amount, RELATIVE_APPROX
+    chain, token, vault, deployed_vault, strategy, user, strategist, gov, amount, RELATIVE_APPROX
 ):
-    # Deposit to the vault
-    #strategy.approveContracts({'from':gov})
-
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-    assert token.balanceOf(vault.address) == amount
-
-    # Harvest 1: Send funds through the strategy
-    chain.sleep(1)
-    strategy.harvest()
     chain.mine(100)
     assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
 
@@ -0,0 +1,57 @@
+import pytest
+from brownie import multicall
+
+from scripts.snapshot import prepare_snapshots, queue_snapshot, read_snapshot
+from scripts import strategy_math
+
+
+def test_snapshot_matches_views(chain, deployed_vault, strategy, vault):
+    chain.sleep(1)
+    chain.mine(1)
+
+    snap = read_snapshot(strategy)
+
+    assert snap.strategy == strategy.address
+    assert snap.collat_target == strategy.collatTarget()
+    assert snap.debt_upper == strategy.debtUpper()
+    assert snap.debt_ratio_a == strategy.calcDebtRatioA()
+    assert snap.debt_ratio_b == strategy.calcDebtRatioB()
+    assert snap.collateral == strategy.calcCollateral()
+    assert snap.estimated_total_assets == strategy.estimatedTotalAssets()
+    assert snap.harvest_trigger == strategy.harvestTrigger(0)
+    assert (snap.short_a_in_lp, snap.short_b_in_lp) == strategy.getLpReserves()
+    assert (snap.want_in_lp, snap.short_a_in_lp_want) == strategy.getLpReservesWantShort()
+    assert snap.total_debt == vault.strategies(strategy)["totalDebt"]
+
+    # the raw inputs reproduce the views through the off-chain maths
+    views = strategy_math.evaluate(snap.position_state())
+    assert views.estimated_total_assets == snap.estimated_total_assets
+    assert views.balance_debt == snap.balance_debt
+    assert views.collateral == snap.collateral
+    assert views.debt_ratio_a == snap.debt_ratio_a
+
+
+def test_snapshot_pinned_block(chain, deployed_vault, strategy, gov):
+    before = read_snapshot(strategy)
+
+    # change the strategy after the pinned block
+    strategy.setDebtThresholds(9800, 10400, 5000, {"from": gov})
+    chain.mine(1)
+
+    assert read_snapshot(strategy).debt_upper == 10400
+    pinned = read_snapshot(strategy, block_identifier=before.block_number)
+    assert pinned == before
+
+    with pytest.raises(AttributeError):
+        pinned.collateral = 0
+
+
+def test_snapshot_queued_with_other_reads(chain, deployed_vault, strategy, vault):
+    chain.mine(1)
+    prepare_snapshots([strategy])
+    with multicall():
+        pending = queue_snapshot(strategy)
+        total_assets = vault.totalAssets()
+
+    assert pending.result() == read_snapshot(strategy, pending.block_number)
+    assert total_assets == vault.totalAssets()
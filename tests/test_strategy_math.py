@@ -0,0 +1,72 @@
+import pytest
+from brownie import interface
+
+from scripts.strategy_config import get_config
+from scripts import strategy_math
+
+
+def readPositionState(strategy):
+    cfg = get_config(strategy)
+    lp = interface.IUniswapV2Pair(cfg.short_a_short_b_lp)
+    cTokenLend = interface.ICTokenErc20(cfg.c_token_lend)
+    oracle = interface.ICompPriceOracle(
+        interface.ComptrollerV5Storage(cfg.comptroller).oracle()
+    )
+    quotePrice = oracle.getUnderlyingPrice(cfg.c_token_lend)
+
+    shortAInLP, shortBInLP = strategy.getLpReserves()
+    wantInLP, shortAInLPWant = strategy.getLpReservesWantShort()
+    return strategy_math.PositionState(
+        want_balance=strategy.balanceOfWant(),
+        lend_ctokens=cTokenLend.balanceOf(strategy),
+        exchange_rate=cTokenLend.exchangeRateStored(),
+        debt_short_a=strategy.balanceDebtInShortA(),
+        debt_short_b=strategy.balanceDebtInShortB(),
+        lp_balance=strategy.countLpPooled() + lp.balanceOf(strategy),
+        lp_total_supply=lp.totalSupply(),
+        short_a_in_lp=shortAInLP,
+        short_b_in_lp=shortBInLP,
+        want_in_lp=wantInLP,
+        short_a_in_lp_want=shortAInLPWant,
+        price_a=oracle.getUnderlyingPrice(cfg.c_token_borrow_a) * 10 ** 18 // quotePrice,
+        price_b=oracle.getUnderlyingPrice(cfg.c_token_borrow_b) * 10 ** 18 // quotePrice,
+    )
+
+
+def assertViewsMatch(views, strategy):
+    assert views.balance_lend == strategy.balanceLend()
+    assert views.balance_lp == strategy.balanceLp()
+    assert views.balance_debt_lp == strategy.balanceDebtLP()
+    assert views.balance_debt == strategy.balanceDebt()
+    assert views.balance_deployed == strategy.balanceDeployed()
+    assert views.estimated_total_assets == strategy.estimatedTotalAssets()
+    assert views.debt_ratio_a == strategy.calcDebtRatioA()
+    assert views.debt_ratio_b == strategy.calcDebtRatioB()
+    assert views.collateral == strategy.calcCollateral()
+
+
+def test_views_match_chain(chain, deployed_vault, strategy):
+    chain.sleep(1)
+    chain.mine(1)
+
+    state = readPositionState(strategy)
+    assertViewsMatch(strategy_math.evaluate(state), strategy)
+
+
+def test_batch_matches_single(chain, deployed_vault, strategy):
+    state = readPositionState(strategy)
+    single = strategy_math.evaluate(state)
+
+    # the unshocked corner of the grid must be the current state
+    grid = strategy_math.price_shock_grid(state, [9000, 10000, 11000], [9000, 10000, 11000])
+    views = strategy_math.unstack(strategy_math.evaluate(grid))
+    assert len(views) == 9
+    assert views[4] == single
+    assertViewsMatch(views[4], strategy)
+
+    # every row of the batch matches evaluating it on its own
+    for row, rowViews in zip(strategy_math.unstack(grid), views):
+        assert strategy_math.evaluate(row) == rowViews
+
+    # shortA going up in price against want pushes shortA debt up in want terms
+    assert views[7].balance_debt > views[1].balance_debt
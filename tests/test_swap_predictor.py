@@ -0,0 +1,53 @@
+import pytest
+from brownie import interface
+
+from scripts.snapshot import read_snapshot
+from scripts.swap_predictor import get_amount_in, get_amount_out, quote_rebalance_debt, quote_state, quote_withdraw
+
+# the fork accrues a block of interest between the snapshot and the tx
+REL = 1e-6
+
+
+def test_router_amounts(deployed_vault, strategy, router):
+    shortA = interface.IERC20Extended(strategy.shortA())
+    shortB = interface.IERC20Extended(strategy.shortB())
+    reserveA, reserveB = strategy.getLpReserves()
+    amountIn = reserveA // 100
+    assert router.getAmountsOut(amountIn, [shortA, shortB])[-1] == get_amount_out(amountIn, reserveA, reserveB)
+    assert router.getAmountsIn(amountIn, [shortB, shortA])[0] == get_amount_in(amountIn, reserveB, reserveA)
+
+
+@pytest.mark.parametrize("percent", [300, 2000, 9700])
+def test_quote_withdraw(deployed_vault, strategy, gov, percent):
+    # below the swap threshold, above it, and the full liquidation path
+    state = quote_state(read_snapshot(strategy))
+    amount = strategy.balanceDeployed() * percent // 10_000 + strategy.balanceOfWant()
+    quote = quote_withdraw(state, amount)
+    assert quote.strat_percent == pytest.approx(percent, abs=1)
+    assert quote.full_liquidation == (percent > 9500)
+    assert bool(quote.swaps) == (percent > 500)
+
+    strategy.liquidatePositionAuth(amount, {'from': gov})
+    after = quote.state_after.position
+    assert strategy.balanceOfWant() == pytest.approx(after.want_balance, rel=REL)
+    assert strategy.getLpReserves() == pytest.approx((after.short_a_in_lp, after.short_b_in_lp), rel=REL)
+    assert strategy.getLpReservesWantShort() == pytest.approx((after.want_in_lp, after.short_a_in_lp_want), rel=REL)
+    assert strategy.balanceDebtInShortA() == pytest.approx(after.debt_short_a, rel=REL)
+    assert strategy.balanceDebtInShortB() == pytest.approx(after.debt_short_b, rel=REL)
+
+
+def test_quote_rebalance_debt(deployed_vault, strategy, gov, router, short_whale):
+    shortA = interface.IERC20Extended(strategy.shortA())
+    shortB = interface.IERC20Extended(strategy.shortB())
+    reserveA, _ = strategy.getLpReserves()
+    swapAmt = min(reserveA * 25 // 1000, shortA.balanceOf(short_whale))
+    shortA.approve(router, 2**256-1, {"from": short_whale})
+    router.swapExactTokensForTokens(swapAmt, 0, [shortA, shortB], short_whale, 2**256-1, {"from": short_whale})
+
+    quote = quote_rebalance_debt(quote_state(read_snapshot(strategy)))
+    assert quote is not None
+    strategy.rebalanceDebt({'from': gov})
+    after = quote.state_after.position
+    assert strategy.getLpReserves() == pytest.approx((after.short_a_in_lp, after.short_b_in_lp), rel=REL)
+    assert strategy.balanceDebtInShortA() == pytest.approx(after.debt_short_a, rel=REL)
+    assert strategy.balanceDebtInShortB() == pytest.approx(after.debt_short_b, rel=REL)
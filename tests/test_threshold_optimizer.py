@@ -0,0 +1,58 @@
+import pytest
+
+from scripts import threshold_optimizer
+from scripts.backtest import Thresholds, gbm_paths
+from scripts.threshold_optimizer import SearchSpace, grid, grid_search, sequential_search, valid
+
+
+SPACE = SearchSpace(
+    collat_lower=(4000, 4500, 500),
+    collat_target=(5000, 5000, 1),
+    collat_upper=(5500, 6000, 500),
+    debt_lower=(9900, 9900, 1),
+    debt_upper=(10200, 10400, 200),
+)
+# 100 gwei on a 10k FTM deposit
+GAS_PRICE = 1e-11
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(threshold_optimizer, "CACHE_DIR", tmp_path)
+    yield tmp_path
+
+
+def test_valid_matches_setters():
+    assert valid(Thresholds())
+    assert not valid(Thresholds(debt_upper=9999))
+    assert not valid(Thresholds(debt_lower=10001))
+    assert not valid(Thresholds(collat_upper=10001))
+    assert not valid(Thresholds(collat_lower=5100))
+
+
+def test_grid_search_is_cached(cache_dir, monkeypatch):
+    p_a, p_b = gbm_paths(16, 100, seed=1)
+    ranked = grid_search(SPACE, p_a, p_b, GAS_PRICE, processes=1)
+    assert len(ranked) == len(grid(SPACE)) == 8
+    assert [cost for cost, _ in ranked] == sorted(cost for cost, _ in ranked)
+
+    def fail(*args):
+        raise AssertionError("cache miss")
+
+    monkeypatch.setattr(threshold_optimizer, "sweep", fail)
+    assert grid_search(SPACE, p_a, p_b, GAS_PRICE, processes=1) == ranked
+
+
+def test_sequential_search(cache_dir):
+    p_a, p_b = gbm_paths(16, 100, seed=1)
+    ranked = sequential_search(SPACE, p_a, p_b, GAS_PRICE, n_iter=3, n_initial=3, seed=1, processes=1)
+    assert len(ranked) == 6
+    assert all(valid(t) for _, t in ranked)
+    assert ranked[0][0] == min(cost for cost, _ in ranked)
+
+
+def test_grid_search_counts_gas(cache_dir):
+    p_a, p_b = gbm_paths(16, 100, seed=1)
+    free = dict((t, cost) for cost, t in grid_search(SPACE, p_a, p_b, 0.0, processes=1))
+    priced = dict((t, cost) for cost, t in grid_search(SPACE, p_a, p_b, GAS_PRICE, processes=1))
+    assert all(priced[t] > free[t] for t in free)
@@ -0,0 +1,34 @@
+import pytest
+from brownie import interface
+
+from scripts.token_prices import TokenPriceFeed
+
+
+def test_price_matches_router(chain, conf):
+    feed = TokenPriceFeed()
+    block = chain.height
+    router = interface.IUniswapV2Router01(conf['router'])
+    path = feed.path(router, conf['harvest_token'], conf['token'])
+    assert path[0] == conf['harvest_token'] and path[-1] == conf['token']
+    assert feed.path(router, conf['token'], conf['token']) == (conf['token'],)
+
+    price = feed.price(router, conf['harvest_token'], conf['token'], block)
+    # a small swap gets the mid price less the fee on each hop
+    amountIn = 10**18
+    amountOut = router.getAmountsOut(amountIn, path)[-1]
+    assert amountOut == pytest.approx(amountIn * price * 0.998 ** (len(path) - 1), rel=1e-4)
+    assert conf['harvest_token_price'] == pytest.approx(price)
+
+    # every later price at the block comes out of the cache
+    misses = feed.misses
+    assert feed.prices(router, [conf['harvest_token'], conf['token']], conf['token'], block)[conf['token']] == 1.0
+    assert feed.misses == misses and feed.hits > 0
+
+
+def test_revert_drops_blocks(chain):
+    feed = TokenPriceFeed(max_blocks=2)
+    feed._blocks[1] = {"pair": (1, 2)}
+    feed._blocks[2] = {"pair": (2, 2)}
+    assert feed.reserves(["pair"], 1) == {"pair": (1, 2)}
+    feed._revert(1)
+    assert list(feed._blocks) == [1]